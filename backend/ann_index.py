@@ -0,0 +1,127 @@
+import math
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+# Defaults for new builds: `flat` is exact; the others trade recall for query time
+INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+INDEX_METRIC = os.getenv("INDEX_METRIC", "l2")
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+METRICS = ("l2", "cosine")
+
+# Search-time defaults, overridable per request
+NPROBE = int(os.getenv("INDEX_NPROBE", "16"))
+EF_SEARCH = int(os.getenv("INDEX_EF_SEARCH", "64"))
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+PQ_BITS = 8
+
+
+def normalize(vectors):
+    """Unit-length float32 copies, so inner product equals cosine similarity."""
+    vectors = np.array(vectors, dtype=np.float32, copy=True)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def ivf_lists(n):
+    """Number of IVF lists: ~4·√n, with at least 39 training points per list."""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def pq_subquantizers(dim, limit=64):
+    """Largest divisor of `dim` up to `limit` (PQ splits vectors into equal sub-vectors)."""
+    return max(m for m in range(1, min(dim, limit) + 1) if dim % m == 0)
+
+
+def build_ann_index(vectors, ids, index_type=INDEX_TYPE, metric=INDEX_METRIC):
+    """Builds an id-mapped FAISS index of the given type over `vectors`.
+
+    `metric="cosine"` normalizes the vectors and searches by inner product; queries are
+    normalized the same way in `search`. IVF types are trained on the vectors themselves.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"❌ Unknown index type `{index_type}`, expected one of {', '.join(INDEX_TYPES)}.")
+    if metric not in METRICS:
+        raise ValueError(f"❌ Unknown metric `{metric}`, expected one of {', '.join(METRICS)}.")
+
+    vectors = normalize(vectors) if metric == "cosine" else np.ascontiguousarray(vectors, dtype=np.float32)
+    ids = np.asarray(ids, dtype=np.int64)
+    n, dim = vectors.shape
+    faiss_metric = faiss.METRIC_INNER_PRODUCT if metric == "cosine" else faiss.METRIC_L2
+
+    if index_type == "flat":
+        index = faiss.IndexIDMap(faiss.IndexFlat(dim, faiss_metric))
+    elif index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dim, HNSW_M, faiss_metric)
+        hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index = faiss.IndexIDMap(hnsw)
+    elif index_type == "ivf_flat":
+        index = faiss.index_factory(dim, f"IVF{ivf_lists(n)},Flat", faiss_metric)
+    else:
+        # Fewer bits per code when there are too few vectors to train 2^8 centroids
+        bits = max(1, min(PQ_BITS, int(math.log2(max(2, n // 39)))))
+        index = faiss.index_factory(dim, f"IVF{ivf_lists(n)},PQ{pq_subquantizers(dim)}x{bits}", faiss_metric)
+
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, ids)
+    return index
+
+
+def describe(index):
+    """(index type, metric) of an index built by `build_ann_index` (or the legacy flat L2 one)."""
+    metric = "cosine" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return ("ivf_pq" if isinstance(faiss.downcast_index(ivf), faiss.IndexIVFPQ) else "ivf_flat"), metric
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    return ("hnsw" if isinstance(inner, faiss.IndexHNSW) else "flat"), metric
+
+
+def search_params(index, nprobe=None, ef_search=None):
+    """Per-call search parameters for the index's type (None for flat indexes)."""
+    if faiss.try_extract_index_ivf(index) is not None:
+        return faiss.SearchParametersIVF(nprobe=nprobe or NPROBE)
+    if describe(index)[0] == "hnsw":
+        return faiss.SearchParametersHNSW(efSearch=ef_search or EF_SEARCH)
+    return None
+
+
+def search(index, queries, k, nprobe=None, ef_search=None):
+    """Searches any index `build_ann_index` makes; nprobe / efSearch apply to this call only.
+
+    Parameters travel with the call instead of being set on the shared index, so
+    concurrent requests with different settings do not interfere.
+    """
+    queries = np.asarray(queries, dtype=np.float32).reshape(-1, index.d)
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        queries = normalize(queries)
+    params = search_params(index, nprobe, ef_search)
+    return index.search(queries, k, params=params) if params is not None else index.search(queries, k)
+
+
+def rebuild_from_store(index_type, metric, index_path="java_embeddings.index", store_prefix="java_embeddings"):
+    """Rebuilds the index file from the vector store with another type / metric, no re-embedding."""
+    from vector_store import INDEX_SUFFIX, VectorStore, link_file, write_store
+
+    store = VectorStore(store_prefix)
+    started = time.time()
+    ids, vectors = np.asarray(store.ids), np.asarray(store.vectors)
+    index = build_ann_index(vectors, ids, index_type, metric)
+    snippets = store.get_snippets(ids)
+    store.close()
+    # A new store generation, so servers never pair the new index with another build's store
+    generation = write_store(store_prefix, ids, vectors, snippets, index=index)
+    link_file(f"{store_prefix}.{generation}{INDEX_SUFFIX}", index_path)
+    print(f"✅ Rebuilt `{index_path}` as {index_type}/{metric} over {index.ntotal} vectors "
+          f"in {time.time() - started:.1f}s.")
+
+
+# Switch index type without re-embedding: python ann_index.py hnsw cosine
+if __name__ == "__main__":
+    rebuild_from_store(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else INDEX_METRIC)
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+
+from embedder import MAX_INPUT_TOKENS
+from java_chunker import parse_provenance
+from llm_debugging import CHAT_MODEL
+from prompt_builder import log_lines, truncate_tokens
+from query_cache import get_query_cache, normalize_log_text
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "debug_answers.sqlite")
+ANSWER_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+MAX_ANSWERS = 2000
+# A past incident answers a new one when its logs embed this close (cosine) and it
+# retrieved at least this share of the same code chunks (Jaccard)
+SIMILARITY_THRESHOLD = 0.97
+MIN_CHUNK_OVERLAP = 0.5
+
+
+@dataclass
+class Probe:
+    """What a debug request is looked up and stored by."""
+    key: str
+    fingerprint: str
+    chunks: list
+    vector: np.ndarray
+
+
+def chunk_key(snippet):
+    """Stable identity of a code chunk: file and class#method, or a content hash for chunks without provenance.
+
+    Line numbers are left out, so a chunk that only moved keeps its key.
+    """
+    provenance = parse_provenance(snippet)
+    if provenance:
+        return f"{provenance['file']}|{provenance['class'] or ''}#{provenance['method'] or ''}"
+    return "sha256:" + hashlib.sha256(snippet.encode("utf-8")).hexdigest()[:16]
+
+
+def log_fingerprint(logs):
+    """The logs with volatile tokens masked and repeated lines dropped, within the embedding input limit."""
+    lines = dict.fromkeys(normalize_log_text(line) for line in log_lines(logs))
+    return truncate_tokens("\n".join(line for line in lines if line), MAX_INPUT_TOKENS - 100)
+
+
+def jaccard(a, b):
+    a, b = set(a), set(b)
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+class AnswerCache:
+    """Persistent cache of debugging analyses, looked up exactly and by similarity.
+
+    The exact key hashes the chat model, the normalized log fingerprint and the keys of
+    the code chunks sent with it. Past that, the fingerprint's embedding is compared with
+    every cached one (a small in-memory matrix), so a near-duplicate incident retrieving
+    mostly the same chunks gets the earlier answer. Entries expire after `ttl_seconds`;
+    past `max_entries`, the least recently used are evicted.
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, ttl_seconds=ANSWER_TTL_SECONDS, max_entries=MAX_ANSWERS,
+                 similarity=SIMILARITY_THRESHOLD, min_chunk_overlap=MIN_CHUNK_OVERLAP, model=CHAT_MODEL):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.min_chunk_overlap = min_chunk_overlap
+        self.model = model
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evicted = 0
+        self.seconds_saved = 0.0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, chunks TEXT, error_message TEXT, answer TEXT, "
+            "seconds REAL, dim INTEGER, vector BLOB, created REAL, last_used REAL, hits INTEGER)"
+        )
+        self._db.commit()
+        # Unit vector, chunk keys and creation time of every entry, for the similarity lookup
+        self._entries = {
+            key: (np.frombuffer(vector, dtype=np.float32).reshape(dim), json.loads(chunks), created)
+            for key, chunks, dim, vector, created in self._db.execute(
+                "SELECT key, chunks, dim, vector, created FROM answers")
+        }
+        self._matrix = None
+
+    def _probe(self, fingerprint, code, vector):
+        chunks = sorted({chunk_key(snippet) for snippet in code or []})
+        key = hashlib.sha256(f"{self.model}\0{fingerprint}\0{json.dumps(chunks)}".encode("utf-8")).hexdigest()
+        vector = np.asarray(vector, dtype=np.float32)
+        return Probe(key, fingerprint, chunks, vector / (np.linalg.norm(vector) or 1.0))
+
+    def probe(self, logs, code, embedder=None):
+        """Fingerprints a request; the embedding goes through the query-embedding cache."""
+        fingerprint = log_fingerprint(logs)
+        return self._probe(fingerprint, code, get_query_cache().embed(fingerprint, embedder=embedder))
+
+    async def probe_async(self, logs, code, embedder=None):
+        """`probe` for the async request path; fingerprinting (a full tokenization) runs in a worker thread."""
+        fingerprint = await asyncio.to_thread(log_fingerprint, logs)
+        vector = await get_query_cache().embed_async(fingerprint, embedder=embedder)
+        return self._probe(fingerprint, code, vector)
+
+    def _expired(self, key, now):
+        return now - self._entries[key][2] > self.ttl_seconds
+
+    def _nearest(self, probe, now):
+        """(key, similarity) of the closest unexpired cached entry sharing enough chunks, or (None, 0)."""
+        if not self._entries:
+            return None, 0.0
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key][0] for key in self._keys])
+        if self._matrix.shape[1] != probe.vector.shape[0]:
+            return None, 0.0
+        similarities = self._matrix @ probe.vector
+        for position in np.argsort(-similarities):
+            if similarities[position] < self.similarity:
+                break
+            key = self._keys[position]
+            # Expired entries stay in the matrix until the next store purges them; a fresher one may follow
+            if self._expired(key, now):
+                continue
+            if jaccard(self._entries[key][1], probe.chunks) >= self.min_chunk_overlap:
+                return key, float(similarities[position])
+        return None, 0.0
+
+    def lookup(self, probe):
+        """The cached analysis for a request, with its provenance and age, or None."""
+        with self._lock:
+            now = time.time()
+            match, key, similarity = "exact", probe.key, 1.0
+            if key in self._entries and self._expired(key, now):
+                self._delete([key])
+                self._db.commit()
+                self.evicted += 1
+            if key not in self._entries:
+                match, (key, similarity) = "similar", self._nearest(probe, now)
+            row = self._db.execute(
+                "SELECT chunks, error_message, answer, seconds, created, hits FROM answers WHERE key = ?", (key,)
+            ).fetchone() if key else None
+            if row is None:
+                self.misses += 1
+                return None
+            chunks, error_message, answer, seconds, created, hits = row
+            self._db.execute("UPDATE answers SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self._db.commit()
+            if match == "exact":
+                self.exact_hits += 1
+            else:
+                self.similar_hits += 1
+            self.seconds_saved += seconds
+        return {
+            "answer": answer,
+            "match": match,
+            "similarity": round(similarity, 4),
+            "key": key[:12],
+            "created_at": datetime.fromtimestamp(created, timezone.utc).isoformat(timespec="seconds"),
+            "age_seconds": round(now - created),
+            "hits": hits + 1,
+            "error_message": error_message,
+            "chunks": json.loads(chunks),
+            "generated_seconds": round(seconds, 2),
+        }
+
+    def bypass(self):
+        """Counts a request that skipped the lookup to force a fresh analysis."""
+        with self._lock:
+            self.bypasses += 1
+
+    def store(self, probe, answer, error_message="", seconds=0.0):
+        """Caches an analysis (replacing any under the same key), then applies TTL and size limits."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (probe.key, json.dumps(probe.chunks), error_message, answer, seconds, probe.vector.shape[0],
+                 probe.vector.tobytes(), now, now),
+            )
+            self._entries[probe.key] = (probe.vector, probe.chunks, now)
+            self._matrix = None
+            expired = [key for (key,) in self._db.execute(
+                "SELECT key FROM answers WHERE created < ?", (now - self.ttl_seconds,))]
+            excess = len(self._entries) - len(expired) - self.max_entries
+            oldest = [key for (key,) in self._db.execute(
+                "SELECT key FROM answers WHERE created >= ? ORDER BY last_used ASC LIMIT ?",
+                (now - self.ttl_seconds, max(0, excess)))]
+            self._delete(expired + oldest)
+            self.evicted += len(expired) + len(oldest)
+            self._db.commit()
+
+    def _delete(self, keys):
+        if not keys:
+            return
+        self._db.executemany("DELETE FROM answers WHERE key = ?", [(key,) for key in keys])
+        for key in keys:
+            self._entries.pop(key, None)
+        self._matrix = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.exact_hits + self.similar_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 3) if lookups else 0.0,
+                "seconds_saved": round(self.seconds_saved, 1),
+                "entries": len(self._entries),
+                "evicted": self.evicted,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """The process-wide cache used by /debug, opened on first use."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = AnswerCache()
+    return _default_cache
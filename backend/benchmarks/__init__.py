@@ -0,0 +1 @@
+"""Offline benchmarks for the backend; run from `backend/` as `python -m benchmarks.<name>`."""
@@ -0,0 +1,112 @@
+"""Recall / latency benchmark of the ANN index types in `ann_index`.
+
+Builds every index type over the same vectors and reports, per type and search setting,
+recall@k against exact (flat) search with the same metric, p50/p99 single-query latency,
+build time and index size (serialized bytes, which is what a worker maps or loads).
+
+Vectors are synthetic by default: clustered like real embeddings, in a low-rank
+subspace plus noise, with queries drawn from the same distribution. `--store`
+benchmarks a real vector store (`java_embeddings` next to the index) instead; queries
+are then stored vectors with noise added. Builds use every FAISS thread, searches
+`--threads` (one, like a single request, by default).
+
+    python -m benchmarks.ann --vectors 100000 --metric cosine
+    python -m benchmarks.ann --store java_embeddings
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import build_ann_index, search
+
+# (index type, search setting) pairs: efSearch for HNSW, nprobe for IVF
+SETTINGS = [
+    ("flat", None),
+    ("hnsw", 16), ("hnsw", 64), ("hnsw", 256),
+    ("ivf_flat", 4), ("ivf_flat", 16), ("ivf_flat", 64),
+    ("ivf_pq", 16), ("ivf_pq", 64),
+]
+
+
+def synthetic_vectors(n, dim, rng, clusters=256, rank=64):
+    """Embedding-like vectors: Gaussian clusters in a `rank`-dim subspace, plus isotropic noise."""
+    basis = rng.standard_normal((rank, dim)).astype(np.float32)
+    centers = rng.standard_normal((clusters, rank)).astype(np.float32) * 3
+    assignment = rng.integers(0, clusters, n)
+    vectors = (centers[assignment] + rng.standard_normal((n, rank)).astype(np.float32)) @ basis
+    return vectors + rng.standard_normal((n, dim)).astype(np.float32) * 0.5
+
+
+def store_vectors(prefix):
+    from vector_store import VectorStore
+
+    store = VectorStore(prefix)
+    vectors = np.array(store.vectors, dtype=np.float32)
+    store.close()
+    return vectors
+
+
+def recall(found, truth):
+    """Mean fraction of the true k nearest neighbours each query found."""
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def latencies(index, queries, k, nprobe, ef_search):
+    """Per-query latency, one query at a time, as the /code endpoint searches."""
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        search(index, query, k, nprobe=nprobe, ef_search=ef_search)
+        timings.append(time.perf_counter() - started)
+    return np.array(timings) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", choices=("l2", "cosine"), default="cosine")
+    parser.add_argument("--store", help="Benchmark the vectors of this store prefix instead of synthetic ones")
+    parser.add_argument("--threads", type=int, default=1, help="FAISS threads (1 matches one request per worker)")
+    args = parser.parse_args()
+
+    build_threads = faiss.omp_get_max_threads()
+    rng = np.random.default_rng(0)
+    if args.store:
+        vectors = store_vectors(args.store)
+        noise = rng.standard_normal((args.queries, vectors.shape[1])).astype(np.float32) * vectors.std() * 0.5
+        queries = vectors[rng.integers(0, len(vectors), args.queries)] + noise
+    else:
+        vectors = synthetic_vectors(args.vectors + args.queries, args.dim, rng)
+        vectors, queries = vectors[:args.vectors], vectors[args.vectors:]
+    ids = np.arange(len(vectors), dtype=np.int64)
+    source = f"store `{args.store}`" if args.store else "synthetic"
+    print(f"📊 {len(vectors)} × {vectors.shape[1]} {source} vectors, {args.queries} queries, "
+          f"recall@{args.k}, {args.metric}, {args.threads} thread(s)")
+
+    indexes = {}
+    truth = None
+    print(f"   {'index':<9} {'setting':<12} {'build s':>8} {'size MB':>8} {'recall':>7} {'p50 ms':>7} {'p99 ms':>7}")
+    for index_type, setting in SETTINGS:
+        if index_type not in indexes:
+            faiss.omp_set_num_threads(build_threads)
+            started = time.perf_counter()
+            index = build_ann_index(vectors, ids, index_type, args.metric)
+            indexes[index_type] = (index, time.perf_counter() - started, faiss.serialize_index(index).nbytes)
+            faiss.omp_set_num_threads(args.threads)
+        index, build_seconds, size = indexes[index_type]
+        nprobe = setting if index_type.startswith("ivf") else None
+        ef_search = setting if index_type == "hnsw" else None
+
+        # Batch search for recall, single queries for latency
+        _, found = search(index, queries, args.k, nprobe=nprobe, ef_search=ef_search)
+        if truth is None:
+            truth = found  # flat comes first: exact neighbours
+        timings = latencies(index, queries, args.k, nprobe, ef_search)
+        label = "exact" if setting is None else ("efSearch " if ef_search else "nprobe ") + str(setting)
+        print(f"   {index_type:<9} {label:<12} {build_seconds:8.1f} {size / 2 ** 20:8.1f} {recall(found, truth):7.3f} "
+              f"{np.percentile(timings, 50):7.2f} {np.percentile(timings, 99):7.2f}")
@@ -0,0 +1,62 @@
+"""Compares one Logs Insights query with fixed 2s polling against sharded, adaptively polled queries.
+
+Runs against `FakeLogsClient`, which makes each query take `--query-latency` seconds plus
+`--latency-per-event` for every event in its time range (Insights scan cost), and caps
+results at 10,000 rows like the real service.
+
+    python -m benchmarks.cloudwatch --hours 24 --events 200000
+"""
+import argparse
+import time
+
+import log_retrieval
+from fakes import FakeLogsClient, synthetic_log_events
+
+START_MS = 1739145600000  # 2025-02-10 00:00 UTC
+
+
+def single_query(logs_client, start_time, end_time, query_string):
+    """The pre-sharding behaviour: one query, polled every 2 seconds."""
+    query_id = logs_client.start_query(logGroupName="bench", startTime=start_time, endTime=end_time,
+                                       queryString=query_string)["queryId"]
+    while True:
+        result = logs_client.get_query_results(queryId=query_id)
+        if result["status"] in ["Complete", "Failed", "Cancelled"]:
+            return result["results"]
+        time.sleep(2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--query-latency", type=float, default=0.5)
+    parser.add_argument("--latency-per-event", type=float, default=0.00002)
+    parser.add_argument("--concurrency", type=int, default=log_retrieval.MAX_CONCURRENT_QUERIES)
+    args = parser.parse_args()
+
+    seconds = int(args.hours * 3600)
+    interval_ms = max(1, seconds * 1000 // args.events)
+    events = list(synthetic_log_events(args.events, START_MS, error_every=50, interval_ms=interval_ms))
+    start_time, end_time = START_MS // 1000, START_MS // 1000 + seconds - 1
+    query_string = f'''
+        fields @timestamp
+        | filter @logStream like "qa_aro-service" and @message like "QueryComposerFactory"
+        | sort @timestamp asc
+        | limit {log_retrieval.MAX_QUERY_RESULTS}
+    '''
+    expected = args.events // 50
+    print(f"📊 {args.events} events over {args.hours}h, {expected} matching lines")
+
+    for label, run in (
+        ("single query, 2s polls", lambda c: single_query(c, start_time, end_time, query_string)),
+        ("sharded, adaptive polls", lambda c: log_retrieval.run_sharded_query(
+            c, "bench", start_time, end_time, query_string, max_concurrency=args.concurrency)),
+    ):
+        logs_client = FakeLogsClient(events, query_latency=args.query_latency,
+                                     latency_per_event=args.latency_per_event)
+        started = time.perf_counter()
+        rows = run(logs_client)
+        elapsed = time.perf_counter() - started
+        print(f"📊 {label:<24} {elapsed:7.2f}s  {len(rows):>7} rows ({len(rows) / expected:.0%} of matches)  "
+              f"{logs_client.queries:>4} queries  {logs_client.polls:>5} polls")
@@ -0,0 +1,76 @@
+"""Throughput and memory of the error template miner over millions of log lines.
+
+Streams `--lines` synthetic log lines drawn from `--templates` templates (variables
+filled in at random, thread names varying) through `TemplateMiner`, without keeping the
+lines, and reports lines/sec, the clusters found and peak RSS at checkpoints. With more
+templates than `--max-clusters`, the least recently seen clusters are evicted and
+memory stays flat.
+
+    python -m benchmarks.clustering --lines 1000000 --templates 200
+"""
+import argparse
+import random
+import resource
+import time
+
+from log_clustering import TemplateMiner
+
+VERBS = ["compose", "load", "save", "plan", "route", "price", "merge", "split", "index", "render"]
+NOUNS = ["query", "library", "edge", "polygon", "tile", "plan", "service area", "fiber route", "location", "report"]
+
+
+def class_name(i):
+    """Distinct class names without digits (Drain routes tokens with digits as variables)."""
+    letters = ""
+    while True:
+        letters = chr(ord("a") + i % 26) + letters
+        i //= 26
+        if not i:
+            return f"Component{letters.capitalize()}"
+
+
+def templates(n, rng):
+    """`n` distinct error templates with `{}` slots for variables."""
+    shapes = [
+        "ERROR c.a.aro.{pkg}.{cls} - Failed to {verb} {noun} {{}} after {{}} retries",
+        "ERROR c.a.aro.{pkg}.{cls} - {noun} {{}} not found while trying to {verb}",
+        "WARN c.a.aro.{pkg}.{cls} - Slow {verb} of {noun}: {{}} ms (limit {{}} ms)",
+        "ERROR c.a.aro.{pkg}.{cls} - Could not {verb} {noun} for user {{}}: connection refused by {{}}",
+    ]
+    return [rng.choice(shapes).format(pkg=rng.choice(["vt.gao", "plan", "service", "util"]), cls=class_name(i),
+                                      verb=rng.choice(VERBS), noun=rng.choice(NOUNS)) for i in range(n)]
+
+
+def lines(count, shapes, rng):
+    for i in range(count):
+        shape = shapes[min(int(rng.expovariate(8 / len(shapes))), len(shapes) - 1)]  # A few dominate, as in incidents
+        message = shape.format(rng.randint(1, 10 ** 6), rng.choice(["db-primary", "db-replica", "bob", "alice", "42"]))
+        yield i * 10, f"16:{i // 60000 % 60:02d}:{i // 1000 % 60:02d}.{i % 1000:03d} [http-nio-8080-exec-{i % 20}] {message}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--templates", type=int, default=200)
+    parser.add_argument("--max-clusters", type=int, default=1000)
+    parser.add_argument("--checkpoints", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    shapes = templates(args.templates, rng)
+    miner = TemplateMiner(max_clusters=args.max_clusters)
+    every = max(1, args.lines // args.checkpoints)
+    print(f"📊 {args.lines} lines from {args.templates} templates, at most {args.max_clusters} clusters kept")
+
+    started = time.perf_counter()
+    for ms, line in lines(args.lines, shapes, rng):
+        miner.add(line, ms)
+        if miner.lines % every == 0:
+            elapsed = time.perf_counter() - started
+            peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"   {miner.lines:>10} lines  {miner.lines / elapsed:9.0f} lines/s  "
+                  f"{len(miner):>5} clusters  {miner.evicted:>6} evicted  peak RSS {peak_mb:6.1f} MB")
+
+    print("📊 Top clusters:")
+    for cluster in miner.top(5):
+        print(f"   {cluster.count:>8}×  {' '.join(cluster.template)[:110]}")
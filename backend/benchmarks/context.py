@@ -0,0 +1,82 @@
+"""Streaming context extraction against the materialize-then-slice implementation it replaces.
+
+Generates `--lines` synthetic log records in which `--hit-rate` of the lines match one
+of `--patterns` error messages, then extracts ±`--context` lines around every match two
+ways: the old way (every record kept in a list, one substring check per pattern per line,
+a fixed slice per match) and `log_context.extract_contexts`. Reports lines/sec, the
+tracemalloc peak, and how many lines each emitted (the slices repeat lines where
+windows overlap).
+
+    python -m benchmarks.context --lines 1000000 --patterns 1 --patterns 50
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from log_context import extract_contexts, PatternMatcher
+
+WORDS = ["query", "tile", "edge", "plan", "route", "cache", "library", "polygon", "render", "commit"]
+
+
+def records(count, errors, hit_rate, seed=0):
+    """Container-log style records; matching lines come in small bursts, as failures do.
+
+    Messages are drawn from pre-built pools, so generating a record costs little next to extracting it.
+    """
+    rng = random.Random(seed)
+    noise = [f"DEBUG c.a.aro.vt.gao.QueryComposer - {' '.join(rng.choices(WORDS, k=12))}" for _ in range(4096)]
+    failures = [f"ERROR {rng.choice(errors)} while loading {rng.choice(WORDS)} {rng.randint(1, 10 ** 6)}"
+                for _ in range(1024)]
+    burst = 0
+    for i in range(count):
+        if burst or rng.random() < hit_rate / 3:
+            burst = burst - 1 if burst else rng.randint(0, 4)
+            message = failures[i % 1024]
+        else:
+            message = noise[i % 4096]
+        yield {"timestamp": i, "log": message}
+
+
+def materialized(stream, patterns, context):
+    """The previous implementation: list every record, then slice ±context around each match."""
+    all_logs = list(stream)
+    error_indices = [i for i, log in enumerate(all_logs) if any(pattern in log["log"] for pattern in patterns)]
+    return [all_logs[max(0, i - context):i + context + 1] for i in error_indices]
+
+
+def streamed(stream, patterns, context):
+    return [window.lines for window in extract_contexts(stream, PatternMatcher(patterns), context, context,
+                                                         text=lambda log: log["log"])]
+
+
+def measure(extract, count, errors, patterns, hit_rate, context):
+    """(seconds, peak traced bytes, windows, lines emitted); timed and traced in separate runs."""
+    started = time.perf_counter()
+    windows = extract(records(count, errors, hit_rate), patterns, context)
+    elapsed = time.perf_counter() - started
+    del windows
+    tracemalloc.start()
+    windows = extract(records(count, errors, hit_rate), patterns, context)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(windows), sum(map(len, windows))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--patterns", type=int, action="append", help="Pattern counts to run (repeatable)")
+    parser.add_argument("--hit-rate", type=float, default=0.002)
+    parser.add_argument("--context", type=int, default=5)
+    args = parser.parse_args()
+
+    for count in args.patterns or [1, 50]:
+        patterns = [f"Failed to compose {WORDS[i % len(WORDS)]} step {i}" for i in range(count)]
+        errors = patterns[:max(1, count // 5)] + ["NullPointerException in tile renderer"]
+        print(f"📊 {args.lines} lines, {count} pattern(s), ±{args.context} lines of context")
+        for name, extract in [("materialized", materialized), ("streamed", streamed)]:
+            elapsed, peak, windows, emitted = measure(extract, args.lines, errors, patterns, args.hit_rate,
+                                                      args.context)
+            print(f"   {name:<13} {args.lines / elapsed:10.0f} lines/s  peak {peak / 2 ** 20:8.1f} MB  "
+                  f"{windows:>6} windows  {emitted:>8} lines emitted")
@@ -0,0 +1,55 @@
+"""Compares one-chunk-per-request embedding with packed, concurrent requests.
+
+Runs entirely offline against `FakeEmbedder`, which charges a fixed latency per
+request (the network round trip) plus a small per-token cost.
+
+    python -m benchmarks.embedding --chunks 2000 --latency 0.05
+"""
+import argparse
+import random
+import time
+
+from embedder import embed_texts
+from fakes import FakeEmbedder
+
+WORDS = ["public", "class", "void", "return", "new", "final", "String", "List", "Map", "if", "else",
+         "for", "null", "this", "throw", "try", "catch", "private", "static", "int", "long", "query"]
+
+
+def synthetic_chunks(n, words_per_chunk=300, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_chunk)) + f" // chunk {i}" for i in range(n)]
+
+
+def run(label, chunks, **kwargs):
+    embedder = FakeEmbedder(dim=kwargs.pop("dim"), latency=kwargs.pop("latency"),
+                            latency_per_token=kwargs.pop("latency_per_token"),
+                            rate_limit_every=kwargs.pop("rate_limit_every"))
+    start = time.perf_counter()
+    vectors = embed_texts(chunks, embedder=embedder, **kwargs)
+    elapsed = time.perf_counter() - start
+    done = sum(v is not None for v in vectors)
+    print(f"📊 {label:<22} {done:>6} chunks  {embedder.requests:>5} requests  "
+          f"{elapsed:8.2f}s  {done / elapsed:10.1f} chunks/s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--latency-per-token", type=float, default=0.000002)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--request-tokens", type=int, default=60000)
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks)
+    fake = dict(dim=args.dim, latency=args.latency, latency_per_token=args.latency_per_token,
+                rate_limit_every=args.rate_limit_every)
+
+    sequential = run("sequential (1/request)", chunks, max_request_inputs=1, max_workers=1, **fake)
+    batched = run("packed + concurrent", chunks, max_request_tokens=args.request_tokens,
+                  max_workers=args.workers, **fake)
+    print(f"🚀 Speed-up: {sequential / batched:.1f}x")
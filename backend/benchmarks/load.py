@@ -0,0 +1,138 @@
+"""Load test: blocking endpoints on the threadpool vs. the async request path.
+
+Drives `--users` concurrent clients through the /logs → /code → /debug flow the UI runs,
+in process over httpx's ASGI transport, against local stubs: `FakeLogsClient` for
+CloudWatch (`--query-latency` per query) and `FakeOpenAIClient` for embeddings and chat
+(`--embedding-latency`, `--chat-latency`). Reports requests/sec and p50/p99 latency.
+
+The blocking variant mirrors the previous `def` endpoints; the async one is `main.app`.
+
+    python -m benchmarks.load --users 50 --rounds 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import string
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import faiss
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+import embedder
+import log_retrieval
+from code_retrieval import search_code
+from fakes import AsyncFakeLogsClient, FakeLogsClient, FakeOpenAIClient, synthetic_log_events
+from llm_debugging import ask_gpt
+from vector_store import write_store
+
+START_MS = 1739205900000  # 2025-02-10 16:45 UTC
+LOGS_PARAMS = {
+    "log_group": "bench", "log_stream": "qa_aro-service", "error_message": "QueryComposerFactory",
+    "start_time": "2025-02-10T16:45", "end_time": "2025-02-10T16:55", "use_cache": "false",
+}
+
+
+def build_fixture(n=5000, dim=1536):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    ids = np.arange(n, dtype=np.int64)
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(dim))
+    index.add_with_ids(vectors, ids)
+    faiss.write_index(index, "java_embeddings.index")
+    write_store("java_embeddings", ids, vectors, [f"class Synthetic{i} {{}}" for i in ids])
+
+
+def blocking_app(events, args):
+    """The previous request path: `def` endpoints holding a threadpool worker for every wait."""
+    app = FastAPI()
+    openai_client = FakeOpenAIClient(args.embedding_latency, args.chat_latency)
+
+    @app.get("/logs")
+    def fetch_logs(log_group: str, log_stream: str, start_time: str, end_time: str, error_message: str = "",
+                   use_cache: bool = True):
+        start = int(datetime.strptime(start_time, "%Y-%m-%dT%H:%M").replace(tzinfo=timezone.utc).timestamp())
+        end = int(datetime.strptime(end_time, "%Y-%m-%dT%H:%M").replace(tzinfo=timezone.utc).timestamp())
+        logs_client = FakeLogsClient(events, query_latency=args.query_latency)
+        return {"logs": log_retrieval.get_logs_with_context(log_group, start, end, error_message, log_stream,
+                                                            logs_client=logs_client, use_cache=use_cache)}
+
+    @app.post("/code")
+    def fetch_code(logs: list[str]):
+        return {"code": search_code("\n".join(logs), embedder=embedder.OpenAIEmbedder(client=openai_client))}
+
+    @app.post("/debug")
+    def fetch_debug_info(request: dict):
+        return {"debug_info": ask_gpt(request["logs"], request["code"], client=openai_client)}
+
+    return app
+
+
+def async_app(events, args):
+    import main
+
+    # The module-level pooled clients, pointed at the stubs
+    log_retrieval.async_client = AsyncFakeLogsClient(events, query_latency=args.query_latency)
+    embedder._async_client = FakeOpenAIClient(args.embedding_latency, args.chat_latency, asynchronous=True)
+    return main.app
+
+
+async def user(client, rounds, latencies, rng):
+    for _ in range(rounds):
+        started = time.perf_counter()
+        logs = (await client.get("/logs", params=LOGS_PARAMS)).json()["logs"]
+        latencies["logs"].append(time.perf_counter() - started)
+
+        # A distinct word per request keeps the query-embedding cache from answering
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(12))
+        started = time.perf_counter()
+        code = (await client.post("/code", json=logs + [word])).json()["code"]
+        latencies["code"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        response = await client.post("/debug", json={"logs": logs, "code": code})
+        assert "debug_info" in response.json(), response.text
+        latencies["debug"].append(time.perf_counter() - started)
+
+
+async def load(app, users, rounds):
+    latencies = {"logs": [], "code": [], "debug": []}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(user(client, rounds, latencies, random.Random()) for _ in range(users)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies
+
+
+def report(label, elapsed, latencies):
+    every = [latency for values in latencies.values() for latency in values]
+    print(f"📊 {label:<22} {len(every) / elapsed:7.1f} req/s  "
+          f"p50 {np.percentile(every, 50) * 1000:7.0f} ms  p99 {np.percentile(every, 99) * 1000:7.0f} ms")
+    for endpoint, values in latencies.items():
+        print(f"     {endpoint:<6} p50 {np.percentile(values, 50) * 1000:7.0f} ms  "
+              f"p99 {np.percentile(values, 99) * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--events", type=int, default=6000)
+    parser.add_argument("--query-latency", type=float, default=0.3)
+    parser.add_argument("--embedding-latency", type=float, default=0.1)
+    parser.add_argument("--chat-latency", type=float, default=1.0)
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp(prefix="load-bench-"))
+    build_fixture()
+    events = list(synthetic_log_events(args.events, START_MS, error_every=500, interval_ms=600000 // args.events))
+    print(f"📊 {args.users} users × {args.rounds} rounds of /logs → /code → /debug")
+
+    for label, make_app in (("blocking (threadpool)", blocking_app), ("async", async_app)):
+        elapsed, latencies = asyncio.run(load(make_app(events, args), args.users, args.rounds))
+        report(label, elapsed, latencies)
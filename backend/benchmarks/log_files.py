@@ -0,0 +1,108 @@
+"""Throughput of the local log file source, in GB/s.
+
+Writes `--mb` MB of Docker json-file container logs (one line per 10 ms, a rare error
+mixed in) and a gzip copy of the first `--gzip-mb` MB, then times:
+
+- match scans of the whole file (`LocalLogSource.error_rows`), with 1 worker and
+  with `--workers` processes;
+- a scan of a one-minute window in the middle, which binary-searches its way there;
+- parsing every line (`records`) into `log_context.extract_contexts`;
+- a match scan of the gzip file.
+
+    python -m benchmarks.log_files --mb 1024 --workers 8
+"""
+import argparse
+import gzip
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from log_context import extract_contexts
+from log_files import LocalLogSource
+
+ERROR = "Failed to compose query for library"
+START = datetime(2025, 2, 10, 0, 0, tzinfo=timezone.utc)
+
+
+def write_logs(path, megabytes, seed=0):
+    """Writes container log lines until the file holds `megabytes` MB; returns the number of lines."""
+    rng = random.Random(seed)
+    words = ["query", "tile", "edge", "plan", "route", "cache", "library", "polygon", "render", "commit"]
+    messages = [f"16:46:09.244 [main] DEBUG c.a.aro.vt.gao.QueryComposer - {' '.join(rng.choices(words, k=14))}"
+                for _ in range(1000)]
+    lines, size = 0, 0
+    with open(path, "w", encoding="utf-8") as f:
+        while size < megabytes * 2 ** 20:
+            batch = []
+            for _ in range(10000):
+                stamp = (START + timedelta(milliseconds=10 * lines)).strftime("%Y-%m-%dT%H:%M:%S.%f")
+                message = f"ERROR {ERROR} {lines}" if rng.random() < 0.0005 else messages[lines % 1000]
+                batch.append(f'{{"log":"{message}\\n","stream":"stdout","time":"{stamp}123Z"}}\n')
+                lines += 1
+            text = "".join(batch)
+            f.write(text)
+            size += len(text)
+    return lines
+
+
+def timed(label, size, function):
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    print(f"   {label:<34} {elapsed:8.3f} s  {size / elapsed / 2 ** 30:6.2f} GB/s")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mb", type=int, default=512)
+    parser.add_argument("--gzip-mb", type=int, default=128)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="log-files-bench-")
+    try:
+        path = os.path.join(root, "qa_aro-service.log")
+        lines = write_logs(path, args.mb)
+        size = os.path.getsize(path)
+        end_ms = int((START + timedelta(milliseconds=10 * lines)).timestamp() * 1000)
+        start_ms = int(START.timestamp() * 1000)
+        print(f"📊 {lines} lines, {size / 2 ** 20:.0f} MB, {os.cpu_count()} CPU(s)")
+
+        single = LocalLogSource(root, workers=1)
+        rows = timed("match scan, 1 process", size, lambda: single.error_rows(None, "qa_aro-service.log", ERROR,
+                                                                               start_ms, end_ms))
+        pool = LocalLogSource(root, workers=args.workers, parallel_min_bytes=0)
+        pool.get_pool().submit(len, "").result()  # Workers start outside the timing
+        parallel = timed(f"match scan, {args.workers} processes", size,
+                         lambda: pool.error_rows(None, "qa_aro-service.log", ERROR, start_ms, end_ms))
+        assert [row["ms"] for row in parallel] == [row["ms"] for row in rows]
+        pool.close()
+        print(f"   {len(rows)} matching lines")
+
+        middle = (start_ms + end_ms) // 2
+        started = time.perf_counter()
+        window = single.error_rows(None, "qa_aro-service.log", ERROR, middle, middle + 60000)
+        print(f"   one-minute window scan             {(time.perf_counter() - started) * 1000:8.2f} ms  "
+              f"({len(window)} matches)")
+
+        windows = timed("parse every line + extract contexts", size, lambda: sum(
+            1 for _ in extract_contexts(single.records(None, "qa_aro-service.log", start_ms, end_ms), ERROR,
+                                        text=lambda row: row["log"])))
+        print(f"   {windows} context windows")
+
+        gzip_path = os.path.join(root, "qa_aro-service-gz.log.gz")
+        with open(path, "rb") as source:
+            head = source.read(args.gzip_mb * 2 ** 20)
+        head = head[:head.rfind(b"\n") + 1]
+        with gzip.open(gzip_path, "wb", compresslevel=1) as target:
+            target.write(head)
+        gzip_size = len(head)
+        del head
+        timed("gzip match scan (uncompressed)", gzip_size,
+              lambda: single.error_rows(None, "qa_aro-service-gz", ERROR, start_ms, end_ms))
+    finally:
+        shutil.rmtree(root)
@@ -0,0 +1,254 @@
+"""End-to-end benchmark of the /logs → /code → /debug pipeline and of indexing, fully offline.
+
+Each stage runs against the stand-ins in `fakes`, at every size given:
+
+- logs:  `get_error_clusters_async` over `--log-lines` synthetic container log lines held
+         by a fake Logs Insights client (`--query-latency` per query), one error per 1,000 lines;
+- index: `embed_java_v2.build_index` of a synthetic Java tree of `--chunks` method chunks,
+         embedded by the deterministic `FakeEmbedder` (`--embedding-latency` per request);
+- code:  `search_code` over that index, for stack traces, logback lines and free text;
+- debug: `ask_gpt` on the largest logs and code results, with a canned chat model
+         (`--chat-latency`).
+
+Reports p50 / p95 / p99 latency, throughput and the tracemalloc peak of a separate
+traced run per stage and size (allocations by FAISS's C++ code are not traced; the
+process peak RSS is printed at the end). `--output` saves the results as JSON; with
+`--baseline`, stages whose p50 or peak memory grew more than `--tolerance` are flagged
+and the exit status is 1, so a CI job can catch regressions before deploy.
+
+Vectors are `--dim` wide (256 by default: a million 1536-wide vectors need 6 GB), and
+10M log lines need about 4 GB of RAM for the fake client's events.
+
+    python -m benchmarks.pipeline --log-lines 1000 --log-lines 1000000 --chunks 1000 --chunks 100000
+    python -m benchmarks.pipeline --output after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import code_retrieval
+from benchmarks.symbols import PACKAGES, log_texts
+from embed_java_v2 import build_index
+from fakes import AsyncFakeLogsClient, FakeEmbedder, FakeOpenAIClient, synthetic_log_events
+from llm_debugging import ask_gpt
+from log_retrieval import format_clusters, get_error_clusters_async
+
+START_MS = 1739145600000  # 2025-02-10 00:00 UTC
+ERROR_TEXT = "ERROR c.a.aro.vt.gao.QueryComposerFactory - query failed"
+METHODS_PER_CLASS = 8
+
+
+def write_sources(root, chunks, seed=0):
+    """Writes Java classes of METHODS_PER_CLASS methods, each large enough to be its own chunk.
+
+    Returns (package, class, [(method, first line)]) per file, the layout `benchmarks.symbols.log_texts` takes.
+    """
+    rng = random.Random(seed)
+    layout = []
+    for i in range(max(1, chunks // METHODS_PER_CLASS)):
+        package = PACKAGES[i % len(PACKAGES)]
+        name = f"Query{rng.choice(['Composer', 'Planner', 'Loader', 'Mapper'])}{i}"
+        lines = [f"package {package};", "", "import java.util.List;", "", f"public class {name} {{"]
+        methods = []
+        for j in range(METHODS_PER_CLASS):
+            methods.append((f"step{j}", len(lines) + 1))
+            lines.append(f"  public String step{j}(List<String> rows, int limit, String libraryId) {{")
+            for k in range(3):
+                lines.append(f"    String sql{k} = \"SELECT f.id, f.geom, f.length_meters FROM aro.edge_{i}_{j}_{k} f "
+                             f"WHERE f.library_id = \" + libraryId + \" AND f.size > \" + (limit * {k + 1});")
+            lines += ["    for (String row : rows) { sql0 = sql0 + row.trim(); }", "    return sql0;", "  }"]
+        lines.append("}")
+        directory = os.path.join(root, *package.split("."))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{name}.java"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        layout.append((package, name, methods))
+    return layout
+
+
+def traced_peak(function):
+    """Bytes allocated at the peak of one traced call of `function`."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def result(stage, size, seconds, units, unit, peak):
+    p50 = float(np.percentile(seconds, 50))
+    return {
+        "stage": stage, "size": size,
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(float(np.percentile(seconds, 95)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(seconds, 99)) * 1000, 3),
+        "throughput": round(units / p50, 1) if p50 else None, "unit": unit,
+        "peak_mb": round(peak / 2 ** 20, 1) if peak is not None else None,
+    }
+
+
+def report(row):
+    peak = f"{row['peak_mb']:8.1f} MB" if row["peak_mb"] is not None else "       -   "
+    print(f"   {row['stage']:<6} {row['size']:>9}  p50 {row['p50_ms']:10.2f} ms  p95 {row['p95_ms']:10.2f} ms  "
+          f"p99 {row['p99_ms']:10.2f} ms  {row['throughput']:>12,.0f} {row['unit']:<10} peak {peak}")
+
+
+def bench_logs(lines, args):
+    """Times `--repeats` cluster + context retrievals over the whole window; returns (row, clusters)."""
+    events = list(synthetic_log_events(lines, START_MS, error_every=1000, error_text=ERROR_TEXT))
+    start_time, end_time = START_MS // 1000, (START_MS + lines * 10) // 1000
+
+    def run():
+        client = AsyncFakeLogsClient(events, query_latency=args.query_latency)
+        return asyncio.run(get_error_clusters_async("bench", start_time, end_time, "QueryComposerFactory",
+                                                    "qa_aro-service", logs_client=client, use_cache=False))
+
+    seconds, clusters = [], None
+    for _ in range(args.repeats):
+        started = time.perf_counter()
+        clusters = run()
+        seconds.append(time.perf_counter() - started)
+    peak = traced_peak(run) if args.memory else None
+    return result("logs", lines, seconds, lines, "lines/s", peak), clusters
+
+
+def bench_index(chunks, args, root):
+    """Builds the index from scratch in a fresh directory per run and leaves the last one as the working directory."""
+    sources = os.path.join(root, f"src-{chunks}")
+    layout = write_sources(sources, chunks)
+    runs = iter(range(args.repeats + 1))
+
+    def run():
+        directory = os.path.join(root, f"index-{chunks}-{next(runs)}")
+        os.makedirs(directory)
+        os.chdir(directory)
+        return build_index(sources, embedder=FakeEmbedder(dim=args.dim, latency=args.embedding_latency),
+                           index_type=args.index_type)
+
+    peak = traced_peak(run) if args.memory else None
+    seconds, stats = [], None
+    for _ in range(args.repeats):
+        started = time.perf_counter()
+        stats = run()
+        seconds.append(time.perf_counter() - started)
+    built = stats["embedded"] + stats["reused"]
+    return result("index", built, seconds, built, "chunks/s", peak), layout
+
+
+def bench_code(chunks, layout, args):
+    """Times single `search_code` calls over the index built last; returns (row, snippets of the last query)."""
+    code_retrieval.swap_index()
+    texts = [text for _, text in log_texts(layout, random.Random(1), max(1, args.queries // 3))]
+    query_embedder = FakeEmbedder(dim=args.dim, latency=args.embedding_latency)
+    seconds, snippets = [], []
+    for text in texts:
+        started = time.perf_counter()
+        snippets = code_retrieval.search_code(text, embedder=query_embedder)
+        seconds.append(time.perf_counter() - started)
+    peak = traced_peak(lambda: [code_retrieval.search_code(text + " traced", embedder=query_embedder)
+                                for text in texts[:30]]) if args.memory else None
+    return result("code", chunks, seconds, 1, "queries/s", peak), snippets
+
+
+def bench_debug(logs, code, args):
+    client = FakeOpenAIClient(chat_latency=args.chat_latency)
+    seconds = []
+    for _ in range(args.debug_calls):
+        started = time.perf_counter()
+        ask_gpt(logs, code, client=client)
+        seconds.append(time.perf_counter() - started)
+    peak = traced_peak(lambda: ask_gpt(logs, code, client=client)) if args.memory else None
+    return result("debug", len(logs), seconds, 1, "calls/s", peak)
+
+
+def quiet(args):
+    """Silences the pipeline's progress prints around a stage, unless --verbose."""
+    if args.verbose:
+        return contextlib.nullcontext()
+    return contextlib.redirect_stdout(open(os.devnull, "w"))
+
+
+def compare(rows, baseline, tolerance):
+    """Rows whose p50 latency or peak memory grew more than `tolerance` over the baseline's, as messages."""
+    before = {(row["stage"], row["size"]): row for row in baseline}
+    regressions = []
+    for row in rows:
+        old = before.get((row["stage"], row["size"]))
+        if old is None:
+            continue
+        # Small absolute differences are noise, whatever the ratio
+        for field, floor in (("p50_ms", 1.0), ("peak_mb", 1.0)):
+            if row[field] is None or old.get(field) is None:
+                continue
+            if row[field] > old[field] * (1 + tolerance) and row[field] - old[field] > floor:
+                regressions.append(f"{row['stage']} at {row['size']}: {field} {old[field]} → {row[field]}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log-lines", type=int, action="append", help="Log volumes to run (repeatable)")
+    parser.add_argument("--chunks", type=int, action="append", help="Index sizes to run (repeatable)")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--index-type", default=None, help="flat | hnsw | ivf_flat | ivf_pq (see ann_index)")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs of the logs and index stages")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--debug-calls", type=int, default=20)
+    parser.add_argument("--query-latency", type=float, default=0.0)
+    parser.add_argument("--embedding-latency", type=float, default=0.0)
+    parser.add_argument("--chat-latency", type=float, default=0.0)
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's own progress output")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip the traced runs")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare with the results JSON of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    output, baseline = [os.path.abspath(path) if path else None for path in (args.output, args.baseline)]
+    root = tempfile.mkdtemp(prefix="pipeline-bench-")
+    os.chdir(root)
+    rows, clusters, snippets = [], [], []
+    print(f"📊 Pipeline benchmark in {root} (latencies: query {args.query_latency}s, "
+          f"embedding {args.embedding_latency}s, chat {args.chat_latency}s)")
+
+    for lines in args.log_lines or [1000, 10000, 100000, 1000000]:
+        with quiet(args):
+            row, clusters = bench_logs(lines, args)
+        rows.append(row)
+        report(row)
+    for chunks in args.chunks or [1000, 10000, 100000]:
+        with quiet(args):
+            row, layout = bench_index(chunks, args, root)
+        rows.append(row)
+        report(row)
+        with quiet(args):
+            row, snippets = bench_code(row["size"], layout, args)
+        rows.append(row)
+        report(row)
+    with quiet(args):
+        rows.append(bench_debug(format_clusters(clusters), snippets, args))
+    report(rows[-1])
+    print(f"📊 Peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    if baseline:
+        with open(baseline, encoding="utf-8") as f:
+            regressions = compare(rows, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"⚠️ Regression: {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"✅ No stage regressed by more than {args.tolerance:.0%}.")
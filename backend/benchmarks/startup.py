@@ -0,0 +1,102 @@
+"""Measures startup time and per-worker memory of eager vs. lazy, memory-mapped index loading.
+
+Builds a synthetic index in a temp directory, then starts `--workers` processes that
+each load it the way the old `code_retrieval` did (eager `faiss.read_index` + full
+JSON load) and the way it does now (`code_retrieval.load_index`, mmap), and reports
+import time, time to first search and RSS / PSS per worker. PSS splits shared pages
+between the processes mapping them, so it shows what each extra uvicorn worker costs.
+
+    python -m benchmarks.startup --vectors 50000 --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import faiss
+import numpy as np
+
+from vector_store import write_store
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = r"""
+import json, os, sys, time
+sys.path.insert(0, {backend!r})
+mode = sys.argv[1]
+
+def memory():
+    fields = {{}}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:", "Anonymous:"):
+                fields[parts[0][:-1]] = int(parts[1]) // 1024
+    return fields
+
+start = time.perf_counter()
+if mode == "eager":
+    import faiss, numpy as np
+    index = faiss.read_index("java_embeddings.index")
+    with open("java_embeddings.json", "r", encoding="utf-8") as f:
+        java_code = [item["code"] for item in json.load(f)]
+    imported = time.perf_counter() - start
+    search = lambda q: [java_code[i] for i in index.search(q, 3)[1][0]]
+else:
+    import numpy as np
+    import code_retrieval
+    imported = time.perf_counter() - start
+    def search(q):
+        index, java_code = code_retrieval.load_index()
+        return java_code.get_snippets(index.search(q, 3)[1][0])
+
+query = np.random.default_rng(1).standard_normal((1, {dim})).astype(np.float32)
+search(query)
+first_search = time.perf_counter() - start
+sys.stdout.write(json.dumps(dict(import_s=imported, first_search_s=first_search, **memory())) + "\n")
+sys.stdout.flush()
+sys.stdin.read()  # Stay alive until every worker has reported, so pages stay shared
+"""
+
+
+def build_fixture(directory, n, dim):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    ids = np.arange(n, dtype=np.int64)
+    snippets = [f"public class Synthetic{i} {{ void run() {{ /* chunk {i} */ }} }}" for i in ids]
+
+    index = faiss.IndexIDMap(faiss.IndexFlatL2(dim))
+    index.add_with_ids(vectors, ids)
+    faiss.write_index(index, os.path.join(directory, "java_embeddings.index"))
+    write_store(os.path.join(directory, "java_embeddings"), ids, vectors, snippets)
+    # The legacy JSON, for the eager baseline
+    with open(os.path.join(directory, "java_embeddings.json"), "w", encoding="utf-8") as f:
+        json.dump([{"embedding": v.tolist(), "code": s} for v, s in zip(vectors, snippets)], f)
+
+
+def run(mode, directory, workers, dim):
+    script = WORKER.format(backend=BACKEND_DIR, dim=dim)
+    procs = [subprocess.Popen([sys.executable, "-c", script, mode], cwd=directory, text=True,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE) for _ in range(workers)]
+    results = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.communicate("")
+    avg = {key: sum(r[key] for r in results) / workers for key in results[0]}
+    print(f"📊 {mode:<6} import {avg['import_s']:6.2f}s  first search {avg['first_search_s']:6.2f}s  "
+          f"RSS {avg['Rss']:6.0f} MB  PSS {avg['Pss']:6.0f} MB  anon {avg['Anonymous']:6.0f} MB  (per worker, {workers} workers)")
+    return avg
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        build_fixture(directory, args.vectors, args.dim)
+        run("eager", directory, args.workers, args.dim)
+        run("lazy", directory, args.workers, args.dim)
@@ -0,0 +1,101 @@
+"""Measures symbol resolution against the embedding + vector search it can replace.
+
+Indexes a synthetic Java source tree (`--classes` classes over a few packages) with
+`FakeEmbedder`, then runs `search_code` over three kinds of log text: a stack trace of
+indexed frames, a logback line with an abbreviated logger name, and a message naming
+no indexed code. The query embedding costs `--embedding-latency` per call; a random
+word per query keeps the query-embedding cache from answering. Reports symbol resolution time, end-to-end
+search time and how many embedding calls each kind needed.
+
+    python -m benchmarks.symbols --classes 2000 --embedding-latency 0.15
+"""
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+
+import numpy as np
+
+import code_retrieval
+from embed_java_v2 import build_index
+from fakes import FakeEmbedder
+
+PACKAGES = ["com.altman.aro.vt.gao", "com.altman.aro.vt.service", "com.altman.aro.plan", "com.altman.aro.util"]
+
+
+def write_sources(root, classes, rng):
+    """Writes `classes` Java files; returns (package, class, [(method, first line)]) per file."""
+    layout = []
+    for i in range(classes):
+        package = rng.choice(PACKAGES)
+        name = f"Query{rng.choice(['Composer', 'Planner', 'Loader', 'Mapper'])}{i}"
+        lines = [f"package {package};", "", "import java.util.List;", "", f"public class {name} {{"]
+        methods = []
+        for j in range(rng.randint(3, 8)):
+            methods.append((f"step{j}", len(lines) + 1))
+            lines += [f"  public String step{j}(List<String> rows, int limit) {{",
+                      f"    String sql = \"SELECT * FROM edge_{i}_{j} LIMIT \" + limit;",
+                      "    for (String row : rows) { sql = sql + row.trim(); }",
+                      "    return sql;", "  }"]
+        lines.append("}")
+        directory = os.path.join(root, *package.split("."))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{name}.java"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        layout.append((package, name, methods))
+    return layout
+
+
+def log_texts(layout, rng, n):
+    """(kind, text) pairs of the three kinds of log text."""
+    texts = []
+    for _ in range(n):
+        package, name, methods = rng.choice(layout)
+        method, line = rng.choice(methods)
+        abbreviated = ".".join(part[0] for part in package.split(".")[:2]) + "." + ".".join(package.split(".")[2:])
+        noise = "".join(rng.choice(string.ascii_lowercase) for _ in range(12))
+        texts.append(("stack trace", f"java.lang.IllegalStateException: bad limit for {noise}\n"
+                                     f"\tat {package}.{name}.{method}({name}.java:{line + 2})\n"
+                                     f"\tat org.springframework.web.servlet.FrameworkServlet.service(FrameworkServlet.java:897)"))
+        texts.append(("logger name", f"16:46:09.244 [main] DEBUG {abbreviated}.{name} -  SQL ===> SELECT {noise}"))
+        texts.append(("no symbol", f"connection reset by peer from {noise}, retrying request"))
+    return texts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--classes", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--embedding-latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    os.chdir(tempfile.mkdtemp(prefix="symbols-bench-"))
+    layout = write_sources("src", args.classes, rng)
+    build_index("src", embedder=FakeEmbedder())
+    symbols = code_retrieval.load_symbols()
+    print(f"📊 {symbols.stats()['chunks']} chunks, {len(symbols.classes)} classes, {len(symbols.postings)} terms "
+          f"({os.path.getsize('java_embeddings.symbols.json') / 2 ** 20:.1f} MB)")
+
+    embedder = FakeEmbedder(latency=args.embedding_latency)
+    results = {}
+    for kind, text in log_texts(layout, rng, args.queries):
+        started = time.perf_counter()
+        symbols.resolve(text)
+        resolved = time.perf_counter() - started
+        before = embedder.requests
+        started = time.perf_counter()
+        code_retrieval.search_code(text, embedder=embedder)
+        searched = time.perf_counter() - started
+        timings = results.setdefault(kind, {"resolve": [], "search": [], "embedded": 0})
+        timings["resolve"].append(resolved)
+        timings["search"].append(searched)
+        timings["embedded"] += embedder.requests - before
+
+    for kind, timings in results.items():
+        print(f"📊 {kind:<12} resolve p50 {np.percentile(timings['resolve'], 50) * 1e6:7.0f} µs  "
+              f"search p50 {np.percentile(timings['search'], 50) * 1000:7.2f} ms  "
+              f"p99 {np.percentile(timings['search'], 99) * 1000:7.2f} ms  "
+              f"embedding calls {timings['embedded']}/{len(timings['search'])}")
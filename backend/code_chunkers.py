@@ -0,0 +1,138 @@
+import importlib
+import os
+import re
+
+from java_chunker import MAX_CHUNK_TOKENS, MIN_CHUNK_TOKENS, chunk_java, chunk_units
+
+# Languages indexed, by file extension: extension -> (language, chunker, package).
+# `chunker(source, path)` returns `java_chunker` chunk dicts; `package(source, path)` the
+# namespace that qualifies the file's class names in stack traces ("" if none).
+CHUNKERS = {}
+# Modules that register extra chunkers on import (comma-separated). Imported here, so
+# the ingestion worker processes, which start from a fresh interpreter, get them too.
+CHUNKER_MODULES = os.getenv("INGEST_CHUNKER_MODULES", "")
+
+_JVM_PACKAGE = re.compile(r"^\s*package\s+([\w.]+)\s*;?", re.MULTILINE)
+# Lines a declaration's leading annotations, decorators and comments start with
+_LEADING = ("@", "#", "//", "/*", "*")
+# Preamble lines that carry nothing worth retrieving on their own
+_PREAMBLE = re.compile(r"^\s*(?:$|package\b|import\b|from\s+\S+\s+import\b|#|//|/\*|\*|[\"']use strict)")
+
+
+def no_package(source, path):
+    return ""
+
+
+def register_chunker(language, extensions, chunker, package=no_package):
+    """Indexes files with these extensions (".kt", ...) with `chunker`; replaces any earlier registration."""
+    for extension in extensions:
+        CHUNKERS[extension.lower()] = (language, chunker, package)
+
+
+def chunker_for(path):
+    """(language, chunker, package) for a file, or None when no chunker handles its extension."""
+    return CHUNKERS.get(os.path.splitext(path)[1].lower())
+
+
+def jvm_package(source, path):
+    match = _JVM_PACKAGE.search(source)
+    return match.group(1) if match else ""
+
+
+def python_package(source, path):
+    """The module path (`app/services/jobs.py` -> `app.services.jobs`), which prefixes classes in tracebacks."""
+    module = os.path.splitext(path)[0].replace("\\", "/").strip("/").split("/")
+    if module[-1] == "__init__":
+        module = module[:-1]
+    return ".".join(module)
+
+
+class DeclarationChunker:
+    """Chunks a language by the lines its declarations start on, for `java_chunker.chunk_units`.
+
+    Each of `patterns` matches the start of a declaration line, with an `indent` group,
+    a `name` group and, for class-like declarations, a `kind` group whose value is in
+    `types`. A member runs from its declaration (with the annotations, decorators and
+    comments just above it) to the next one; its class is the innermost class declared
+    at a smaller indentation before it.
+    """
+
+    def __init__(self, patterns, types=("class", "interface", "object", "enum"), not_names=()):
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.types = set(types)
+        self.not_names = set(not_names)
+
+    def declarations(self, lines):
+        """(line number, indent, kind, name) of every declaration line."""
+        found = []
+        for number, line in enumerate(lines):
+            for pattern in self.patterns:
+                match = pattern.match(line)
+                if not match:
+                    continue
+                kind = match.groupdict().get("kind")
+                name = match.group("name") or ("Companion" if kind == "object" else None)
+                if name and name not in self.not_names:
+                    found.append((number, len(match.group("indent").expandtabs(4)), kind, name))
+                break
+        return found
+
+    def __call__(self, source, path="", max_tokens=MAX_CHUNK_TOKENS, min_tokens=MIN_CHUNK_TOKENS):
+        lines = source.split("\n")
+        offsets = [0]
+        for line in lines:
+            offsets.append(offsets[-1] + len(line) + 1)
+        declarations = self.declarations(lines)
+
+        starts, previous = [], 0  # First line of each member: its leading lines, never the previous declaration
+        for number, *_ in declarations:
+            first = number
+            while first > previous and lines[first - 1].strip().startswith(_LEADING):
+                first -= 1
+            starts.append(first)
+            previous = number + 1
+
+        spans, classes = [], []  # classes: (indent, name) of the enclosing class declarations
+        if declarations and any(not _PREAMBLE.match(line) for line in lines[:starts[0]]):
+            spans.append(("field", "", None, 0, offsets[starts[0]]))
+        for i, (number, indent, kind, name) in enumerate(declarations):
+            while classes and classes[-1][0] >= indent:
+                classes.pop()
+            owner = ".".join(name for _, name in classes)
+            start = offsets[starts[i]]
+            end = offsets[starts[i + 1]] if i + 1 < len(declarations) else len(source)
+            if kind in self.types:
+                classes.append((indent, name))
+                spans.append(("declaration", ".".join(name for _, name in classes), None, start, end))
+            else:
+                spans.append(("method", owner, name, start, end))
+        return chunk_units(source, path, spans, max_tokens, min_tokens)
+
+
+_CONTROL = ("if", "for", "while", "switch", "catch", "return", "when", "else", "try")
+
+chunk_python = DeclarationChunker(
+    [r"(?P<indent>[ \t]*)(?:async[ \t]+)?(?P<kind>def|class)[ \t]+(?P<name>\w+)"], types=("class",),
+)
+chunk_kotlin = DeclarationChunker([
+    r"(?P<indent>[ \t]*)(?:(?:public|private|protected|internal|open|abstract|final|override|suspend|inline|data|"
+    r"sealed|enum|annotation|inner|companion|operator|infix|tailrec|external|actual|expect|value)[ \t]+)*"
+    r"(?P<kind>fun|class|interface|object)\b[ \t]*(?:<[^>]*>[ \t]*)?(?:[\w.<>, ?]+\.)?(?P<name>\w+)?",
+])
+chunk_typescript = DeclarationChunker([
+    r"(?P<indent>[ \t]*)(?:export[ \t]+)?(?:default[ \t]+)?(?:declare[ \t]+)?(?:abstract[ \t]+)?"
+    r"(?P<kind>class|interface|enum|namespace)[ \t]+(?P<name>\w+)",
+    r"(?P<indent>[ \t]*)(?:export[ \t]+)?(?:default[ \t]+)?(?:async[ \t]+)?function\*?[ \t]*(?P<name>\w+)",
+    r"(?P<indent>[ \t]*)(?:export[ \t]+)?(?:const|let)[ \t]+(?P<name>\w+)[ \t]*(?::[^=]+)?=[ \t]*(?:async[ \t]+)?"
+    r"(?:\([^)]*\)|\w+)[ \t]*(?::[^=]+)?=>",
+    r"(?P<indent>[ \t]+)(?:(?:public|private|protected|static|async|readonly|abstract|override|get|set)[ \t]+)*"
+    r"(?P<name>\w+)[ \t]*(?:<[^>]*>)?\([^)]*\)[ \t]*(?::[^{;]+)?\{",
+], types=("class", "interface", "enum", "namespace"), not_names=_CONTROL)
+
+register_chunker("java", [".java"], chunk_java, jvm_package)
+register_chunker("kotlin", [".kt", ".kts"], chunk_kotlin, jvm_package)
+register_chunker("python", [".py"], chunk_python, python_package)
+register_chunker("typescript", [".ts", ".tsx"], chunk_typescript)
+
+for _module in filter(None, (name.strip() for name in CHUNKER_MODULES.split(","))):
+    importlib.import_module(_module)
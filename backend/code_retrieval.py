@@ -1,36 +1,101 @@
-import faiss
-import numpy as np
-import json
+import asyncio
 import openai
 import os
+from query_cache import get_query_cache
+from ann_index import search
+from index_registry import get_index_registry
+from metrics import span
+from symbol_index import fuse
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# Load FAISS index
-if not os.path.exists("java_embeddings.index"):
-    print("⚠️ FAISS index missing! Rebuilding...")
-    os.system("python recreate_java_embedings.py")
-    
-index = faiss.read_index("java_embeddings.index")
-index = faiss.read_index("java_embeddings.index")
-
-# Load Java snippets
-with open("java_embeddings.json", "r", encoding="utf-8") as f:
-    java_data = json.load(f)
-
-java_code = [item["code"] for item in java_data]
-
-def search_code(error_message, k=3):
-    """Finds relevant Java snippets for a given error message."""
-    response = openai.embeddings.create(
-        model="text-embedding-ada-002",
-        input=error_message
-    )
-    query_embedding = np.array(response.data[0].embedding).reshape(1, -1)
-
-    _, indices = index.search(query_embedding, k)
-    
-    return [java_code[i] for i in indices[0]]
+
+def load_index(repository=None):
+    """The (FAISS index, snippet store) pair of a repository, loaded on first use; later calls are free.
+
+    Never rebuilds: a missing index raises FileNotFoundError instead of blocking startup.
+    Each call returns the pair currently serving, so a request holding one keeps it
+    across a swap or eviction.
+    """
+    entry = get_index_registry().get(repository)
+    return entry.index, entry.store
+
+
+def load_symbols(repository=None):
+    """The symbol index of a repository (None if its index was built before symbol indexes existed)."""
+    return get_index_registry().get(repository).symbols
+
+
+def swap_index(repository=None):
+    """Re-opens a repository's index files and atomically replaces the pair serving searches.
+
+    The old pair is not closed: requests that already hold it finish on it, and it is
+    released once the last of them drops its reference.
+    """
+    entry = get_index_registry().swap(repository)
+    return entry.index, entry.store
+
+
+def search_vector(query_embedding, k=3, nprobe=None, ef_search=None, lexical=None, repository=None):
+    """Returns the k snippets nearest to an embedded query.
+
+    `nprobe` (IVF indexes) and `ef_search` (HNSW) trade recall for latency on this search
+    only; they default to INDEX_NPROBE / INDEX_EF_SEARCH and are ignored by flat indexes.
+    `lexical`, ranked id lists from `search_symbols`, is fused with the vector ranking.
+    """
+    index, java_code = load_index(repository)
+    with span("faiss_search", k=k, vectors=index.ntotal):
+        _, indices = search(index, query_embedding, k, nprobe=nprobe, ef_search=ef_search)
+    ids = fuse([*lexical, indices[0]], k) if lexical else indices[0]
+
+    # Only the k returned snippets are read from disk
+    return java_code.get_snippets(ids)
+
+
+def search_symbols(error_message, k=3, repository=None):
+    """Resolves the classes, methods and stack frames the log text names, without embedding it.
+
+    Returns the snippets to answer with when a symbol hit is unambiguous, else None and
+    the symbol / BM25 rankings to fuse with the vector search.
+    """
+    entry = get_index_registry().get(repository)
+    symbols = entry.symbols
+    if not symbols:
+        return None, None
+    with span("symbol_search") as attributes:
+        symbol_ids, lexical_ids, confident = symbols.search(error_message, k)
+        attributes["confident"] = confident
+    if confident:
+        # Symbol hits first, topped up with the best lexical matches
+        ids = list(dict.fromkeys([*symbol_ids, *lexical_ids]))[:k]
+        return entry.store.get_snippets(ids), None
+    return None, [symbol_ids, lexical_ids]
+
+
+def search_code(error_message, k=3, embedder=None, nprobe=None, ef_search=None, repository=None):
+    """Finds relevant Java snippets for a given error message in a repository's index (the default one if None)."""
+    snippets, lexical = search_symbols(error_message, k, repository)
+    if snippets is not None:
+        return snippets
+    # Normalized & cached, so a repeat of the same failure skips the embedding call
+    query_embedding = get_query_cache().embed(error_message, embedder=embedder)
+    return search_vector(query_embedding, k, nprobe, ef_search, lexical, repository)
+
+
+async def search_code_async(error_message, k=3, embedder=None, nprobe=None, ef_search=None, repository=None):
+    """`search_code` for the async request path.
+
+    The embedding call is awaited; the FAISS search (and loading a cold index) runs in a
+    thread so it never stalls the event loop.
+    """
+    if not get_index_registry().is_loaded(repository):
+        snippets, lexical = await asyncio.to_thread(search_symbols, error_message, k, repository)
+    else:
+        snippets, lexical = search_symbols(error_message, k, repository)
+    if snippets is not None:
+        return snippets
+    query_embedding = await get_query_cache().embed_async(error_message, embedder=embedder)
+    return await asyncio.to_thread(search_vector, query_embedding, k, nprobe, ef_search, lexical, repository)
 
 # If running as a standalone script
 if __name__ == "__main__":
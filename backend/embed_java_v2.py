@@ -1,104 +1,253 @@
 import openai
 import os
 import time
-import tiktoken  # Helps count tokens
 import faiss
-import numpy as np 
+import numpy as np
 import json
-import backoff 
+import argparse
+from embedder import embed_stream
+from vector_store import INDEX_SUFFIX, STORE_PREFIX, VectorStore, link_file, store_exists, write_store, convert_json
+from source_ingest import ingest_sources
+from symbol_index import SYMBOLS_PATH, build_symbol_index, save_symbol_index
+from ann_index import INDEX_METRIC, INDEX_TYPE, build_ann_index, describe, normalize
+from index_registry import DEFAULT_REPOSITORY, repository_paths
 
 # 1️⃣ Set OpenAI API Key
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-# 2️⃣ Read Java Files
-def read_java_files(directory):
-    """Recursively reads all Java files in a directory."""
-    code_snippets = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".java"):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        code_snippets.append(f.read())
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
-    return code_snippets
-
-java_code = read_java_files("C:/Users/ben.yemini/OneDrive - Altman Solon/Documents/GitHub/aro-service")
-print(f"✅ Loaded {len(java_code)} Java files.")  # ✅ Debugging
-
-# 3️⃣ Token Counter Function
-def count_tokens(text, model="text-embedding-ada-002"):
-    """Returns the number of tokens in a text string."""
-    encoding = tiktoken.encoding_for_model(model)
-    return len(encoding.encode(text))
-
-# 4️⃣ Corrected Chunking Function
-def chunk_text(text, max_tokens=7000):  # Reduce to 7000 for safety
-    """Splits text into chunks ensuring they stay within the token limit."""
-    encoding = tiktoken.encoding_for_model("text-embedding-ada-002")
-    tokens = encoding.encode(text)  # Convert text into tokens
-    
-    chunks = []
-    for i in range(0, len(tokens), max_tokens):
-        chunk = tokens[i:i + max_tokens]  # Extract a chunk
-        chunks.append(encoding.decode(chunk))  # Convert back to text
-    
-    return chunks
-
-# 5️⃣ Embedding Functions
-# handle api rate limits 
-@backoff.on_exception(backoff.expo, openai.error.RateLimitError, max_time=30)
-def get_embedding(text):
-    """Fetch embedding from OpenAI API with exponential backoff."""
-    response = openai.embeddings.create(
-        model="text-embedding-ada-002",
-        input=text
+# Source tree indexed when none is given on the command line
+JAVA_SOURCE_DIR = os.getenv("JAVA_SOURCE_DIR")
+INDEX_PATH = "java_embeddings.index"
+JSON_PATH = "java_embeddings.json"  # Legacy format, converted on first run
+MANIFEST_PATH = "java_embeddings.manifest.json"
+
+# 2️⃣ Read Source Files: `source_ingest` walks the tree and reads, decodes & chunks files in worker processes
+
+# 3️⃣ Chunking: files are split at class & method boundaries by their language's chunker (`code_chunkers`)
+
+# 4️⃣ Embedding: new chunks stream through `embedder.embed_stream` (batched, concurrent, with retries)
+
+# 5️⃣ Content Hashing (`source_ingest.content_hash`, done while reading) & Manifest
+def load_manifest(filename):
+    """Load the per-file / per-chunk hash manifest written by the previous build."""
+    if not os.path.exists(filename):
+        return {"next_id": 0, "files": {}}
+    with open(filename, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(filename, manifest):
+    """Save the per-file / per-chunk hash manifest next to the FAISS index."""
+    with open(filename + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(filename + ".tmp", filename)
+
+# 6️⃣ Load Previous Chunk Records
+def load_chunk_records(manifest, store):
+    """Chunk records of the previous build, keyed by FAISS id (vectors & code stay in `store`)."""
+    if store is None:
+        return {}
+    records = {}
+    for path, entry in manifest["files"].items():
+        for c in entry["chunks"]:
+            records[c["id"]] = {"id": c["id"], "file": path, "hash": c["hash"]}
+    # Drop anything the manifest lists but the store no longer holds
+    known = store.rows(list(records)) >= 0
+    return {i: record for (i, record), ok in zip(records.items(), known) if ok}
+
+# 7️⃣ Incremental Index Build
+def build_index(source_dir, index_path=INDEX_PATH, store_prefix=STORE_PREFIX, manifest_path=MANIFEST_PATH, embedder=None,
+                progress=None, index_type=None, metric=None, symbols_path=SYMBOLS_PATH, json_path=JSON_PATH):
+    """Re-index `source_dir`, embedding only new or changed chunks.
+
+    Source files of every language `code_chunkers` knows (Java, Kotlin, Python,
+    TypeScript) stream in from `source_ingest`, which honors .gitignore files, skips
+    generated, vendored and binary files, and chunks large trees in worker processes.
+    Files are split at class / method boundaries, each chunk carrying its file, line
+    range and class/method. Unchanged files reuse their FAISS ids as-is (without being
+    chunked again), changed files reuse any chunk whose content hash was already
+    embedded, and vectors for deleted or rewritten chunks are dropped from the
+    `IndexIDMap`. New chunks go to `embed_stream` as they are found, optionally with a
+    custom `embedder`, so embedding overlaps with reading the tree. Vectors and snippets
+    are written to the binary store at `store_prefix`. Returns a dict of reuse/embed counts.
+
+    `progress`, if given, is called with keyword counters (files_total, files_scanned,
+    chunks_total, chunks_reused, chunks_pending, chunks_embedded) as the build advances;
+    files_total counts the source files the walk has found so far (it runs ahead of
+    files_scanned, the files read; skipped ones count in both).
+
+    `index_type` / `metric` (see `ann_index`) default to those of the existing index, else
+    to INDEX_TYPE / INDEX_METRIC. A flat index of the same metric is updated in place;
+    other types (or a type change) are rebuilt from the stored vectors, without re-embedding.
+
+    The class / method / identifier index `symbol_index` searches is rewritten at
+    `symbols_path` from every chunk, so it always matches the store.
+
+    The paths default to the working directory; `index_registry.repository_paths` gives
+    those of a named repository, whose directory is created if needed.
+    """
+    progress = progress or (lambda **counters: None)
+    start = time.time()
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+
+    if not store_exists(store_prefix) and os.path.exists(json_path) and os.path.exists(manifest_path):
+        convert_json(json_path, store_prefix, index_path)
+
+    manifest = load_manifest(manifest_path)
+    store = VectorStore(store_prefix) if store_exists(store_prefix) else None
+    old_records = load_chunk_records(manifest, store)
+    # The index of the store's generation (the plain index file for stores written before generations)
+    old_index_path = (store.index_path if store is not None else None) or index_path
+    index = faiss.read_index(old_index_path) if os.path.exists(old_index_path) and old_records else None
+    if index is not None and not isinstance(index, faiss.IndexIDMap) and faiss.try_extract_index_ivf(index) is None:
+        print("⚠️ Existing index has no ID map, rebuilding from scratch.")
+        index, manifest, old_records = None, {"next_id": 0, "files": {}}, {}
+    current = describe(index) if index is not None else (INDEX_TYPE, INDEX_METRIC)
+    index_type, metric = index_type or current[0], metric or current[1]
+
+    # Any chunk embedded before can be reused, whichever file it lived in
+    id_by_hash = {r["hash"]: r["id"] for r in old_records.values()}
+    # Files whose every chunk is still in the store are not chunked again while unchanged
+    known_hashes = {path: entry["sha256"] for path, entry in manifest["files"].items()
+                    if all(c["id"] in old_records for c in entry["chunks"])}
+
+    next_id = manifest["next_id"]
+    new_files = {}
+    records = {}
+    pending = {}  # Records that still need an embedding, by id
+    stats = {"files": 0, "skipped": 0, "reused": 0, "embedded": 0, "removed": 0, "failed": 0}
+    languages = {}
+
+    def scan():
+        """Files into `records` and `new_files`; yields the (id, text, tokens) of chunks to embed."""
+        nonlocal next_id
+        for source in ingest_sources(source_dir, known_hashes, found=lambda count: progress(files_total=count)):
+            progress(files_scanned=stats["files"] + stats["skipped"] + 1, chunks_reused=stats["reused"],
+                     chunks_pending=len(pending))
+            if "skipped" in source:
+                stats["skipped"] += 1
+                continue
+            path = source["path"]
+            stats["files"] += 1
+            languages[source["language"]] = languages.get(source["language"], 0) + 1
+            old_entry = manifest["files"].get(path)
+
+            if source["chunks"] is None:
+                new_files[path] = {**old_entry, "language": source["language"], "package": source["package"]}
+                for c in old_entry["chunks"]:
+                    records[c["id"]] = old_records[c["id"]]
+                stats["reused"] += len(old_entry["chunks"])
+                continue
+
+            old_ids_by_hash = {c["hash"]: c["id"] for c in old_entry["chunks"]} if old_entry else {}
+            chunks = []
+            for chunk in source["chunks"]:
+                chunk_hash = chunk["hash"]
+                chunk_id = old_ids_by_hash.pop(chunk_hash, None)
+                if chunk_id is not None and chunk_id in old_records:
+                    # Same vector, but the snippet is rewritten with its current line range
+                    records[chunk_id] = {**old_records[chunk_id], "code": chunk["code"]}
+                    stats["reused"] += 1
+                else:
+                    chunk_id = next_id
+                    next_id += 1
+                    record = {"id": chunk_id, "file": path, "hash": chunk_hash, "code": chunk["code"]}
+                    if chunk_hash in id_by_hash:
+                        record["embedding"] = store.get_vectors([id_by_hash[chunk_hash]])[0]
+                        stats["reused"] += 1
+                    else:
+                        pending[chunk_id] = record
+                        yield chunk_id, chunk["text"], chunk["tokens"]
+                    records[chunk_id] = record
+                chunks.append({"hash": chunk_hash, "id": chunk_id, "lines": [chunk["start_line"], chunk["end_line"]],
+                               "class": chunk["class"], "method": chunk["method"]})
+            new_files[path] = {"sha256": source["sha256"], "language": source["language"],
+                               "package": source["package"], "chunks": chunks}
+
+    # 🔹 Only new content goes to OpenAI, while the rest of the tree is still being read
+    embedded_so_far = [0]
+
+    def on_batch(count):
+        embedded_so_far[0] += count
+        progress(chunks_embedded=embedded_so_far[0])
+
+    failed = set()
+    for chunk_id, embedding in embed_stream(scan(), embedder=embedder, progress=on_batch):
+        if embedding is not None:
+            pending[chunk_id]["embedding"] = embedding
+            stats["embedded"] += 1
+        else:
+            del records[chunk_id]
+            failed.add(chunk_id)
+    progress(chunks_total=len(records), chunks_reused=stats["reused"],
+             chunks_pending=len(pending))
+    print(f"✅ Read {stats['files']} source files ({languages}), skipped {stats['skipped']}.")
+    if failed:
+        stats["failed"] = len(failed)
+        for entry in new_files.values():
+            entry["chunks"] = [c for c in entry["chunks"] if c["id"] not in failed]
+
+    # 🗑️ Drop vectors for deleted files and rewritten chunks
+    stale_ids = [i for i in old_records if i not in records]
+    stats["removed"] = len(stale_ids)
+
+    if not records:
+        raise ValueError("❌ No source chunks were embedded!")
+
+    # Reused records keep their vector & snippet in the old store, new ones carry them
+    ids = sorted(records)
+    kept = [i for i in ids if "embedding" not in records[i]]
+    kept_vectors = dict(zip(kept, store.get_vectors(kept))) if kept else {}
+    from_store = [i for i in kept if "code" not in records[i]]
+    kept_snippets = dict(zip(from_store, store.get_snippets(from_store))) if from_store else {}
+    vectors = np.array(
+        [kept_vectors[i] if i in kept_vectors else records[i]["embedding"] for i in ids], dtype=np.float32
     )
-    return response.data[0].embedding
-
-def embed_code(snippets):
-    embeddings = []
-    
-    for snippet in snippets:
-        # 🔹 Split large files into smaller chunks
-        chunks = chunk_text(snippet)
-        for chunk in chunks:
-            chunk_tokens = count_tokens(chunk)  # Get token count
-            print(f"🔹 Sending {chunk_tokens} tokens to OpenAI...")  # Debugging
-
-            if chunk_tokens > 8192:
-                print(f"❌ WARNING: Chunk exceeds 8192 tokens! It has {chunk_tokens} tokens.")
-
-            try:
-                embedding = get_embedding(chunk)  # Calls the retried function
-                embeddings.append(embedding)
-            except Exception as e:
-                print(f"❌ Error embedding chunk: {e}")
-        
-    return embeddings
-
-# 6️⃣ Run Embedding Process
-java_embeddings = embed_code(java_code)
-print(f"✅ Generated {len(java_embeddings)} embeddings.")
-
-# 7️⃣ Save Embeddings & Code Snippets to JSON
-def save_embeddings_json(filename, embeddings, code_snippets):
-    """Save embeddings and code snippets to a JSON file."""
-    data = [{"embedding": emb.tolist(), "code": snippet} for emb, snippet in zip(embeddings, code_snippets)]
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
-
-# Save Java embeddings and code
-save_embeddings_json("java_embeddings.json", java_embeddings, java_code)
-print("✅ Saved embeddings & Java code to `java_embeddings.json`.")
-
-# Convert embeddings to NumPy array
-embedding_dim = len(java_embeddings[0])  # Get embedding size
-index = faiss.IndexFlatL2(embedding_dim)
-index.add(np.array(java_embeddings))  # Add embeddings
-
-# Save FAISS index
-faiss.write_index(index, "java_embeddings.index")
+    snippets = [records[i]["code"] if "code" in records[i] else kept_snippets[i] for i in ids]
+
+    added = [i for i in ids if i not in old_records]
+    if index is None or index_type != "flat" or describe(index) != (index_type, metric):
+        # HNSW cannot remove vectors and IVF centroids drift as code changes: build afresh
+        index = build_ann_index(vectors, ids, index_type, metric)
+        added = stale_ids = []
+    if stale_ids:
+        index.remove_ids(np.array(stale_ids, dtype=np.int64))
+    if added:
+        positions = np.searchsorted(ids, added)
+        new_vectors = normalize(vectors[positions]) if metric == "cosine" else vectors[positions]
+        index.add_with_ids(new_vectors, np.array(added, dtype=np.int64))
+
+    # Save FAISS index, vector & snippet store and manifest
+    if store is not None:
+        store.close()
+    # Index, vectors & snippets are published together as one store generation; servers load
+    # that, and the plain index file is re-pointed at the new index for the command-line tools
+    generation = write_store(store_prefix, ids, vectors, snippets, index=index)
+    link_file(f"{store_prefix}.{generation}{INDEX_SUFFIX}", index_path)
+    snippet_by_id = dict(zip(ids, snippets))
+    save_symbol_index(symbols_path, build_symbol_index(
+        {"id": c["id"], "file": path, "package": entry.get("package", ""), "lines": c.get("lines"),
+         "class": c.get("class"), "method": c.get("method"), "code": snippet_by_id[c["id"]]}
+        for path, entry in new_files.items() for c in entry["chunks"] if c["id"] in snippet_by_id
+    ))
+    save_manifest(manifest_path, {"next_id": next_id, "files": new_files})
+
+    stats["seconds"] = round(time.time() - start, 2)
+    stats["index"] = f"{index_type}/{metric}"
+    print(f"♻️ Chunks reused: {stats['reused']}, embedded: {stats['embedded']}, "
+          f"removed: {stats['removed']}, failed: {stats['failed']} ({stats['seconds']}s, {stats['index']} index)")
+    return stats
+
 
+# 8️⃣ Run Embedding Process
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Builds or updates the code index of a Java source tree.")
+    parser.add_argument("source_dir", nargs="?", default=JAVA_SOURCE_DIR,
+                        help="Java source tree (default: $JAVA_SOURCE_DIR)")
+    parser.add_argument("--repository", default=DEFAULT_REPOSITORY,
+                        help="Index name /code selects it by; `default` is the working directory")
+    args = parser.parse_args()
+    if not args.source_dir:
+        parser.error("give the source directory, or set JAVA_SOURCE_DIR")
+    paths = repository_paths(args.repository)
+    build_index(args.source_dir, **paths)
+    print(f"✅ Saved FAISS index to `{paths['index_path']}` and Java code to `{paths['store_prefix']}.*`.")
@@ -0,0 +1,219 @@
+import os
+import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+
+import httpx
+import openai
+import tiktoken
+
+from metrics import EMBEDDING_INPUTS, EMBEDDING_TOKENS, span
+
+openai.api_key = os.getenv("OPENAI_API_KEY")
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+MAX_INPUT_TOKENS = 8191        # Per-input limit of the embedding model
+MAX_REQUEST_TOKENS = 60000     # Token budget packed into a single request
+MAX_REQUEST_INPUTS = 512       # Inputs packed into a single request
+MAX_WORKERS = 4                # Requests in flight at once
+OPENAI_TIMEOUT_SECONDS = 60    # Per-call timeout of the async client
+MAX_CONNECTIONS = 100          # Pooled connections of the async client
+
+_async_client = None
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model=EMBEDDING_MODEL):
+    """Returns the tiktoken encoding for a model, built once per process."""
+    return tiktoken.encoding_for_model(model)
+
+
+def count_tokens(text, model=EMBEDDING_MODEL):
+    """Returns the number of tokens in a text string."""
+    return len(get_encoding(model).encode(text))
+
+
+class OpenAIEmbedder:
+    """Embeds a list of texts with a single OpenAI embeddings request."""
+
+    retryable_errors = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)
+
+    def __init__(self, model=EMBEDDING_MODEL, client=None):
+        self.model = model
+        self.client = client
+
+    def __call__(self, texts):
+        with span("embedding_request", inputs=len(texts)) as attributes:
+            response = (self.client or openai).embeddings.create(model=self.model, input=texts)
+            record_usage(response, texts, attributes)
+        # The API may return items out of order, `index` ties them back to the inputs
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+def record_usage(response, texts, attributes):
+    """Counts the inputs and billed tokens of an embeddings response into the metrics and its span."""
+    usage = getattr(response, "usage", None)
+    attributes["tokens"] = getattr(usage, "prompt_tokens", 0) or 0
+    EMBEDDING_INPUTS.inc(len(texts))
+    EMBEDDING_TOKENS.inc(attributes["tokens"])
+
+
+def get_async_openai():
+    """The process-wide AsyncOpenAI client; its httpx pool is shared by embeddings and chat calls."""
+    global _async_client
+    if _async_client is None:
+        _async_client = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            timeout=OPENAI_TIMEOUT_SECONDS,
+            http_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                                              max_keepalive_connections=MAX_CONNECTIONS // 5)),
+        )
+    return _async_client
+
+
+async def close_async_openai():
+    """Closes the pooled AsyncOpenAI client; called on server shutdown."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+    _async_client = None
+
+
+class AsyncOpenAIEmbedder:
+    """`OpenAIEmbedder` for the async request path: awaitable, on the pooled AsyncOpenAI client."""
+
+    retryable_errors = OpenAIEmbedder.retryable_errors
+
+    def __init__(self, model=EMBEDDING_MODEL, client=None):
+        self.model = model
+        self.client = client
+
+    async def __call__(self, texts):
+        with span("embedding_request", inputs=len(texts)) as attributes:
+            response = await (self.client or get_async_openai()).embeddings.create(model=self.model, input=texts)
+            record_usage(response, texts, attributes)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class SharedBackoff:
+    """Exponential backoff shared by every worker of an embedding run.
+
+    When any request is rate limited, all workers pause until the cool-down ends,
+    instead of each one hammering the API on its own schedule.
+    """
+
+    def __init__(self, base=1.0, maximum=30.0):
+        self.base = base
+        self.maximum = maximum
+        self._delay = 0.0
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            pause = self._resume_at - time.monotonic()
+        if pause > 0:
+            time.sleep(pause)
+
+    def failed(self):
+        with self._lock:
+            self._delay = min(self.maximum, self._delay * 2 or self.base)
+            self._resume_at = max(self._resume_at, time.monotonic() + self._delay)
+
+    def succeeded(self):
+        with self._lock:
+            self._delay = 0.0
+
+
+def pack_batches(token_counts, max_request_tokens=MAX_REQUEST_TOKENS, max_request_inputs=MAX_REQUEST_INPUTS):
+    """Groups input positions into request-sized batches under a token budget."""
+    batches = []
+    batch, batch_tokens = [], 0
+    for i, tokens in enumerate(token_counts):
+        if batch and (batch_tokens + tokens > max_request_tokens or len(batch) >= max_request_inputs):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def embed_stream(items, embedder=None, max_request_tokens=MAX_REQUEST_TOKENS, max_request_inputs=MAX_REQUEST_INPUTS,
+                 max_workers=MAX_WORKERS, max_retries=6, progress=None):
+    """Embeds (key, text, tokens) items as they arrive; yields (key, vector) as requests complete.
+
+    Items are packed into requests the way `pack_batches` packs them, and each request is
+    sent by a bounded worker pool as soon as it is full, so producing the items (reading
+    and chunking source files) overlaps with embedding them. While 2 × `max_workers`
+    requests are pending, reading more items waits. Vectors are None for items whose
+    request kept failing. `progress`, if given, is called with the size of each
+    successful request.
+    """
+    embedder = embedder or OpenAIEmbedder()
+    retryable = getattr(embedder, "retryable_errors", ())
+    backoff = SharedBackoff()
+
+    def send(batch):
+        for attempt in range(max_retries + 1):
+            backoff.wait()
+            try:
+                vectors = embedder([text for _, text in batch])
+                backoff.succeeded()
+                return vectors
+            except retryable:
+                if attempt == max_retries:
+                    raise
+                backoff.failed()
+
+    def finished(futures, done):
+        for future in done:
+            batch = futures.pop(future)
+            try:
+                vectors = future.result()
+            except Exception as e:
+                print(f"❌ Error embedding batch of {len(batch)} chunks: {e}")
+                vectors = [None] * len(batch)
+            else:
+                if progress:
+                    progress(len(batch))
+            for (key, _), vector in zip(batch, vectors):
+                yield key, vector
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        batch, batch_tokens = [], 0
+        for key, text, tokens in items:
+            if tokens > MAX_INPUT_TOKENS:
+                print(f"❌ WARNING: Chunk exceeds {MAX_INPUT_TOKENS} tokens! It has {tokens} tokens.")
+            if batch and (batch_tokens + tokens > max_request_tokens or len(batch) >= max_request_inputs):
+                futures[pool.submit(send, batch)] = batch
+                batch, batch_tokens = [], 0
+                yield from finished(futures, [future for future in futures if future.done()])
+                if len(futures) >= 2 * max_workers:
+                    yield from finished(futures, wait(futures, return_when=FIRST_COMPLETED).done)
+            batch.append((key, text))
+            batch_tokens += tokens
+        if batch:
+            futures[pool.submit(send, batch)] = batch
+        while futures:
+            yield from finished(futures, wait(futures, return_when=FIRST_COMPLETED).done)
+
+
+def embed_texts(texts, embedder=None, max_request_tokens=MAX_REQUEST_TOKENS, max_request_inputs=MAX_REQUEST_INPUTS,
+                max_workers=MAX_WORKERS, max_retries=6, progress=None):
+    """Embeds many texts with packed requests sent by a bounded worker pool (see `embed_stream`).
+
+    Returns a list aligned with `texts`; entries whose request kept failing are None.
+    `progress`, if given, is called with the number of texts embedded by each request.
+    """
+    token_counts = [count_tokens(text) for text in texts]
+    batches = pack_batches(token_counts, max_request_tokens, max_request_inputs)
+    print(f"🔹 Embedding {len(texts)} chunks ({sum(token_counts)} tokens) in {len(batches)} requests...")
+    embeddings = [None] * len(texts)
+    for i, vector in embed_stream(zip(range(len(texts)), texts, token_counts), embedder, max_request_tokens,
+                                  max_request_inputs, max_workers, max_retries, progress):
+        embeddings[i] = vector
+    return embeddings
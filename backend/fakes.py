@@ -0,0 +1,272 @@
+"""Offline stand-ins for the external services the backend talks to.
+
+Used by the benchmarks (and handy for local development) so the pipeline can be
+exercised without OpenAI or AWS credentials.
+"""
+import asyncio
+import bisect
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+
+class FakeEncoding:
+    """Offline stand-in for a tiktoken encoding (`encode` / `decode`).
+
+    Words, runs of whitespace and single punctuation marks are one token each, so
+    counts are deterministic and of the same order as a real BPE tokenizer's.
+    """
+
+    _TOKEN = re.compile(r"\w+|\s+|[^\w\s]")
+
+    def __init__(self):
+        self._ids = {}
+        self._pieces = []
+        self._lock = threading.Lock()
+
+    def encode(self, text):
+        tokens = []
+        with self._lock:
+            for piece in self._TOKEN.findall(text):
+                if piece not in self._ids:
+                    self._ids[piece] = len(self._pieces)
+                    self._pieces.append(piece)
+                tokens.append(self._ids[piece])
+        return tokens
+
+    def decode(self, tokens):
+        return "".join(self._pieces[token] for token in tokens)
+
+
+class FakeRateLimitError(Exception):
+    """Raised by FakeEmbedder to simulate an API rate limit."""
+
+
+class FakeEmbedder:
+    """Deterministic embedder: the same text always maps to the same unit vector.
+
+    `latency` is charged once per request and `latency_per_token` per whitespace
+    token, so batching and concurrency can be measured without the network.
+    `rate_limit_every` makes every n-th request raise FakeRateLimitError.
+    """
+
+    retryable_errors = (FakeRateLimitError,)
+
+    def __init__(self, dim=1536, latency=0.0, latency_per_token=0.0, rate_limit_every=0):
+        self.dim = dim
+        self.latency = latency
+        self.latency_per_token = latency_per_token
+        self.rate_limit_every = rate_limit_every
+        self.requests = 0
+        self.inputs = 0
+        self._lock = threading.Lock()
+
+    def embed_one(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def __call__(self, texts):
+        with self._lock:
+            self.requests += 1
+            request_number = self.requests
+        if self.rate_limit_every and request_number % self.rate_limit_every == 0:
+            raise FakeRateLimitError(f"request {request_number} rate limited")
+        time.sleep(self.latency + self.latency_per_token * sum(len(t.split()) for t in texts))
+        with self._lock:
+            self.inputs += len(texts)
+        return [self.embed_one(text).tolist() for text in texts]
+
+
+class FakeOpenAIClient:
+    """Stand-in for the OpenAI client's `embeddings.create` and `chat.completions.create`.
+
+    Embeddings come from a FakeEmbedder. A chat answer's first token arrives after
+    `chat_latency` seconds and each further word after `token_latency`; with `stream=True`
+    the words are delivered as chunks as they are "generated". With `asynchronous=True`
+    both methods are coroutines, like on AsyncOpenAI.
+    """
+
+    def __init__(self, embedding_latency=0.0, chat_latency=0.0, answer="Root cause: fake analysis.",
+                 asynchronous=False, dim=1536, token_latency=0.0):
+        self.embedder = FakeEmbedder(dim=dim)
+        self.embedding_latency = embedding_latency
+        self.chat_latency = chat_latency
+        self.token_latency = token_latency
+        self.answer = answer
+        self.embedding_requests = 0
+        self.chat_requests = 0
+        if asynchronous:
+            self.embeddings = SimpleNamespace(create=self._embed_async)
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat_async))
+        else:
+            self.embeddings = SimpleNamespace(create=self._embed)
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    def _embedding_response(self, texts):
+        self.embedding_requests += 1
+        vectors = self.embedder(texts)
+        tokens = sum(len(text.split()) for text in texts)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=v) for i, v in enumerate(vectors)],
+                               usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens))
+
+    def _chat_response(self):
+        self.chat_requests += 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.answer))])
+
+    def _embed(self, model, input, **kwargs):
+        time.sleep(self.embedding_latency)
+        return self._embedding_response(input)
+
+    async def _embed_async(self, model, input, **kwargs):
+        await asyncio.sleep(self.embedding_latency)
+        return self._embedding_response(input)
+
+    def _pieces(self):
+        words = self.answer.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _chat(self, model, messages, stream=False, **kwargs):
+        if stream:
+            return self._chat_stream()
+        time.sleep(self.chat_latency + self.token_latency * (len(self._pieces()) - 1))
+        return self._chat_response()
+
+    def _chat_stream(self):
+        self.chat_requests += 1
+        time.sleep(self.chat_latency)
+        for i, piece in enumerate(self._pieces()):
+            if i:
+                time.sleep(self.token_latency)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    async def _chat_async(self, model, messages, stream=False, **kwargs):
+        if stream:
+            return self._chat_stream_async()
+        await asyncio.sleep(self.chat_latency + self.token_latency * (len(self._pieces()) - 1))
+        return self._chat_response()
+
+    async def _chat_stream_async(self):
+        self.chat_requests += 1
+        await asyncio.sleep(self.chat_latency)
+        for i, piece in enumerate(self._pieces()):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+
+class FakeLogsClient:
+    """In-memory stand-in for boto3's CloudWatch Logs client (start_query / get_query_results).
+
+    Understands the subset of Logs Insights syntax that `log_retrieval` emits:
+    `fields`, `filter @logStream like "..."` / `@message like "..."` joined by `and`,
+    `sort @timestamp asc|desc` and `limit N`. Events are (timestamp_ms, log_stream, message)
+    tuples. A query reports "Running" until `query_latency` plus `latency_per_event` for
+    every event in its time range has passed, and at least `polls_until_complete` times.
+    Counters record queries run, polls, rows returned and bytes returned.
+    """
+
+    def __init__(self, events, polls_until_complete=0, query_latency=0.0, latency_per_event=0.0, max_results=10000):
+        self.events = sorted(events, key=lambda event: event[0])
+        self._timestamps = [event[0] for event in self.events]
+        self.polls_until_complete = polls_until_complete
+        self.query_latency = query_latency
+        self.latency_per_event = latency_per_event
+        self.max_results = max_results
+        self.queries = 0
+        self.polls = 0
+        self.rows_returned = 0
+        self.bytes_returned = 0
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def start_query(self, logGroupName, startTime, endTime, queryString, **kwargs):
+        fields = re.search(r"fields\s+([^|]+)", queryString).group(1).split(",")
+        fields = [field.strip() for field in fields]
+        filters = re.findall(r'(@logStream|@message)\s+like\s+"((?:[^"\\]|\\.)*)"', queryString)
+        filters = [(name, re.sub(r"\\(.)", r"\1", value)) for name, value in filters]
+        descending = re.search(r"sort\s+@timestamp\s+desc", queryString) is not None
+        limit_match = re.search(r"limit\s+(\d+)", queryString)
+        limit = min(int(limit_match.group(1)) if limit_match else self.max_results, self.max_results)
+
+        # CloudWatch treats both bounds as inclusive whole seconds
+        lo = bisect.bisect_left(self._timestamps, startTime * 1000)
+        hi = bisect.bisect_right(self._timestamps, endTime * 1000 + 999)
+        matches = []
+        for timestamp, stream, message in self.events[lo:hi]:
+            values = {"@logStream": stream, "@message": message}
+            if all(value in values[name] for name, value in filters):
+                matches.append((timestamp, stream, message))
+        if descending:
+            matches.reverse()
+
+        rows = []
+        for timestamp, stream, message in matches[:limit]:
+            stamp = datetime.fromtimestamp(timestamp / 1000, timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+            values = {"@timestamp": stamp, "@message": message, "@logStream": stream}
+            rows.append([{"field": field, "value": values[field]} for field in fields if field in values])
+
+        ready_at = time.monotonic() + self.query_latency + self.latency_per_event * (hi - lo)
+        with self._lock:
+            self.queries += 1
+            query_id = f"fake-{self.queries}"
+            self._results[query_id] = [rows, self.polls_until_complete, ready_at, hi - lo]
+            self.rows_returned += len(rows)
+            self.bytes_returned += sum(len(f["value"]) for row in rows for f in row)
+        return {"queryId": query_id}
+
+    def get_query_results(self, queryId, **kwargs):
+        with self._lock:
+            self.polls += 1
+            entry = self._results[queryId]
+            if entry[1] > 0 or time.monotonic() < entry[2]:
+                entry[1] -= 1
+                return {"status": "Running", "results": []}
+            del self._results[queryId]
+        # Like Logs Insights: every event of the time range is scanned, whatever the filter
+        return {"status": "Complete", "results": entry[0],
+                "statistics": {"recordsMatched": float(len(entry[0])), "recordsScanned": float(entry[3])}}
+
+    def stop_query(self, queryId, **kwargs):
+        with self._lock:
+            return {"success": self._results.pop(queryId, None) is not None}
+
+
+class AsyncFakeLogsClient:
+    """FakeLogsClient behind coroutine methods, shaped like an aiobotocore client."""
+
+    def __init__(self, *args, **kwargs):
+        self.fake = FakeLogsClient(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.fake, name)
+
+    async def start_query(self, **kwargs):
+        return self.fake.start_query(**kwargs)
+
+    async def get_query_results(self, **kwargs):
+        return self.fake.get_query_results(**kwargs)
+
+    async def stop_query(self, **kwargs):
+        return self.fake.stop_query(**kwargs)
+
+
+def synthetic_log_events(count, start_ms, log_stream="qa_aro-service", error_every=1000,
+                         error_text="ERROR c.a.aro.vt.gao.QueryComposerFactory - query failed", interval_ms=10, seed=0):
+    """Generates container-log events in the `{"time": ..., "log": ...}` shape CloudWatch holds."""
+    rng = random.Random(seed)
+    for i in range(count):
+        timestamp = start_ms + i * interval_ms
+        iso = datetime.fromtimestamp(timestamp / 1000, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f") + "123Z"
+        if error_every and i % error_every == error_every - 1:
+            log = f"{iso[11:23]} [main] {error_text} id={rng.randint(1, 10**6)}"
+        else:
+            log = f"{iso[11:23]} [main] DEBUG c.a.aro.service.Worker{i % 17} - processed item {rng.randint(1, 10**6)}"
+        yield timestamp, log_stream, json.dumps({"time": iso, "log": log})
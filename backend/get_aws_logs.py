@@ -2,11 +2,27 @@ import boto3
 import time
 import json
 from datetime import datetime, timedelta, timezone
+from log_context import extract_contexts
 
 client = boto3.client("logs")
 
+def parse_rows(rows):
+    """Yields the timestamp/log of each JSON container log row, skipping malformed ones."""
+    for row in rows:
+        raw_log = row[1]["value"]  # Extract @message field
+        try:
+            log_data = json.loads(raw_log)  # Parse JSON log
+            yield {"timestamp": log_data["time"], "log": log_data["log"]}
+        except (json.JSONDecodeError, KeyError):
+            continue  # Skip malformed logs
+
+
 def get_logs_with_context(log_group, start_timestamp, end_timestamp, error_message, log_stream, limit=5, max_occurrences=3):
-    """Fetch logs from AWS CloudWatch, including 5 logs before & after each error occurrence."""
+    """Fetch logs from AWS CloudWatch, including `limit` logs before & after each error occurrence.
+
+    `error_message` may be a list of messages; occurrences close enough to share context lines
+    are merged into one window, so no line is printed twice.
+    """
     
     # 1️⃣ Step 1: Retrieve ALL logs in the time range
     query_all = f'''
@@ -35,39 +51,27 @@ def get_logs_with_context(log_group, start_timestamp, end_timestamp, error_messa
             break
         time.sleep(2)
     
-    # 2️⃣ Step 2: Parse logs & extract relevant messages
-    all_logs = []
-    for row in result.get("results", []):
-        raw_log = row[1]["value"]  # Extract @message field
-        try:
-            log_data = json.loads(raw_log)  # Parse JSON log
-            all_logs.append({
-                "timestamp": log_data["time"],
-                "log": log_data["log"]
-            })
-        except (json.JSONDecodeError, KeyError):
-            continue  # Skip malformed logs
+    # 2️⃣ Step 2: Stream the parsed logs through the context extractor (no list of every log is kept)
+    windows = extract_contexts(parse_rows(result.get("results", [])), error_message, before=limit, after=limit,
+                               text=lambda log: log["log"])
 
-    # 3️⃣ Step 3: Find all occurrences of the error
-    error_indices = [i for i, log in enumerate(all_logs) if error_message in log["log"]]
+    # 3️⃣ Step 3: Keep the first `max_occurrences` windows, still counting every occurrence
+    logs_with_context = []
+    occurrences = 0
+    for index, window in enumerate(windows):
+        occurrences += len(window.hits)
+        if index >= max_occurrences:
+            continue
+        formatted_logs = [f"{log['timestamp']} - {log['log']}" for log in window.lines]
+        merged = f" ({len(window.hits)} occurrences)" if len(window.hits) > 1 else ""
+        logs_with_context.append(f"\n🛑 **Context around Error Occurrence {index + 1}{merged}**:")
+        logs_with_context.extend(formatted_logs)
 
-    if not error_indices:
+    if not occurrences:
         print("❌ No logs found matching the error message.")
         return []
 
-    print(f"🔍 Found {len(error_indices)} occurrences of the error message.")
-
-    # 4️⃣ Step 4: Retrieve logs within ±5 range of each error (limit occurrences if needed)
-    logs_with_context = []
-    for index, error_index in enumerate(error_indices[:max_occurrences]):  # Limit occurrences
-        start_index = max(0, error_index - 5)
-        end_index = min(len(all_logs), error_index + 6)  # +6 to include the error itself
-
-        context_logs = all_logs[start_index:end_index]
-        formatted_logs = [f"{log['timestamp']} - {log['log']}" for log in context_logs]
-
-        logs_with_context.append(f"\n🛑 **Context around Error Occurrence {index + 1}**:")
-        logs_with_context.extend(formatted_logs)
+    print(f"🔍 Found {occurrences} occurrences of the error message.")
 
     return logs_with_context
 
@@ -0,0 +1,216 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import faiss
+
+from metrics import Counter, span
+from symbol_index import load_symbol_index
+from vector_store import VectorStore, convert_json, current_generation, store_exists
+
+# One directory per repository: <INDEX_ROOT>/<name>/java_embeddings.*. The default
+# repository is the working directory, where single-repository setups keep their index.
+INDEX_ROOT = os.getenv("INDEX_ROOT", "indexes")
+DEFAULT_REPOSITORY = "default"
+# Indexes are evicted least recently used once the loaded ones add up to more than this
+INDEX_MEMORY_BUDGET_MB = int(os.getenv("INDEX_MEMORY_BUDGET_MB", "4096"))
+
+INDEX_FILE = "java_embeddings.index"
+JSON_FILE = "java_embeddings.json"  # Legacy format, converted on first load
+STORE_NAME = "java_embeddings"
+MANIFEST_FILE = "java_embeddings.manifest.json"
+SYMBOLS_FILE = "java_embeddings.symbols.json"
+
+_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+INDEX_LOADS = Counter("code_index_loads_total", "Repository indexes loaded from disk.", ("repository",))
+INDEX_EVICTIONS = Counter("code_index_evictions_total", "Repository indexes evicted to stay within the memory budget.",
+                          ("repository",))
+
+
+def repository_name(name):
+    """Validates a repository name; None and "" mean DEFAULT_REPOSITORY."""
+    name = name or DEFAULT_REPOSITORY
+    if not _NAME.match(name):
+        raise ValueError(f"❌ Invalid repository name `{name}`: use letters, digits, `.`, `_` and `-`.")
+    return name
+
+
+def repository_dir(name):
+    name = repository_name(name)
+    return "." if name == DEFAULT_REPOSITORY else os.path.join(INDEX_ROOT, name)
+
+
+def repository_paths(name):
+    """The file paths of a repository's index, as keyword arguments of `embed_java_v2.build_index`."""
+    directory = repository_dir(name)
+    return {
+        "index_path": os.path.join(directory, INDEX_FILE),
+        "store_prefix": os.path.join(directory, STORE_NAME),
+        "manifest_path": os.path.join(directory, MANIFEST_FILE),
+        "symbols_path": os.path.join(directory, SYMBOLS_FILE),
+        "json_path": os.path.join(directory, JSON_FILE),
+    }
+
+
+def read_index_mmap(path):
+    """Opens a FAISS index memory-mapped, so worker processes share its pages.
+
+    IO_FLAG_MMAP_IFC maps flat vector codes straight from the file (zero-copy);
+    index types that cannot be mapped fall back to a regular read.
+    """
+    for flag in ("IO_FLAG_MMAP_IFC", "IO_FLAG_MMAP"):
+        if hasattr(faiss, flag):
+            try:
+                return faiss.read_index(path, getattr(faiss, flag) | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError as e:
+                print(f"⚠️ Could not memory-map `{path}` with {flag}: {e}")
+    return faiss.read_index(path)
+
+
+class RepositoryIndex:
+    """The FAISS index, snippet store and symbol index of one repository, as loaded together."""
+
+    def __init__(self, name):
+        paths = repository_paths(name)
+        if not os.path.exists(paths["index_path"]) and current_generation(paths["store_prefix"]) is None:
+            raise FileNotFoundError(
+                f"❌ `{paths['index_path']}` not found! Run `python embed_java_v2.py <source_dir> "
+                f"--repository {name}` or POST /index to build it."
+            )
+        # Memory-mapped, converted once from the legacy JSON if needed
+        if not store_exists(paths["store_prefix"]) and os.path.exists(paths["json_path"]):
+            convert_json(paths["json_path"], paths["store_prefix"], paths["index_path"])
+        self.name = name
+        self.store = VectorStore(paths["store_prefix"])
+        # The index written in the same generation as the store, so the two always match;
+        # stores from before generations pair with the plain index file
+        index_path = self.store.index_path or paths["index_path"]
+        self.index = read_index_mmap(index_path)
+        if self.index.ntotal != len(self.store):
+            print(f"⚠️ `{name}` index has {self.index.ntotal} vectors for {len(self.store)} snippets: re-index it.")
+        # None when the index was built before symbol indexes existed
+        self.symbols = load_symbol_index(paths["symbols_path"])
+        # The footprint once every page is touched: mapped index and store, plus the parsed symbols
+        files = [index_path, paths["symbols_path"], *self.store.files]
+        self.bytes = sum(os.path.getsize(path) for path in files if os.path.exists(path))
+        self.loaded_at = self.used_at = time.time()
+
+
+class IndexRegistry:
+    """Named repository indexes, loaded on first use and evicted least recently used.
+
+    Concurrent requests for an index that is not loaded wait on one shared load. An
+    evicted (or swapped) index is not closed: requests already holding it finish on it,
+    and it is released once the last of them drops its reference.
+    """
+
+    def __init__(self, memory_budget=INDEX_MEMORY_BUDGET_MB * 2 ** 20):
+        self.memory_budget = memory_budget
+        self._loaded = OrderedDict()  # name -> RepositoryIndex, least recently used first
+        self._loading = {}  # name -> Future of the load in progress
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def is_loaded(self, name=None):
+        return repository_name(name) in self._loaded
+
+    def get(self, name=None):
+        """The loaded index of a repository; FileNotFoundError if it has none, ValueError for invalid names."""
+        name = repository_name(name)
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None:
+                self._loaded.move_to_end(name)
+                entry.used_at = time.time()
+                return entry
+            future = self._loading.get(name)
+            owner = future is None
+            if owner:
+                future = self._loading[name] = Future()
+        if not owner:
+            return future.result()
+        try:
+            entry = self._load(name)
+        except BaseException as e:
+            with self._lock:
+                del self._loading[name]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._loading[name]
+            self._install(entry)
+        future.set_result(entry)
+        return entry
+
+    def swap(self, name=None):
+        """Re-opens a repository's files (after a re-index) and replaces the loaded index atomically."""
+        entry = self._load(repository_name(name))
+        with self._lock:
+            self._install(entry)
+        print(f"🔄 Swapped in new `{entry.name}` index with {entry.index.ntotal} vectors.")
+        return entry
+
+    def _load(self, name):
+        with span("index_load", repository=name) as attributes:
+            entry = RepositoryIndex(name)
+            attributes.update(vectors=entry.index.ntotal, mb=round(entry.bytes / 2 ** 20, 1))
+        INDEX_LOADS.inc(repository=name)
+        self.loads += 1
+        print(f"📦 Loaded `{name}` index: {entry.index.ntotal} vectors, {entry.bytes / 2 ** 20:.1f} MB.")
+        return entry
+
+    def _install(self, entry):
+        """Adds a freshly loaded index as the most recently used and evicts down to the budget (lock held)."""
+        self._loaded[entry.name] = entry
+        self._loaded.move_to_end(entry.name)
+        # The index just asked for always stays, even when it alone is over budget
+        while len(self._loaded) > 1 and self.resident_bytes() > self.memory_budget:
+            name, _ = self._loaded.popitem(last=False)
+            INDEX_EVICTIONS.inc(repository=name)
+            self.evictions += 1
+            print(f"🧹 Evicted `{name}` index to stay within {self.memory_budget / 2 ** 20:.0f} MB.")
+
+    def resident_bytes(self):
+        return sum(entry.bytes for entry in self._loaded.values())
+
+    def repositories(self):
+        """Every repository with an index on disk, and whether it is loaded."""
+        names = [DEFAULT_REPOSITORY] if os.path.exists(INDEX_FILE) else []
+        if os.path.isdir(INDEX_ROOT):
+            names += sorted(name for name in os.listdir(INDEX_ROOT)
+                            if _NAME.match(name) and name != DEFAULT_REPOSITORY
+                            and os.path.exists(os.path.join(INDEX_ROOT, name, INDEX_FILE)))
+        loaded = dict(self._loaded)
+        return [{"name": name, "loaded": name in loaded,
+                 "vectors": loaded[name].index.ntotal if name in loaded else None,
+                 "mb": round(loaded[name].bytes / 2 ** 20, 1) if name in loaded else None,
+                 "idle_seconds": round(time.time() - loaded[name].used_at, 1) if name in loaded else None}
+                for name in names]
+
+    def stats(self):
+        return {
+            "loaded": list(self._loaded),
+            "resident_mb": round(self.resident_bytes() / 2 ** 20, 1),
+            "budget_mb": round(self.memory_budget / 2 ** 20, 1),
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_index_registry():
+    """The process-wide registry, budgeted by INDEX_MEMORY_BUDGET_MB."""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = IndexRegistry()
+    return _default_registry
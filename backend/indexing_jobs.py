@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+import uuid
+
+import code_retrieval
+from ann_index import INDEX_TYPES, METRICS
+from embed_java_v2 import build_index
+from index_registry import repository_name, repository_paths
+
+# Finished jobs kept around for GET /index
+MAX_FINISHED_JOBS = 20
+# Source trees POST /index may read: SOURCE_ROOT and the directories below it; relative paths start there
+SOURCE_ROOT = os.getenv("SOURCE_ROOT", "sources")
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+class IndexJob:
+    """A background re-index of one source directory into a repository's index, swapped in when it finishes."""
+
+    def __init__(self, source_dir, index_type=None, metric=None, repository=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.source_dir = source_dir
+        self.repository = repository_name(repository)
+        self.index_type = index_type
+        self.metric = metric
+        self.status = "pending"
+        self.error = None
+        self.stats = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.counters = {"files_total": 0, "files_scanned": 0, "chunks_total": 0, "chunks_reused": 0,
+                         "chunks_pending": 0, "chunks_embedded": 0}
+
+    def update(self, **counters):
+        self.counters.update(counters)
+
+    def run(self, embedder=None):
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            self.stats = build_index(self.source_dir, embedder=embedder, progress=self.update,
+                                     index_type=self.index_type, metric=self.metric,
+                                     **repository_paths(self.repository))
+            # Requests already searching keep the old pair, new ones get the fresh index
+            code_retrieval.swap_index(self.repository)
+            self.status = "completed"
+        except Exception as e:
+            print(f"❌ Indexing job {self.id} failed: {e}")
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            self.finished_at = time.time()
+
+    def to_dict(self):
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        return {
+            "id": self.id,
+            "source_dir": self.source_dir,
+            "repository": self.repository,
+            "index_type": self.index_type,
+            "metric": self.metric,
+            "status": self.status,
+            "error": self.error,
+            "elapsed_seconds": round(elapsed, 2),
+            "chunks_per_second": round(self.counters["chunks_embedded"] / elapsed, 1) if elapsed else 0.0,
+            "stats": self.stats,
+            **self.counters,
+        }
+
+
+def resolve_source_dir(source_dir, root=None):
+    """The real path of a requested source tree; ValueError unless it is a directory under `root` (SOURCE_ROOT)."""
+    root = os.path.realpath(root or SOURCE_ROOT)
+    directory = os.path.realpath(os.path.join(root, source_dir))
+    if os.path.commonpath([root, directory]) != root:
+        raise ValueError(f"❌ Source directory `{source_dir}` is outside {root}.")
+    if not os.path.isdir(directory):
+        raise ValueError(f"❌ Source directory `{source_dir}` does not exist.")
+    return directory
+
+
+def start_job(source_dir, embedder=None, index_type=None, metric=None, repository=None):
+    """Starts a background indexing job; only one job runs at a time, whatever the repository.
+
+    `source_dir` comes from the request, so it must resolve under SOURCE_ROOT.
+    """
+    repository = repository_name(repository)
+    source_dir = resolve_source_dir(source_dir)
+    if index_type not in (None, *INDEX_TYPES):
+        raise ValueError(f"❌ Unknown index type `{index_type}`, expected one of {', '.join(INDEX_TYPES)}.")
+    if metric not in (None, *METRICS):
+        raise ValueError(f"❌ Unknown metric `{metric}`, expected one of {', '.join(METRICS)}.")
+    with _jobs_lock:
+        running = [job for job in _jobs.values() if job.status in ("pending", "running")]
+        if running:
+            raise RuntimeError(f"❌ Indexing job {running[0].id} is still {running[0].status}.")
+        finished = sorted((job for job in _jobs.values() if job.finished_at), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS + 1)]:
+            del _jobs[job.id]
+        job = IndexJob(source_dir, index_type, metric, repository)
+        _jobs[job.id] = job
+    threading.Thread(target=job.run, args=(embedder,), name=f"index-job-{job.id}", daemon=True).start()
+    return job
+
+
+def get_job(job_id):
+    return _jobs.get(job_id)
+
+
+def list_jobs():
+    return sorted(_jobs.values(), key=lambda job: job.created_at, reverse=True)
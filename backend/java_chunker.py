@@ -0,0 +1,268 @@
+import bisect
+import re
+
+from embedder import count_tokens, get_encoding
+
+# Chunks grow by merging neighbouring members up to MAX tokens; members under MIN get merged
+MAX_CHUNK_TOKENS = 1200
+MIN_CHUNK_TOKENS = 120
+
+_TYPE_DECLARATION = re.compile(r"\b(class|interface|enum|record)\s+(\w+)")
+_METHOD_DECLARATION = re.compile(r"(\w+)\s*\([^()]*(?:\([^()]*\)[^()]*)*\)\s*(?:throws\s+[\w.$,\s]+)?$")
+_ANNOTATION = re.compile(r"@[\w.$]+(?:\s*\((?:[^()]|\([^()]*\))*\))?")
+_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_PROVENANCE = re.compile(r"^// (?P<file>.+?):(?P<start_line>\d+)-(?P<end_line>\d+)(?: \| (?P<symbol>.+))?$")
+_NOT_METHODS = {"if", "for", "while", "switch", "catch", "synchronized", "return", "new", "else", "try"}
+
+
+def skip_literal(source, i):
+    """If a string/char literal or comment starts at `i`, returns the index just past it."""
+    n = len(source)
+    char = source[i]
+    if char in "\"'":
+        if source.startswith('"""', i):
+            close = source.find('"""', i + 3)
+            return n if close == -1 else close + 3
+        i += 1
+        while i < n and source[i] != char and source[i] != "\n":
+            i += 2 if source[i] == "\\" else 1
+        return min(i + 1, n)
+    if source.startswith("//", i):
+        newline = source.find("\n", i)
+        return n if newline == -1 else newline
+    if source.startswith("/*", i):
+        close = source.find("*/", i + 2)
+        return n if close == -1 else close + 2
+    return i
+
+
+def find_block_end(source, open_brace):
+    """Index just past the brace closing the one at `open_brace` (end of text if unbalanced)."""
+    depth, i, n = 0, open_brace, len(source)
+    while i < n:
+        skipped = skip_literal(source, i)
+        if skipped != i:
+            i = skipped
+            continue
+        if source[i] == "{":
+            depth += 1
+        elif source[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return n
+
+
+def segments(source, start, end):
+    """Splits a class body (or a whole file) into top-level declarations.
+
+    Yields (start, brace, end) per declaration: `brace` is the offset of its body's
+    opening brace, or None for declarations ending in `;` (fields, imports). Leading
+    comments and annotations belong to the declaration that follows them.
+    """
+    i, segment_start, brace = start, start, None
+    while i < end:
+        skipped = skip_literal(source, i)
+        if skipped != i:
+            i = skipped
+            continue
+        char = source[i]
+        if char == ";":
+            yield segment_start, brace, i + 1
+            segment_start, brace = i + 1, None
+        elif char == "{":
+            block_end = min(find_block_end(source, i), end)
+            declaration = strip_noise(source[segment_start:i])
+            if "=" in declaration or declaration.endswith(("->", ",")):
+                # An initializer holding a lambda / anonymous class, or an array literal: runs to its `;`
+                i = block_end
+                continue
+            yield segment_start, i, block_end
+            segment_start, brace = block_end, None
+            i = block_end
+            continue
+        elif char == "}":
+            break
+        i += 1
+    if source[segment_start:min(i, end)].strip():
+        yield segment_start, None, min(i, end)
+
+
+def strip_noise(declaration):
+    """A declaration without comments, annotations and surrounding whitespace."""
+    return _ANNOTATION.sub(" ", _COMMENT.sub(" ", declaration)).strip()
+
+
+def members(source, start, end, owner):
+    """Flattens the declarations in [start, end) into (kind, owner, name, start, end) units.
+
+    Types recurse: their declaration line is a unit of its own, followed by their members
+    (closing braces are left out, they carry nothing worth retrieving).
+    """
+    units = []
+    for segment_start, brace, segment_end in segments(source, start, end):
+        declaration = strip_noise(source[segment_start:brace if brace is not None else segment_end])
+        type_match = _TYPE_DECLARATION.search(declaration) if brace is not None else None
+        method_match = _METHOD_DECLARATION.search(declaration) if brace is not None else None
+        if type_match and not (method_match and method_match.start() > type_match.end()):
+            name = f"{owner}.{type_match.group(2)}" if owner else type_match.group(2)
+            units.append(("declaration", name, None, segment_start, brace + 1))
+            units.extend(members(source, brace + 1, segment_end, name))
+        elif method_match and method_match.group(1) not in _NOT_METHODS:
+            units.append(("method", owner, method_match.group(1), segment_start, segment_end))
+        elif declaration.startswith(("package", "import")):
+            continue
+        else:
+            units.append(("field", owner, None, segment_start, segment_end))
+    return units
+
+
+def symbol(owner, names):
+    """`Class#method` (Javadoc style); nested classes are dotted, merged members comma-separated.
+
+    Top-level functions (Python, Kotlin, TypeScript) are `#function`, so they read back as methods.
+    """
+    if names:
+        return f"{owner}#{', '.join(names)}"
+    return owner
+
+
+def provenance_header(path, lines, owner, names):
+    """The comment line a chunk starts with: `// path:start-end | Class#method`."""
+    location = f"{path}:{lines[0]}-{lines[1]}" if lines else path
+    label = symbol(owner, names)
+    return f"// {location}" + (f" | {label}" if label else "")
+
+
+def parse_provenance(snippet):
+    """Reads back the file, line range and class/method a chunk's first line records (None if absent)."""
+    match = _PROVENANCE.match(snippet.split("\n", 1)[0])
+    if not match:
+        return None
+    owner, _, methods = (match.group("symbol") or "").partition("#")
+    return {
+        "file": match.group("file"),
+        "start_line": int(match.group("start_line")),
+        "end_line": int(match.group("end_line")),
+        "class": owner or None,
+        "method": methods or None,
+    }
+
+
+def common_owner(a, b):
+    """The innermost class enclosing both dotted class names ("" if none)."""
+    common = []
+    for x, y in zip(a.split("."), b.split(".")):
+        if x != y:
+            break
+        common.append(x)
+    return ".".join(common)
+
+
+def split_lines(text, max_tokens):
+    """Splits an oversized member into pieces of whole lines under `max_tokens` each."""
+    pieces, current, current_tokens = [], [], 0
+    for line in text.split("\n"):
+        tokens = count_tokens(line) + 1
+        if current and current_tokens + tokens > max_tokens:
+            pieces.append("\n".join(current))
+            current, current_tokens = [], 0
+        if tokens > max_tokens:
+            # A single enormous line (minified / generated code): cut it by tokens
+            encoding = get_encoding()
+            encoded = encoding.encode(line)
+            pieces.extend(encoding.decode(encoded[k:k + max_tokens]) for k in range(0, len(encoded), max_tokens))
+            continue
+        current.append(line)
+        current_tokens += tokens
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def chunk_java(source, path="", max_tokens=MAX_CHUNK_TOKENS, min_tokens=MIN_CHUNK_TOKENS):
+    """Splits a Java source file at class and method boundaries.
+
+    Each member (method, constructor, field, class declaration) of each class, nested
+    ones included, is a unit. Neighbouring units are merged while either side is under
+    `min_tokens` and the result stays within `max_tokens`; a unit
+    over `max_tokens` is split by lines. Returns chunk dicts with the `file`,
+    `start_line` / `end_line` (1-based, inclusive), enclosing `class` and `method`
+    names, the `code` served to users (prefixed with a provenance comment), the
+    `text` to embed (same prefix without line numbers, so moving code does not
+    change it) and its `tokens`.
+    """
+    return chunk_units(source, path, members(source, 0, len(source), ""), max_tokens, min_tokens)
+
+
+def chunk_units(source, path, spans, max_tokens=MAX_CHUNK_TOKENS, min_tokens=MIN_CHUNK_TOKENS):
+    """Merges (kind, owner, name, start, end) member spans of a file into chunks, as `chunk_java` describes.
+
+    Shared by the chunkers of every language (see `code_chunkers`): they differ only in
+    how they find the members.
+    """
+    newlines = [i for i, char in enumerate(source) if char == "\n"]
+
+    def line_of(offset):
+        return bisect.bisect_right(newlines, offset) + 1
+
+    units = []
+    for kind, owner, name, start, end in spans:
+        text = source[start:end]
+        stripped = text.lstrip()
+        start += len(text) - len(stripped)
+        text = stripped.rstrip()
+        if text:
+            units.append({"kind": kind, "owner": owner, "name": name, "start": start, "end": start + len(text),
+                          "text": text, "tokens": count_tokens(text)})
+    if not units:
+        # Nothing recognisable as a class: fall back to line windows over the whole file
+        units = [{"kind": "field", "owner": "", "name": None, "start": 0, "end": len(source),
+                  "text": source.strip(), "tokens": count_tokens(source)}] if source.strip() else []
+
+    groups = []
+    for unit in units:
+        last = groups[-1] if groups else None
+        if (last and last["tokens"] + unit["tokens"] <= max_tokens
+                and (last["tokens"] < min_tokens or unit["tokens"] < min_tokens)):
+            # Small members of nested types merge too, labelled with the class enclosing both
+            last["owner"] = common_owner(last["owner"], unit["owner"])
+            last["units"].append(unit)
+            last["tokens"] += unit["tokens"]
+        else:
+            groups.append({"owner": unit["owner"], "units": [unit], "tokens": unit["tokens"]})
+
+    chunks = []
+    for group in groups:
+        start, end = group["units"][0]["start"], group["units"][-1]["end"]
+        # Whole lines: the indentation before the first member, closing braces after the last
+        line_start = source.rfind("\n", 0, start) + 1
+        if not source[line_start:start].strip():
+            start = line_start
+        line_end = source.find("\n", end)
+        line_end = len(source) if line_end == -1 else line_end
+        if set(source[end:line_end]) <= set(" \t\r}"):
+            end = line_end
+        names = [unit["name"] for unit in group["units"] if unit["name"]]
+        code = source[start:end]
+        pieces = split_lines(code, max_tokens) if group["tokens"] > max_tokens else [code]
+        offset = 0
+        for number, piece in enumerate(pieces, 1):
+            offset = code.find(piece, offset)
+            first_line = line_of(start + offset)
+            lines = (first_line, first_line + piece.count("\n"))
+            offset += len(piece)
+            label = names if len(pieces) == 1 else [f"{', '.join(names) or 'body'} (part {number}/{len(pieces)})"]
+            text = provenance_header(path, None, group["owner"], label) + "\n" + piece
+            chunks.append({
+                "file": path,
+                "start_line": lines[0],
+                "end_line": lines[1],
+                "class": group["owner"] or None,
+                "method": ", ".join(names) or None,
+                "code": provenance_header(path, lines, group["owner"], label) + "\n" + piece,
+                "text": text,
+                "tokens": count_tokens(text),
+            })
+    return chunks
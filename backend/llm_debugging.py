@@ -1,9 +1,16 @@
+import asyncio
 import openai
 import os
 import json
+import time
+from embedder import get_async_openai
+from metrics import PROMPT_TOKENS, PROMPT_TOKENS_SAVED, record_span, span
+from prompt_builder import compact, format_report
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+CHAT_MODEL = "gpt-4-turbo"
+
 
 def format_java_code(java_snippets):
     """Format retrieved Java code for better readability."""
@@ -18,18 +25,27 @@ def format_java_code(java_snippets):
 def format_logs(logs):
     """Convert logs into structured JSON for better readability."""
     try:
-        return json.dumps(logs, indent=2)
+        return json.dumps(logs, indent=2, ensure_ascii=False)  # Escaped emoji would cost tokens
     except Exception as e:
         print(f"❌ Error formatting logs: {e}")
         return str(logs)  # Fallback to string
 
-def ask_gpt(logs, relevant_code):
-    """Send structured logs + formatted Java code to GPT-4 for debugging."""
-    
-    formatted_code = format_java_code(relevant_code)  
-    structured_logs = format_logs(logs)  
+def build_prompt(logs, relevant_code, error_message=""):
+    """Builds the debugging prompt from structured logs + formatted Java code.
+
+    Logs and code are first compacted into `PROMPT_TOKEN_BUDGET` tokens (see `prompt_builder`).
+    """
+    with span("prompt_build") as attributes:
+        log_lines, snippets, report = compact(logs, relevant_code, error_message)
+        attributes.update(tokens=report["tokens_after"], tokens_before=report["tokens_before"])
+    PROMPT_TOKENS.observe(report["tokens_after"])
+    PROMPT_TOKENS_SAVED.inc(report["tokens_before"] - report["tokens_after"])
+    print(format_report(report))
 
-    prompt = f"""
+    formatted_code = format_java_code(snippets)  
+    structured_logs = format_logs(log_lines)  
+
+    return f"""
     You are an expert Java developer and troubleshooting engineer. Below are error logs and relevant Java code.
 
     📌 **Error Logs (structured JSON):**
@@ -48,13 +64,52 @@ def ask_gpt(logs, relevant_code):
     Respond with a **detailed explanation** and **proposed solution**.
     """
 
-    response = openai.chat.completions.create(
-        model="gpt-4-turbo",
-        messages=[{"role": "user", "content": prompt}]
-    )
+def ask_gpt(logs, relevant_code, client=None, error_message=""):
+    """Send structured logs + formatted Java code to GPT-4 for debugging."""
+    prompt = build_prompt(logs, relevant_code, error_message)
+    with span("llm_total"):
+        response = (client or openai).chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": prompt}]
+        )
 
     return response.choices[0].message.content
 
+async def ask_gpt_async(logs, relevant_code, client=None, error_message=""):
+    """`ask_gpt` for the async request path, on the pooled AsyncOpenAI client.
+
+    Prompt compaction tokenizes the whole request, so it runs in a worker thread, off the event loop.
+    """
+    prompt = await asyncio.to_thread(build_prompt, logs, relevant_code, error_message)
+    with span("llm_total"):
+        response = await (client or get_async_openai()).chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": prompt}]
+        )
+
+    return response.choices[0].message.content
+
+async def stream_gpt_async(logs, relevant_code, client=None, error_message=""):
+    """`ask_gpt_async` that yields the answer's text pieces as the model produces them.
+
+    Records the time to the first piece (`llm_first_token`) and to the end of the answer (`llm_total`).
+    """
+    prompt = await asyncio.to_thread(build_prompt, logs, relevant_code, error_message)
+    started = time.perf_counter()
+    stream = await (client or get_async_openai()).chat.completions.create(
+        model=CHAT_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        stream=True,
+    )
+    first = True
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            if first:
+                record_span("llm_first_token", time.perf_counter() - started)
+                first = False
+            yield chunk.choices[0].delta.content
+    record_span("llm_total", time.perf_counter() - started, streamed=True)
+
 
 # If running as a standalone script
 if __name__ == "__main__":
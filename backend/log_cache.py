@@ -0,0 +1,284 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+LOG_CACHE_PATH = os.getenv("LOG_CACHE_PATH", "log_cache.sqlite")
+MAX_CACHED_ROWS = 2_000_000
+# Lines younger than this may still be arriving in CloudWatch, so they are never cached
+FRESHNESS_MS = 10 * 60 * 1000
+# Rows per page when a stream reads cached rows back
+READ_BATCH_ROWS = 10000
+
+
+class LogCache:
+    """Local store of already-fetched log rows, keyed by (log group, log stream, kind, time interval).
+
+    `kind` separates what was fetched over an interval: "" for every line of the stream,
+    "lines:<text>" for the lines matching an error message (the timestamp-only "match:<text>"
+    segments of older versions are no longer read). Covered intervals are kept as segments;
+    overlapping and adjacent segments are merged, so a request only fetches the sub-intervals
+    no earlier request covered. Whole segments are evicted least recently used first once
+    the store holds more than `max_rows` rows.
+    """
+
+    def __init__(self, path=LOG_CACHE_PATH, max_rows=MAX_CACHED_ROWS, freshness_ms=FRESHNESS_MS):
+        self.path = path
+        self.max_rows = max_rows
+        self.freshness_ms = freshness_ms
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.rows_from_cache = 0
+        self.rows_fetched = 0
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS segments (
+                id INTEGER PRIMARY KEY, log_group TEXT, log_stream TEXT, kind TEXT,
+                start_ms INTEGER, end_ms INTEGER, last_used REAL
+            );
+            CREATE INDEX IF NOT EXISTS segments_key ON segments (log_group, log_stream, kind, start_ms);
+            CREATE TABLE IF NOT EXISTS lines (
+                log_group TEXT, log_stream TEXT, kind TEXT, ms INTEGER, seq INTEGER, timestamp TEXT, log TEXT
+            );
+            CREATE INDEX IF NOT EXISTS lines_key ON lines (log_group, log_stream, kind, ms, seq);
+        """)
+        self._db.commit()
+        self._rows = self._db.execute("SELECT COUNT(*) FROM lines").fetchone()[0]
+
+    def _segments(self, key, start_ms, end_ms):
+        return self._db.execute(
+            "SELECT id, start_ms, end_ms FROM segments WHERE log_group = ? AND log_stream = ? AND kind = ? "
+            "AND end_ms >= ? AND start_ms <= ? ORDER BY start_ms",
+            (*key, start_ms, end_ms),
+        ).fetchall()
+
+    def missing(self, log_group, log_stream, start_ms, end_ms, kind=""):
+        """Returns the sub-intervals of [start_ms, end_ms] no stored segment covers."""
+        with self._lock:
+            segments = self._segments((log_group, log_stream, kind), start_ms, end_ms)
+        gaps, cursor = [], start_ms
+        for _, lo, hi in segments:
+            if lo > cursor:
+                gaps.append((cursor, lo - 1))
+            cursor = max(cursor, hi + 1)
+        if cursor <= end_ms:
+            gaps.append((cursor, end_ms))
+        return gaps
+
+    def store(self, log_group, log_stream, start_ms, end_ms, rows, kind=""):
+        """Records `rows` (dicts with ms/timestamp/log, in order) as the full content of the interval."""
+        key = (log_group, log_stream, kind)
+        with self._lock:
+            self._rows -= self._db.execute(
+                "DELETE FROM lines WHERE log_group = ? AND log_stream = ? AND kind = ? AND ms BETWEEN ? AND ?",
+                (*key, start_ms, end_ms),
+            ).rowcount
+            self._rows += len(rows)
+            self._db.executemany(
+                "INSERT INTO lines VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*key, row["ms"], seq, row.get("timestamp", ""), row.get("log", "")) for seq, row in enumerate(rows)],
+            )
+            # Merge with every overlapping or adjacent segment
+            touching = self._segments(key, start_ms - 1, end_ms + 1)
+            if touching:
+                start_ms = min(start_ms, touching[0][1])
+                end_ms = max(end_ms, max(hi for _, _, hi in touching))
+                self._db.executemany("DELETE FROM segments WHERE id = ?", [(segment_id,) for segment_id, _, _ in touching])
+            self._db.execute(
+                "INSERT INTO segments (log_group, log_stream, kind, start_ms, end_ms, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (*key, start_ms, end_ms, time.time()),
+            )
+            self._evict()
+            self._db.commit()
+
+    def read(self, log_group, log_stream, start_ms, end_ms, kind=""):
+        """Returns the stored rows in [start_ms, end_ms] in their original order."""
+        key = (log_group, log_stream, kind)
+        with self._lock:
+            self._db.execute(
+                "UPDATE segments SET last_used = ? WHERE log_group = ? AND log_stream = ? AND kind = ? "
+                "AND end_ms >= ? AND start_ms <= ?",
+                (time.time(), *key, start_ms, end_ms),
+            )
+            rows = self._db.execute(
+                "SELECT ms, timestamp, log FROM lines WHERE log_group = ? AND log_stream = ? AND kind = ? "
+                "AND ms BETWEEN ? AND ? ORDER BY ms, seq",
+                (*key, start_ms, end_ms),
+            ).fetchall()
+            self._db.commit()
+        return [{"ms": ms, "timestamp": timestamp, "log": log} for ms, timestamp, log in rows]
+
+    def read_page(self, log_group, log_stream, start_ms, end_ms, after=None, kind="", limit=READ_BATCH_ROWS):
+        """Up to `limit` stored rows in [start_ms, end_ms] past the (ms, seq) position `after`, and the last position."""
+        key = (log_group, log_stream, kind)
+        after_ms, after_seq = after or (start_ms - 1, 0)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT ms, seq, timestamp, log FROM lines WHERE log_group = ? AND log_stream = ? AND kind = ? "
+                "AND ms BETWEEN ? AND ? AND (ms > ? OR (ms = ? AND seq > ?)) ORDER BY ms, seq LIMIT ?",
+                (*key, start_ms, end_ms, after_ms, after_ms, after_seq, limit),
+            ).fetchall()
+        last = (rows[-1][0], rows[-1][1]) if rows else None
+        return [{"ms": ms, "timestamp": timestamp, "log": log} for ms, _, timestamp, log in rows], last
+
+    def _plan(self, log_group, log_stream, start_ms, end_ms, kind):
+        """Splits a request into uncovered gaps to fetch and store, and a fresh tail to fetch only."""
+        horizon = int(time.time() * 1000) - self.freshness_ms
+        cached_end = min(end_ms, horizon)
+        gaps = self.missing(log_group, log_stream, start_ms, cached_end, kind) if start_ms <= cached_end else []
+        fresh = [(max(start_ms, horizon + 1), end_ms)] if end_ms > horizon else []
+
+        if not gaps and not fresh:
+            self.hits += 1
+        elif sum(hi - lo + 1 for lo, hi in gaps + fresh) < end_ms - start_ms + 1:
+            self.partial_hits += 1
+        else:
+            self.misses += 1
+        return cached_end, gaps, fresh
+
+    def _cached(self, log_group, log_stream, start_ms, cached_end, kind, fetched):
+        rows = self.read(log_group, log_stream, start_ms, cached_end, kind) if start_ms <= cached_end else []
+        self.rows_fetched += fetched
+        self.rows_from_cache += len(rows) - fetched
+        return rows
+
+    def fetch(self, log_group, log_stream, start_ms, end_ms, fetcher, kind=""):
+        """Serves [start_ms, end_ms] from the store, calling `fetcher(lo, hi)` only for uncovered gaps.
+
+        Rows newer than the freshness horizon are fetched every time and never stored.
+        """
+        cached_end, gaps, fresh = self._plan(log_group, log_stream, start_ms, end_ms, kind)
+        fetched = 0
+        for lo, hi in gaps:
+            rows = fetcher(lo, hi)
+            fetched += len(rows)
+            self.store(log_group, log_stream, lo, hi, rows, kind)
+        rows = self._cached(log_group, log_stream, start_ms, cached_end, kind, fetched)
+        for lo, hi in fresh:
+            recent = fetcher(lo, hi)
+            self.rows_fetched += len(recent)
+            rows.extend(recent)
+        return rows
+
+    async def fetch_async(self, log_group, log_stream, start_ms, end_ms, fetcher, kind=""):
+        """`fetch` for a coroutine `fetcher`; the gaps and the fresh tail are fetched concurrently.
+
+        The SQLite reads and writes run in a worker thread, off the event loop.
+        """
+        cached_end, gaps, fresh = await asyncio.to_thread(self._plan, log_group, log_stream, start_ms, end_ms, kind)
+        results = await asyncio.gather(*(fetcher(lo, hi) for lo, hi in gaps + fresh))
+
+        def store_and_read():
+            fetched = 0
+            for (lo, hi), rows in zip(gaps, results):
+                fetched += len(rows)
+                self.store(log_group, log_stream, lo, hi, rows, kind)
+            return self._cached(log_group, log_stream, start_ms, cached_end, kind, fetched)
+
+        rows = await asyncio.to_thread(store_and_read)
+        for recent in results[len(gaps):]:
+            self.rows_fetched += len(recent)
+            rows.extend(recent)
+        return rows
+
+    async def stream_async(self, log_group, log_stream, start_ms, end_ms, fetcher, kind=""):
+        """`fetch_async` for windows too large to hold: yields batches of rows, not in time order.
+
+        Covered parts are read back in pages of READ_BATCH_ROWS. `fetcher(lo, hi)` is an async
+        generator of (lo, hi, rows) pieces that together cover [lo, hi]; each piece of a gap is
+        stored as it arrives, the gaps being fetched concurrently. The fresh tail is never stored.
+        """
+        cached_end, gaps, fresh = await asyncio.to_thread(self._plan, log_group, log_stream, start_ms, end_ms, kind)
+        # What was covered before this request: read it before the gaps are stored, so no row comes twice
+        covered, cursor = [], start_ms
+        for lo, hi in gaps + [(cached_end + 1, cached_end + 1)]:
+            if lo > cursor:
+                covered.append((cursor, lo - 1))
+            cursor = hi + 1
+        for lo, hi in covered:
+            after = None
+            while True:
+                rows, after = await asyncio.to_thread(self.read_page, log_group, log_stream, lo, hi, after, kind,
+                                                       READ_BATCH_ROWS)
+                if not rows:
+                    break
+                self.rows_from_cache += len(rows)
+                yield rows
+
+        pieces = asyncio.Queue(maxsize=len(gaps) + len(fresh))
+
+        async def produce(lo, hi, store):
+            # The queue holds a piece per producer at most; None marks the end, an exception a failure
+            try:
+                async for piece_lo, piece_hi, rows in fetcher(lo, hi):
+                    if store:
+                        await asyncio.to_thread(self.store, log_group, log_stream, piece_lo, piece_hi, rows, kind)
+                    await pieces.put(rows)
+            except Exception as e:
+                await pieces.put(e)
+                return
+            await pieces.put(None)
+
+        producers = [asyncio.ensure_future(produce(lo, hi, store))
+                     for (lo, hi), store in [(gap, True) for gap in gaps] + [(tail, False) for tail in fresh]]
+        try:
+            running = len(producers)
+            while running:
+                rows = await pieces.get()
+                if rows is None:
+                    running -= 1
+                    continue
+                if isinstance(rows, Exception):
+                    raise rows
+                self.rows_fetched += len(rows)
+                yield rows
+        finally:
+            for producer in producers:
+                producer.cancel()
+            await asyncio.gather(*producers, return_exceptions=True)
+
+    def _evict(self):
+        while self._rows > self.max_rows:
+            oldest = self._db.execute(
+                "SELECT id, log_group, log_stream, kind, start_ms, end_ms FROM segments ORDER BY last_used ASC LIMIT 1"
+            ).fetchone()
+            if oldest is None:
+                break
+            segment_id, *key, lo, hi = oldest
+            self._rows -= self._db.execute(
+                "DELETE FROM lines WHERE log_group = ? AND log_stream = ? AND kind = ? AND ms BETWEEN ? AND ?",
+                (*key, lo, hi),
+            ).rowcount
+            self._db.execute("DELETE FROM segments WHERE id = ?", (segment_id,))
+
+    def stats(self):
+        with self._lock:
+            rows = self._rows
+            segments = self._db.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "partial_hits": self.partial_hits,
+            "misses": self.misses,
+            "rows_from_cache": self.rows_from_cache,
+            "rows_fetched": self.rows_fetched,
+            "rows": rows,
+            "segments": segments,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_log_cache():
+    """The process-wide cache used by `get_logs_with_context`, opened on first use."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = LogCache()
+    return _default_cache
@@ -0,0 +1,162 @@
+import hashlib
+from collections import OrderedDict
+from itertools import islice
+from datetime import datetime, timezone
+
+from query_cache import normalize_log_text
+
+# Drain parameters: parse tree depth (length level + DRAIN_DEPTH - 2 leading-token levels),
+# share of equal tokens needed to join a cluster, and fan-out per tree node (the logger level holds
+# one child per logger class, so it is sized well above the usual Drain default of 100)
+DRAIN_DEPTH = 4
+SIMILARITY_THRESHOLD = 0.5
+MAX_CHILDREN = 1000
+# Bounds memory over millions of lines: past this many clusters, the rarest of the
+# EVICTION_SAMPLE least recently matched is evicted (frequent failures survive churn)
+MAX_CLUSTERS = 1000
+EVICTION_SAMPLE = 32
+# Lines are compared on their first MAX_TOKENS tokens (SQL dumps can be thousands long)
+MAX_TOKENS = 100
+WILDCARD = "<*>"
+THREAD = "<THREAD>"
+LEAF = None  # Tree key of a node's cluster list (never a token, tokens are strings)
+
+
+def iso_ms(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat(timespec="milliseconds")
+
+
+class LogCluster:
+    """A log template with the occurrences that matched it: count, first / last seen, first line."""
+
+    __slots__ = ("id", "template", "count", "first_ms", "last_ms", "sample", "path")
+
+    def __init__(self, cluster_id, tokens, ms, sample, path):
+        self.id = cluster_id
+        self.template = tokens
+        self.count = 0
+        self.first_ms = ms
+        self.last_ms = ms
+        self.sample = sample  # Representative occurrence: the earliest seen
+        self.path = path  # Keys of its leaf in the parse tree, to prune it on eviction
+
+    @property
+    def fingerprint(self):
+        return hashlib.sha1(" ".join(self.template).encode("utf-8")).hexdigest()[:12]
+
+    def to_dict(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "template": " ".join(self.template),
+            "count": self.count,
+            "first_seen": iso_ms(self.first_ms) if self.first_ms is not None else None,
+            "last_seen": iso_ms(self.last_ms) if self.last_ms is not None else None,
+        }
+
+
+class TemplateMiner:
+    """Streaming log template miner (Drain: He et al., ICWS 2017).
+
+    Lines are masked (timestamps, ids, numbers, thread names → placeholders), split into tokens and
+    routed through a fixed-depth tree keyed by token count and the first unmasked tokens
+    (the level and logger name, in logback lines) to a small leaf of candidate clusters. A line joins the most similar one if at least
+    `similarity` of its tokens match, and the positions that differ become `<*>`;
+    otherwise it starts a cluster. Each line costs one walk down the tree, and memory
+    stays under `max_clusters` templates however many lines go through: counts of
+    evicted clusters are lost, so rare templates seen long ago may be undercounted.
+    """
+
+    def __init__(self, depth=DRAIN_DEPTH, similarity=SIMILARITY_THRESHOLD, max_children=MAX_CHILDREN,
+                 max_clusters=MAX_CLUSTERS):
+        self.depth = depth
+        self.similarity = similarity
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.root = {}
+        self.clusters = OrderedDict()  # id -> cluster, least recently matched first
+        self.next_id = 1
+        self.lines = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.clusters)
+
+    def tokens(self, line):
+        """Masked tokens; `[thread-name]` tokens are masked too (but not `[ERROR]`-style levels)."""
+        return [THREAD if token[:1] == "[" and token[-1:] == "]" and not token[1:-1].isupper() else token
+                for token in normalize_log_text(line).split(" ")[:MAX_TOKENS]]
+
+    def _route(self, node, key):
+        """Child of `node` for `key`; past `max_children` keys, new ones share the wildcard child."""
+        if key not in node and len(node) >= self.max_children - 1:
+            key = WILDCARD
+        return key, node.setdefault(key, {})
+
+    def _leaf(self, tokens):
+        path = [len(tokens)]
+        node = self.root.setdefault(len(tokens), {})
+        # Placeholders say nothing about the line: route on the first real tokens (level, logger, ...)
+        leading = [token for token in tokens if not (token[:1] == "<" and token[-1:] == ">")]
+        for token in leading[:self.depth - 2]:
+            # Tokens with digits are likely variables: route them together
+            key, node = self._route(node, WILDCARD if any(char.isdigit() for char in token) else token)
+            path.append(key)
+        return tuple(path), node.setdefault(LEAF, [])
+
+    def _match(self, leaf, tokens):
+        best, best_score = None, (-1.0, -1)
+        for cluster_id in leaf:
+            template = self.clusters[cluster_id].template
+            equal = sum(a == b for a, b in zip(template, tokens) if a != WILDCARD)
+            score = (equal / len(tokens), template.count(WILDCARD))
+            if score > best_score:
+                best, best_score = self.clusters[cluster_id], score
+        return best if best is not None and best_score[0] >= self.similarity else None
+
+    def add(self, line, ms=None, sample=None):
+        """Assigns one line (seen at `ms`) to its cluster and returns it."""
+        self.lines += 1
+        tokens = self.tokens(line) or [""]
+        path, leaf = self._leaf(tokens)
+        cluster = self._match(leaf, tokens)
+        if cluster is None:
+            cluster = LogCluster(self.next_id, tokens, ms, sample if sample is not None else line, path)
+            self.next_id += 1
+            self.clusters[cluster.id] = cluster
+            leaf.append(cluster.id)
+            if len(self.clusters) > self.max_clusters:
+                self._evict()
+        else:
+            cluster.template = [a if a == b else WILDCARD for a, b in zip(cluster.template, tokens)]
+            self.clusters.move_to_end(cluster.id)
+            if ms is not None:
+                if cluster.first_ms is None or ms < cluster.first_ms:
+                    cluster.first_ms = ms
+                    cluster.sample = sample if sample is not None else line
+                cluster.last_ms = max(ms, cluster.last_ms if cluster.last_ms is not None else ms)
+        cluster.count += 1
+        return cluster
+
+    def _evict(self):
+        cluster = min(islice(self.clusters.values(), EVICTION_SAMPLE), key=lambda candidate: candidate.count)
+        del self.clusters[cluster.id]
+        self.evicted += 1
+        # Walk down to its leaf, then drop nodes left empty so the tree stays bounded too
+        nodes = [self.root]
+        for key in cluster.path:
+            nodes.append(nodes[-1][key])
+        leaf = nodes[-1][LEAF]
+        leaf.remove(cluster.id)
+        if not leaf:
+            del nodes[-1][LEAF]
+        for parent, key, node in reversed(list(zip(nodes, cluster.path, nodes[1:]))):
+            if node:
+                break
+            del parent[key]
+
+    def top(self, n=None):
+        """Clusters by occurrence count, most frequent first."""
+        return sorted(self.clusters.values(), key=lambda cluster: (-cluster.count, cluster.first_ms or 0))[:n]
+
+    def stats(self):
+        return {"lines": self.lines, "clusters": len(self.clusters), "evicted": self.evicted}
@@ -0,0 +1,120 @@
+import re
+from collections import deque
+
+# A run of back-to-back matches longer than this is split into consecutive windows,
+# so memory stays bounded even when every line matches
+MAX_WINDOW_LINES = 10000
+
+
+class PatternMatcher:
+    """Finds which of many patterns a line contains, in one scan of the line.
+
+    Literals are escaped and joined into one alternation (longest first, so the most
+    specific of overlapping literals wins) and the matched text maps back to its
+    pattern; regexes are joined as named groups. Either way `re` walks each line once,
+    instead of once per pattern. A single case-sensitive literal is a plain `in` check.
+    An empty pattern (or none at all) matches every line, as an empty `error_message` always has.
+    """
+
+    def __init__(self, patterns, regex=False, ignore_case=False):
+        self.patterns = list(dict.fromkeys([patterns] if isinstance(patterns, str) else patterns)) or [""]
+        self.regex = regex
+        self.ignore_case = ignore_case
+        flags = re.IGNORECASE if ignore_case else 0
+        if "" in self.patterns:
+            self.search = self._search_any
+        elif regex:
+            self._compiled = re.compile("|".join(f"(?P<p{i}>{pattern})" for i, pattern in enumerate(self.patterns)),
+                                        flags)
+            self.search = self._search_regex
+        elif len(self.patterns) == 1 and not ignore_case:
+            self.search = self._search_one
+        else:
+            self._literals = {}
+            for pattern in self.patterns:
+                self._literals.setdefault(pattern.lower() if ignore_case else pattern, pattern)
+            ordered = sorted(self._literals, key=len, reverse=True)
+            self._compiled = re.compile("|".join(map(re.escape, ordered)), flags)
+            self.search = self._search_literals
+
+    def _search_any(self, text):
+        return ""
+
+    def _search_one(self, text):
+        return self.patterns[0] if self.patterns[0] in text else None
+
+    def _search_literals(self, text):
+        match = self._compiled.search(text)
+        if match is None:
+            return None
+        return self._literals[match.group().lower() if self.ignore_case else match.group()]
+
+    def _search_regex(self, text):
+        match = self._compiled.search(text)
+        return None if match is None else self.patterns[int(match.lastgroup[1:])]
+
+
+class ContextWindow:
+    """Consecutive records around one or more matches.
+
+    `start` is the stream position of the first record, `hits` the (index in `lines`,
+    pattern) of each matching record.
+    """
+
+    __slots__ = ("start", "lines", "hits")
+
+    def __init__(self, start, lines):
+        self.start = start
+        self.lines = lines
+        self.hits = []
+
+    def __len__(self):
+        return len(self.lines)
+
+
+def extract_contexts(records, patterns, before=5, after=5, text=None, max_lines=MAX_WINDOW_LINES):
+    """Yields a `ContextWindow` of `before` records before to `after` records after each match, in stream order.
+
+    Works in one pass over any iterable (a generator over a multi-GB file is fine): records
+    outside a window only pass through a ring buffer of the last `before`. Windows that
+    overlap or touch are merged, so no record is emitted twice; a window is yielded once
+    `before + after` records have gone by without a match, since only then can the next
+    match no longer reach it. Memory is bounded by `max_lines + before + after` records.
+    `patterns` is a `PatternMatcher` or literal pattern(s); `text` maps a record to the
+    string to search (records are strings by default).
+    """
+    matcher = patterns if isinstance(patterns, PatternMatcher) else PatternMatcher(patterns)
+    search = matcher.search
+    history = deque(maxlen=before)
+    window, quiet = None, 0  # `quiet`: records since the window's last match
+
+    for position, record in enumerate(records):
+        pattern = search(record if text is None else text(record))
+        if pattern is None:
+            if window is None:
+                history.append(record)
+                continue
+            window.lines.append(record)
+            quiet += 1
+            if quiet > before + after:
+                # Past `after`, the records go back to the ring buffer as the next window's lead-in
+                keep = len(window.lines) - (quiet - after)
+                history.extend(window.lines[keep:])
+                del window.lines[keep:]
+                yield window
+                window = None
+            continue
+
+        if window is None:
+            window = ContextWindow(position - len(history), list(history))
+            history.clear()
+        elif len(window.lines) >= max_lines:
+            yield window
+            window = ContextWindow(position, [])
+        window.hits.append((len(window.lines), pattern))
+        window.lines.append(record)
+        quiet = 0
+
+    if window is not None:
+        del window.lines[len(window.lines) - max(0, quiet - after):]
+        yield window
@@ -0,0 +1,333 @@
+import asyncio
+import glob
+import gzip
+import heapq
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from metrics import LOG_LINES_PARSED, record_span, span
+
+# Container logs read by `/logs?source=local`: files under LOCAL_LOG_DIR's `log_group`
+# subdirectory (LOCAL_LOG_DIR itself for an empty group) whose name contains the log stream, e.g. qa_aro-service.log,
+# qa_aro-service.log.1, qa_aro-service.log.2.gz. Each line is a {"time": ..., "log": ...} JSON
+# object, as written by Docker's json-file driver, in time order.
+LOCAL_LOG_DIR = os.getenv("LOCAL_LOG_DIR", "logs")
+# Match scans of more than this many bytes are split across worker processes
+PARALLEL_MIN_BYTES = 64 * 2 ** 20
+MAX_WORKERS = int(os.getenv("LOG_PARSE_WORKERS", str(os.cpu_count() or 1)))
+# Scans are split into this many chunks per worker, so uneven chunks still balance
+CHUNKS_PER_WORKER = 4
+GZIP_BLOCK_BYTES = 4 * 2 ** 20
+
+_TIME_FIELD = re.compile(rb'"time"\s*:\s*"([^"]+)"')
+_FRACTION = re.compile(r"\.(\d{1,3})")
+# Docker escapes these in `log` as <, >, &, so they are left out of byte needles
+_HTML_ESCAPED = re.compile(r"[<>&]")
+_decode = json.JSONDecoder().decode
+
+
+@lru_cache(maxsize=4096)
+def _epoch_seconds(prefix):
+    return int(datetime.fromisoformat(prefix).replace(tzinfo=timezone.utc).timestamp())
+
+
+def time_ms(value):
+    """Unix milliseconds of a UTC RFC 3339 time ("2025-02-10T16:46:09.236373208Z")."""
+    millis = value[20:23]
+    if value[19:20] != "." or not millis.isdigit():
+        fraction = _FRACTION.match(value, 19)
+        millis = fraction.group(1).ljust(3, "0") if fraction else "0"
+    return _epoch_seconds(value[:19]) * 1000 + int(millis)
+
+
+def parse_line(line):
+    """Parses one JSON container log line into a ms/timestamp/log row; None for malformed lines."""
+    try:
+        log_data = _decode(line.decode("utf-8"))
+        return {"ms": time_ms(log_data["time"]), "timestamp": log_data["time"], "log": log_data["log"].rstrip("\n")}
+    except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError, AttributeError, ValueError):
+        return None
+
+
+def line_ms(line):
+    """Time of a raw line, read without parsing the rest of its JSON (None if it has none)."""
+    match = _TIME_FIELD.search(line)
+    try:
+        return time_ms(match.group(1).decode("ascii")) if match else None
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def needle(pattern):
+    """The bytes a line containing `pattern` in its `log` field must contain (its longest JSON-escaped run)."""
+    part = max(_HTML_ESCAPED.split(pattern), key=len)
+    return json.dumps(part, ensure_ascii=False)[1:-1].encode("utf-8") if part else b'"log"'
+
+
+def compile_needles(patterns):
+    """A `find(buffer, start, end)` for the first occurrence of any pattern's needle (-1 if none)."""
+    needles = sorted({needle(pattern) for pattern in patterns}, key=len, reverse=True)
+    if len(needles) == 1:
+        return lambda buffer, start, end: buffer.find(needles[0], start, end)
+    regex = re.compile(b"|".join(map(re.escape, needles)))
+
+    def find(buffer, start, end):
+        match = regex.search(buffer, start, end)
+        return match.start() if match else -1
+    return find
+
+
+def next_line(buffer, position):
+    """Offset of the first line starting at or after `position`."""
+    if position <= 0:
+        return 0
+    if buffer[position - 1:position] == b"\n":
+        return position
+    end = buffer.find(b"\n", position)
+    return len(buffer) if end < 0 else end + 1
+
+
+def offset_at(buffer, ms, lo=0, hi=None):
+    """Offset of the first line at or after `ms`, by binary search over byte offsets (lines are in time order)."""
+    hi = len(buffer) if hi is None else hi
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = next_line(buffer, mid)
+        if start >= hi:
+            hi = mid
+            continue
+        end = buffer.find(b"\n", start)
+        end = len(buffer) if end < 0 else end
+        line_time = line_ms(buffer[start:end])
+        if line_time is None or line_time < ms:
+            lo = end + 1
+        else:
+            hi = start
+    return next_line(buffer, lo)
+
+
+def scan_buffer(buffer, lo, hi, find, patterns, start_ms, end_ms, rows):
+    """Appends the rows of the line-aligned bytes [lo, hi) of `buffer` whose `log` contains a pattern.
+
+    Jumps between needle occurrences with `find` and parses only those lines, so most of
+    the bytes are never copied into Python objects.
+    """
+    position = lo
+    while position < hi:
+        at = find(buffer, position, hi)
+        if at < 0:
+            break
+        start = buffer.rfind(b"\n", lo, at) + 1 or lo
+        end = buffer.find(b"\n", at, hi)
+        end = hi if end < 0 else end
+        row = parse_line(buffer[start:end])
+        if row and start_ms <= row["ms"] <= end_ms and any(pattern in row["log"] for pattern in patterns):
+            rows.append(row)
+        position = end + 1
+    return rows
+
+
+def scan_range(path, lo, hi, patterns, start_ms, end_ms):
+    """`scan_buffer` over a memory-mapped plain log file; top-level, so worker processes can run it."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return scan_buffer(buffer, lo, hi, compile_needles(patterns), patterns, start_ms, end_ms, [])
+
+
+def scan_gzip(path, patterns, start_ms, end_ms):
+    """`scan_range` for a gzip file, decompressed in GZIP_BLOCK_BYTES blocks and stopped past `end_ms`."""
+    find = compile_needles(patterns)
+    rows, carry = [], b""
+    with gzip.open(path, "rb") as f:
+        while True:
+            block = f.read(GZIP_BLOCK_BYTES)
+            buffer = carry + block
+            # A block's last line usually continues in the next one
+            cut = len(buffer) if not block else buffer.rfind(b"\n") + 1
+            scan_buffer(buffer, 0, cut, find, patterns, start_ms, end_ms, rows)
+            carry = buffer[cut:]
+            # Lines are in time order: once the block's last line is past the window, so is the rest
+            last_line = buffer[buffer.rfind(b"\n", 0, cut - 1) + 1:cut]
+            if not block or (line_ms(last_line) or 0) > end_ms:
+                break
+    return rows
+
+
+class LocalLogSource:
+    """Local container log files, read like a CloudWatch log group by `log_retrieval`.
+
+    Plain files are memory-mapped: a binary search on line timestamps jumps to the
+    requested window, and match scans larger than `parallel_min_bytes` are split into
+    line-aligned chunks parsed by a pool of `workers` processes (gzip files, which can
+    only be read front to back, are one task each).
+    """
+
+    def __init__(self, root=LOCAL_LOG_DIR, workers=MAX_WORKERS, parallel_min_bytes=PARALLEL_MIN_BYTES):
+        self.root = root
+        self.workers = workers
+        self.parallel_min_bytes = parallel_min_bytes
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def files(self, log_group, log_stream):
+        """Log files of a stream, oldest rotation first; FileNotFoundError if there are none.
+
+        Both names come from the request: ValueError for an empty stream, a stream with a
+        path separator, or a group that resolves outside `root`.
+        """
+        if not log_stream or any(sep and sep in log_stream for sep in ("/", os.sep, os.altsep)):
+            raise ValueError(f"❌ Invalid log stream `{log_stream}`: give a file name fragment without `/`.")
+        root = os.path.realpath(self.root)
+        directory = os.path.realpath(os.path.join(root, (log_group or "").strip("/")))
+        if os.path.commonpath([root, directory]) != root:
+            raise ValueError(f"❌ Log group `{log_group}` is outside {self.root}.")
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"❌ No log directory for group `{log_group}` under {self.root}.")
+        # Symlinks below the group directory must not lead out of `root` either
+        paths = [path for path in glob.glob(os.path.join(directory, "**", f"*{glob.escape(log_stream)}*"),
+                                            recursive=True)
+                 if os.path.isfile(path) and os.path.commonpath([root, os.path.realpath(path)]) == root]
+        if not paths:
+            raise FileNotFoundError(f"❌ No log files for stream `{log_stream}` under {directory}.")
+        return sorted(paths, key=os.path.getmtime)
+
+    def get_pool(self):
+        """Worker processes, started on first use; spawned, so they inherit no server threads or sockets."""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def _tasks(self, path, patterns, start_ms, end_ms):
+        """Scan tasks (function, args, bytes) covering one file's part of the window."""
+        if path.endswith(".gz"):
+            return [(scan_gzip, (path, patterns, start_ms, end_ms), os.path.getsize(path))]
+        if not os.path.getsize(path):
+            return []
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            lo = offset_at(buffer, start_ms)
+            hi = offset_at(buffer, end_ms + 1, lo)
+            chunks = 1
+            if hi - lo > self.parallel_min_bytes:
+                chunks = self.workers * CHUNKS_PER_WORKER
+            bounds = sorted({lo, hi, *(next_line(buffer, lo + (hi - lo) * i // chunks) for i in range(1, chunks))})
+        return [(scan_range, (path, a, b, patterns, start_ms, end_ms), b - a) for a, b in zip(bounds, bounds[1:])]
+
+    def scan_tasks(self, log_group, log_stream, patterns, start_ms, end_ms):
+        """Scan tasks over every file of the stream, and whether they are worth the worker processes."""
+        tasks = [task for path in self.files(log_group, log_stream)
+                 for task in self._tasks(path, patterns, start_ms, end_ms)]
+        return tasks, len(tasks) > 1 and self.workers > 1 and sum(size for _, _, size in tasks) > self.parallel_min_bytes
+
+    def error_rows(self, log_group, log_stream, patterns, start_ms, end_ms):
+        """Every line of the stream between two ms timestamps whose log contains a pattern, as ms/timestamp/log rows."""
+        patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+        with span("local_log_scan") as attributes:
+            tasks, parallel = self.scan_tasks(log_group, log_stream, patterns, start_ms, end_ms)
+            if parallel:
+                pool = self.get_pool()
+                results = [future.result() for future in [pool.submit(function, *args) for function, args, _ in tasks]]
+            else:
+                results = [function(*args) for function, args, _ in tasks]
+            # Chunks of a file come back in order; rotated files may interleave
+            rows = list(heapq.merge(*results, key=lambda row: row["ms"]))
+            attributes.update(bytes=sum(size for _, _, size in tasks), rows=len(rows))
+        LOG_LINES_PARSED.inc(len(rows))
+        return rows
+
+    def _file_records(self, path, start_ms, end_ms):
+        if path.endswith(".gz"):
+            with gzip.open(path, "rb") as f:
+                for line in f:
+                    row = parse_line(line)
+                    if row is None or row["ms"] < start_ms:
+                        continue
+                    if row["ms"] > end_ms:
+                        return
+                    yield row
+            return
+        if not os.path.getsize(path):
+            return
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            buffer.seek(offset_at(buffer, start_ms))
+            for line in iter(buffer.readline, b""):
+                row = parse_line(line)
+                if row is None:
+                    continue
+                if row["ms"] > end_ms:
+                    return
+                yield row
+
+    def records(self, log_group, log_stream, start_ms, end_ms):
+        """Every parsed line of the stream between two ms timestamps, in time order, as a generator.
+
+        Lazy, so it can feed `log_context.extract_contexts` over files of any size.
+        """
+        files = [self._file_records(path, start_ms, end_ms) for path in self.files(log_group, log_stream)]
+        return files[0] if len(files) == 1 else heapq.merge(*files, key=lambda row: row["ms"])
+
+    async def error_row_batches_async(self, log_group, log_stream, patterns, start_ms, end_ms):
+        """`error_rows` as a stream: yields the rows of each scan task as it finishes (in time order within a task).
+
+        At most `workers` tasks run ahead of the caller, so millions of matches never sit in memory at once.
+        """
+        patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+        started = time.perf_counter()
+        tasks, parallel = await asyncio.to_thread(self.scan_tasks, log_group, log_stream, patterns, start_ms, end_ms)
+        pending, queued, total = set(), iter(tasks), 0
+        try:
+            while True:
+                for function, args, _ in queued:
+                    if parallel:
+                        pending.add(asyncio.wrap_future(self.get_pool().submit(function, *args)))
+                    else:
+                        pending.add(asyncio.ensure_future(asyncio.to_thread(function, *args)))
+                    if len(pending) >= (self.workers if parallel else 1):
+                        break
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    rows = task.result()
+                    total += len(rows)
+                    LOG_LINES_PARSED.inc(len(rows))
+                    yield rows
+        finally:
+            for task in pending:
+                task.cancel()
+            record_span("local_log_scan", time.perf_counter() - started,
+                        bytes=sum(size for _, _, size in tasks), rows=total)
+
+    async def lines_async(self, log_group, log_stream, start_ms, end_ms):
+        """`records` as a list, for the narrow context windows of `log_retrieval.fetch_context`."""
+        return await asyncio.to_thread(lambda: list(self.records(log_group, log_stream, start_ms, end_ms)))
+
+
+_default_source = None
+
+
+def get_local_source():
+    """The process-wide local log source, reading LOCAL_LOG_DIR."""
+    global _default_source
+    if _default_source is None:
+        _default_source = LocalLogSource()
+    return _default_source
+
+
+def close_local_source():
+    """Stops the worker processes; called on server shutdown."""
+    if _default_source is not None:
+        _default_source.close()
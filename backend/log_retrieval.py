@@ -1,13 +1,386 @@
+import asyncio
 import boto3
-import time
+import heapq
+import inspect
+import math
 import json
+from contextlib import AsyncExitStack
 from datetime import datetime, timezone
+from log_cache import get_log_cache
+from log_clustering import TemplateMiner
+from log_context import PatternMatcher, extract_contexts
+from log_files import LocalLogSource
+from metrics import (CLOUDWATCH_BYTES_SCANNED, CLOUDWATCH_QUERIES, CLOUDWATCH_RECORDS_SCANNED, CLOUDWATCH_ROWS,
+                     LOG_LINES_PARSED, span)
 
-client = boto3.client("logs")
+# Created on first use, so importing this module needs no AWS configuration
+client = None
+async_client = None
+_async_client_stack = None
+_async_client_lock = asyncio.Lock()
 
+# Logs Insights returns at most this many rows per query
+MAX_QUERY_RESULTS = 10000
+# Concurrent queries per request (the account-wide Logs Insights limit is 30 by default)
+MAX_CONCURRENT_QUERIES = 10
+# Pooled HTTP connections of the async client, shared by every request in the process
+MAX_POOL_CONNECTIONS = 50
+# Windows shorter than this run as a single query; longer ones start out sharded
+MIN_SHARD_SECONDS = 300
+# Poll delays grow from the first to the last value, then stay there
+POLL_DELAYS = (0.1, 0.2, 0.4, 0.8, 1.0, 2.0)
+# Seconds on each side of an error to fetch first, widened while lines are missing
+CONTEXT_WINDOW_SECONDS = 5
+MAX_CONTEXT_WINDOW_SECONDS = 3600
+# Distinct failures (template clusters) returned with a context window each
+MAX_CLUSTERS = 10
 
-def get_logs_with_context(log_group, start_time, end_time, error_message, log_stream, limit=5, max_occurrences=3):
-    """Fetch logs from AWS CloudWatch, including 5 logs before & after each error occurrence."""
+def get_client():
+    global client
+    if client is None:
+        client = boto3.client("logs")
+    return client
+
+
+async def get_async_client():
+    """The process-wide aiobotocore CloudWatch Logs client, with a pooled connection set."""
+    global async_client, _async_client_stack
+    if async_client is None:
+        async with _async_client_lock:
+            if async_client is None:
+                from aiobotocore.config import AioConfig
+                from aiobotocore.session import get_session
+
+                config = AioConfig(max_pool_connections=MAX_POOL_CONNECTIONS, connect_timeout=5, read_timeout=30)
+                _async_client_stack = AsyncExitStack()
+                async_client = await _async_client_stack.enter_async_context(
+                    get_session().create_client("logs", config=config)
+                )
+    return async_client
+
+
+async def close_async_client():
+    """Closes the pooled async client; called on server shutdown."""
+    global async_client, _async_client_stack
+    if _async_client_stack is not None:
+        await _async_client_stack.aclose()
+    async_client, _async_client_stack = None, None
+
+
+async def call_client(method, **kwargs):
+    """Calls a logs client method without blocking the event loop.
+
+    Async clients (aiobotocore) are awaited directly; blocking ones (boto3) run in a thread.
+    """
+    if inspect.iscoroutinefunction(method):
+        return await method(**kwargs)
+    return await asyncio.to_thread(method, **kwargs)
+
+
+def quote(value):
+    """Quotes a value as a Logs Insights string literal."""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def parse_insights_timestamp(value):
+    """Converts an @timestamp value ("2025-02-10 16:46:09.236") to Unix milliseconds."""
+    parsed = datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+async def run_query_async(logs_client, log_group, start_time, end_time, query_string):
+    """Runs one Logs Insights query and returns its rows as {field: value} dicts.
+
+    Polling sleeps with `asyncio.sleep`, so a waiting query holds no thread. If the caller
+    is cancelled (e.g. a request timeout), the query is stopped on the CloudWatch side too.
+    """
+    response = await call_client(
+        logs_client.start_query,
+        logGroupName=log_group,
+        startTime=start_time,  # Ensure Unix timestamp
+        endTime=end_time,      # Ensure Unix timestamp
+        queryString=query_string,
+    )
+    query_id = response["queryId"]
+
+    # ✅ Wait for query results: short first polls, since narrow queries finish fast
+    polls = 0
+    with span("cloudwatch_query") as attributes:
+        try:
+            while True:
+                result = await call_client(logs_client.get_query_results, queryId=query_id)
+                if result["status"] in ["Complete", "Failed", "Cancelled", "Timeout"]:
+                    break
+                await asyncio.sleep(POLL_DELAYS[min(polls, len(POLL_DELAYS) - 1)])
+                polls += 1
+        except asyncio.CancelledError:
+            CLOUDWATCH_QUERIES.inc(status="Stopped")
+            try:
+                await asyncio.shield(call_client(logs_client.stop_query, queryId=query_id))
+            except Exception as e:
+                print(f"⚠️ Could not stop query {query_id}: {e}")
+            raise
+        statistics = result.get("statistics") or {}
+        attributes.update(polls=polls, rows=len(result.get("results", [])),
+                          scanned=int(statistics.get("recordsScanned", 0)))
+    CLOUDWATCH_QUERIES.inc(status=result["status"])
+    CLOUDWATCH_ROWS.inc(attributes["rows"])
+    CLOUDWATCH_RECORDS_SCANNED.inc(attributes["scanned"])
+    CLOUDWATCH_BYTES_SCANNED.inc(int(statistics.get("bytesScanned", 0)))
+
+    if result["status"] != "Complete":
+        raise RuntimeError(f"Query {query_id} ended with status {result['status']}")
+
+    return [{field["field"]: field["value"] for field in row} for row in result.get("results", [])]
+
+
+def run_query(logs_client, log_group, start_time, end_time, query_string):
+    """Blocking wrapper of `run_query_async`, for scripts."""
+    return asyncio.run(run_query_async(logs_client, log_group, start_time, end_time, query_string))
+
+
+def split_range(start_time, end_time, shards):
+    """Splits an inclusive range of whole seconds into up to `shards` disjoint inclusive ranges."""
+    seconds = end_time - start_time + 1
+    shards = max(1, min(shards, seconds))
+    bounds = [start_time + seconds * i // shards for i in range(shards + 1)]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(shards)]
+
+
+async def iter_sharded_query_async(logs_client, log_group, start_time, end_time, query_string,
+                                   max_concurrency=MAX_CONCURRENT_QUERIES, min_shard_seconds=MIN_SHARD_SECONDS):
+    """Runs a `sort @timestamp asc | limit N` query as concurrent time shards, yielding each as it completes.
+
+    Long windows start out split into up to `max_concurrency` shards. A shard that comes
+    back at the row cap was truncated: its complete seconds are kept and the rest of its
+    range is re-queried, split by the row density seen so far, so dense periods get
+    smaller shards. Yields (lo, hi, rows): every row of seconds lo..hi in timestamp order.
+    The pieces cover the window but arrive in completion order; only shards in flight are held.
+    """
+    initial = math.ceil((end_time - start_time + 1) / min_shard_seconds)
+    shards = split_range(start_time, end_time, min(initial, max_concurrency))
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def shard(lo, hi):
+        async with slots:
+            return await run_query_async(logs_client, log_group, lo, hi, query_string)
+
+    running = {asyncio.ensure_future(shard(lo, hi)): (lo, hi) for lo, hi in shards}
+    try:
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                lo, hi = running.pop(task)
+                rows = task.result()
+                if len(rows) < MAX_QUERY_RESULTS:
+                    yield lo, hi, rows
+                    continue
+
+                # Truncated: keep whole seconds before the last one returned, re-query the rest
+                last_second = parse_insights_timestamp(rows[-1]["@timestamp"]) // 1000
+                if last_second <= lo:
+                    print(f"⚠️ More than {MAX_QUERY_RESULTS} rows within second {lo}, keeping the first {len(rows)}.")
+                    yield lo, hi, rows
+                    continue
+                kept = [row for row in rows if parse_insights_timestamp(row["@timestamp"]) // 1000 < last_second]
+                density = len(kept) / (last_second - lo)
+                pieces = math.ceil(density * (hi - last_second + 1) / (MAX_QUERY_RESULTS / 2))
+                for piece in split_range(last_second, hi, pieces):
+                    running[asyncio.ensure_future(shard(*piece))] = piece
+                yield lo, last_second - 1, kept
+    finally:
+        # A failed shard or a cancelled request stops the shards still in flight
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+
+async def run_sharded_query_async(logs_client, log_group, start_time, end_time, query_string,
+                                  max_concurrency=MAX_CONCURRENT_QUERIES, min_shard_seconds=MIN_SHARD_SECONDS):
+    """`iter_sharded_query_async` with the shard results k-way merged back into timestamp order."""
+    results = [rows async for _, _, rows in iter_sharded_query_async(logs_client, log_group, start_time, end_time,
+                                                                    query_string, max_concurrency, min_shard_seconds)]
+    # Fixed-width "YYYY-MM-DD HH:MM:SS.mmm" stamps sort chronologically as strings
+    return list(heapq.merge(*results, key=lambda row: row["@timestamp"]))
+
+
+def run_sharded_query(logs_client, log_group, start_time, end_time, query_string,
+                      max_concurrency=MAX_CONCURRENT_QUERIES, min_shard_seconds=MIN_SHARD_SECONDS):
+    """Blocking wrapper of `run_sharded_query_async`, for scripts and benchmarks."""
+    return asyncio.run(run_sharded_query_async(logs_client, log_group, start_time, end_time, query_string,
+                                               max_concurrency, min_shard_seconds))
+
+
+def parse_log_row(row):
+    """Parses the JSON container log in @message; returns None for malformed lines."""
+    try:
+        log_data = json.loads(row["@message"])  # Parse JSON log
+        return {
+            "ms": parse_insights_timestamp(row["@timestamp"]),
+            "timestamp": log_data["time"],
+            "log": log_data["log"]
+        }
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return None  # Skip malformed logs
+
+
+async def fetch_error_rows(logs_client, log_group, log_stream, error_message, start_ms, end_ms):
+    """Lets CloudWatch filter the stream and yields only the matching lines, as (lo, hi, ms/timestamp/log rows).
+
+    Each piece holds every match between the ms timestamps lo and hi, as `LogCache.stream_async` stores them.
+    """
+    query_string = f'''
+        fields @timestamp, @message
+        | filter @logStream like {quote(log_stream)} and @message like {quote(error_message)}
+        | sort @timestamp asc
+        | limit {MAX_QUERY_RESULTS}
+    '''
+    print(f"📜 Running AWS Query: {query_string.strip()}")
+    async for lo, hi, rows in iter_sharded_query_async(logs_client, log_group, start_ms // 1000, -(-end_ms // 1000),
+                                                       query_string):
+        # A match whose @message is not a container JSON line is still an occurrence
+        with span("log_parse", rows=len(rows)):
+            hits = [parse_log_row(row) or {"ms": parse_insights_timestamp(row["@timestamp"]),
+                                           "timestamp": row["@timestamp"], "log": row.get("@message", "")}
+                    for row in rows]
+        LOG_LINES_PARSED.inc(len(rows))
+        yield (max(start_ms, lo * 1000), min(end_ms, hi * 1000 + 999),
+               [hit for hit in hits if start_ms <= hit["ms"] <= end_ms])
+
+
+async def find_error_occurrences(logs_client, log_group, start_time, end_time, error_message, log_stream, cache=None):
+    """Phase 1: yields every line matching `error_message`, in batches of ms/timestamp/log rows.
+
+    Batches come as shards, cache pages or file chunks complete, not in time order, so only
+    a few are held at once however many occurrences there are. With a `cache`, only the parts
+    of the window no earlier request covered go to CloudWatch.
+    """
+    start_ms, end_ms = start_time * 1000, end_time * 1000 + 999
+    if isinstance(logs_client, LocalLogSource):
+        async for rows in logs_client.error_row_batches_async(log_group, log_stream, error_message, start_ms, end_ms):
+            yield rows
+    elif cache is None:
+        async for _, _, rows in fetch_error_rows(logs_client, log_group, log_stream, error_message, start_ms, end_ms):
+            yield rows
+    else:
+        # `lines:` rows keep the matched text (`match:` segments of older versions held timestamps only)
+        async for rows in cache.stream_async(
+            log_group, log_stream, start_ms, end_ms, kind=f"lines:{error_message}",
+            fetcher=lambda lo, hi: fetch_error_rows(logs_client, log_group, log_stream, error_message, lo, hi),
+        ):
+            yield rows
+
+
+def cluster_occurrences(rows, miner=None):
+    """Fingerprints each occurrence by its log template; returns the `TemplateMiner` holding the clusters."""
+    # An empty miner is falsy (len 0), so test for None
+    miner = TemplateMiner() if miner is None else miner
+    for row in rows:
+        miner.add(row["log"], row["ms"], row)
+    return miner
+
+
+async def fetch_lines(logs_client, log_group, log_stream, start_ms, end_ms):
+    """Fetches and parses every line of the stream between two millisecond timestamps."""
+    if isinstance(logs_client, LocalLogSource):
+        return await logs_client.lines_async(log_group, log_stream, start_ms, end_ms)
+    query_string = f'''
+        fields @timestamp, @message
+        | filter @logStream like {quote(log_stream)}
+        | sort @timestamp asc
+        | limit {MAX_QUERY_RESULTS}
+    '''
+    # CloudWatch bounds are whole seconds, trim to the exact window afterwards
+    rows = await run_sharded_query_async(logs_client, log_group, start_ms // 1000, -(-end_ms // 1000), query_string)
+    with span("log_parse", rows=len(rows)):
+        lines = [line for line in map(parse_log_row, rows) if line is not None]
+    LOG_LINES_PARSED.inc(len(rows))
+    return [line for line in lines if start_ms <= line["ms"] <= end_ms]
+
+
+async def fetch_context(logs_client, log_group, log_stream, hit_times, start_time, end_time, error_message, limit,
+                        cache=None):
+    """Phase 2: fetches `limit` lines before & after each hit with narrow per-window queries.
+
+    Hits whose windows overlap share one query, and the windows of one round are fetched
+    concurrently. A window is widened while it holds fewer than `limit` lines on either
+    side of its hits and there is more of the range to cover. With a `cache`, windows are
+    served locally where earlier requests already fetched them. Each fetched window goes
+    through `log_context.extract_contexts` once, however many hits it holds.
+    Returns {hit time: [(matched line, context lines), ...]}, one pair per matching line at that time.
+    """
+    lower, upper = start_time * 1000, end_time * 1000 + 999
+    contexts = {}
+    pending = sorted(set(hit_times))
+    matcher = PatternMatcher(error_message)
+    window = CONTEXT_WINDOW_SECONDS * 1000
+
+    async def fetch_window(start, end):
+        if cache is None:
+            return await fetch_lines(logs_client, log_group, log_stream, start, end)
+        return await cache.fetch_async(log_group, log_stream, start, end,
+                                       fetcher=lambda lo, hi: fetch_lines(logs_client, log_group, log_stream, lo, hi))
+
+    while pending:
+        # Group hits into merged windows
+        groups = []
+        for t in pending:
+            start, end = max(lower, t - window), min(upper, t + window)
+            if groups and start <= groups[-1][1]:
+                groups[-1][1] = end
+                groups[-1][2].append(t)
+            else:
+                groups.append([start, end, [t]])
+
+        retry = []
+        windows = await asyncio.gather(*(fetch_window(start, end) for start, end, _ in groups))
+        for (start, end, hits), lines in zip(groups, windows):
+            # One pass of the context extractor finds every match of the window with its lines around it
+            found = {t: [] for t in hits}
+            # (the window is already in memory, so it is never split at MAX_WINDOW_LINES)
+            for context in extract_contexts(lines, matcher, limit, limit, text=lambda line: line["log"],
+                                            max_lines=len(lines) + 1):
+                for index, _ in context.hits:
+                    line = context.lines[index]
+                    if line["ms"] in found:
+                        found[line["ms"]].append((context.start + index, line,
+                                                  context.lines[max(0, index - limit):index + limit + 1]))
+            for t, matches in found.items():
+                if not matches:
+                    continue
+                first, last = matches[0][0], matches[-1][0]
+                short_before = first < limit and start > lower
+                short_after = len(lines) - 1 - last < limit and end < upper
+                if (short_before or short_after) and window < MAX_CONTEXT_WINDOW_SECONDS * 1000:
+                    retry.append(t)
+                    continue
+                contexts[t] = [(line, context) for _, line, context in matches]
+        pending = retry
+        window *= 4
+
+    return contexts
+
+
+async def get_error_clusters_async(log_group, start_time, end_time, error_message, log_stream, limit=5,
+                                   max_clusters=MAX_CLUSTERS, logs_client=None, cache=None, use_cache=True):
+    """Fetches every occurrence of an error from CloudWatch and groups them into distinct failures.
+
+    Phase 1 streams every matching line (server-side filtered) into a `log_clustering.TemplateMiner`
+    as it arrives, so 2,000 repeats of one failure make one cluster and only each cluster's sample
+    is held, however many occurrences there are. Phase 2
+    fetches `limit` lines before & after one representative occurrence per cluster (its
+    earliest) for the `max_clusters` most frequent clusters. Both phases go through the local
+    time-range cache (`log_cache`) unless `use_cache` is False.
+    Returns cluster dicts (fingerprint, template, count, first_seen, last_seen, logs), most
+    frequent first. `logs_client` defaults to the pooled aiobotocore client (pass a fake to test offline,
+    or a `log_files.LocalLogSource` to read local files, which bypass the cache).
+    """
+    logs_client = logs_client or await get_async_client()
+    local = isinstance(logs_client, LocalLogSource)
+    if cache is None and use_cache and not local:
+        # Opening the store counts its rows, keep that off the event loop too
+        cache = await asyncio.to_thread(get_log_cache)
 
     # ✅ Ensure start_time and end_time are always Unix timestamps (int)
     if isinstance(start_time, datetime):
@@ -19,78 +392,78 @@ def get_logs_with_context(log_group, start_time, end_time, error_message, log_st
     print(f"🛠️ Debugging AWS Query:")
     print(f"   Log Group: {log_group}")
     print(f"   Log Stream: {log_stream}")
-    print(f"   Start Timestamp (Unix): {start_time} → {datetime.utcfromtimestamp(start_time).strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"   End Timestamp (Unix): {end_time} → {datetime.utcfromtimestamp(end_time).strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"   Start Timestamp (Unix): {start_time} → {datetime.fromtimestamp(start_time, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"   End Timestamp (Unix): {end_time} → {datetime.fromtimestamp(end_time, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}")
 
+    # Step 1: Find all occurrences of the error, server-side, and group them by template as they arrive:
+    # only each cluster's sample is kept, not the occurrences
+    miner = TemplateMiner()
     try:
-        # ✅ Construct the query
-        query_string = f'''
-            fields @timestamp, @message
-            | filter @logStream like "{log_stream}"
-            | sort @timestamp asc
-        '''
-        
-        print(f"📜 Running AWS Query: {query_string.strip()}")
-
-        response = client.start_query(
-            logGroupName=log_group,
-            startTime=start_time,  # Ensure Unix timestamp
-            endTime=end_time,      # Ensure Unix timestamp
-            queryString=query_string,
-        )
+        async for rows in find_error_occurrences(logs_client, log_group, start_time, end_time, error_message,
+                                                 log_stream, cache):
+            await asyncio.to_thread(cluster_occurrences, rows, miner)
+    except (FileNotFoundError, ValueError):
+        # Missing or rejected local log paths are the caller's error, not an empty result
+        raise
     except Exception as e:
         print(f"❌ AWS CloudWatch Query Failed: {e}")
         return []
-    
-    query_id = response["queryId"]
 
-    # ✅ Wait for query results
-    while True:
-        result = client.get_query_results(queryId=query_id)
-        if result["status"] in ["Complete", "Failed", "Cancelled"]:
-            break
-        time.sleep(2)
+    if not miner.lines:
+        print("❌ No logs found matching the error message.")
+        return []
 
-    # ✅ Debugging: Print raw AWS CloudWatch response
-    #print(f"📜 AWS Query Result: {result}")
+    clusters = miner.top(max_clusters)
+    print(f"🔍 Found {miner.lines} occurrences of the error message in {len(miner)} distinct failure(s)"
+          + (f", keeping the {max_clusters} most frequent" if len(miner) > max_clusters else "") + ".")
 
-    # Step 2: Parse logs & extract relevant messages
-    all_logs = []
-    for row in result.get("results", []):
-        raw_log = row[1]["value"]  # Extract @message field
-        try:
-            log_data = json.loads(raw_log)  # Parse JSON log
-            all_logs.append({
-                "timestamp": log_data["time"],
-                "log": log_data["log"]
-            })
-        except (json.JSONDecodeError, KeyError):
-            continue  # Skip malformed logs
-
-    # Step 3: Find all occurrences of the error
-    error_indices = [i for i, log in enumerate(all_logs) if error_message in log["log"]]
-
-    if not error_indices:
-        print("❌ No logs found matching the error message.")
+    # Step 2: Retrieve logs within ±limit lines of one occurrence per failure
+    try:
+        contexts = await fetch_context(logs_client, log_group, log_stream, [c.sample["ms"] for c in clusters],
+                                       start_time, end_time, error_message, limit, cache)
+    except (FileNotFoundError, ValueError):
+        raise
+    except Exception as e:
+        print(f"❌ AWS CloudWatch Query Failed: {e}")
         return []
 
-    print(f"🔍 Found {len(error_indices)} occurrences of the error message.")
+    results = []
+    for cluster in clusters:
+        windows = contexts.get(cluster.sample["ms"], [])
+        # The window centred on the representative line itself, else any other match at that instant
+        context = next((lines for line, lines in windows if line["log"] == cluster.sample["log"]),
+                       windows[0][1] if windows else [cluster.sample])
+        results.append({**cluster.to_dict(), "logs": [f"{log['timestamp']} - {log['log']}" for log in context]})
+    return results
+
 
-    # Step 4: Retrieve logs within ±5 range of each error (limit occurrences if needed)
+def format_clusters(clusters):
+    """Flattens clusters into log lines, each window under a header with the failure's count and time span."""
     logs_with_context = []
-    for index, error_index in enumerate(error_indices[:max_occurrences]):  # Limit occurrences
-        start_index = max(0, error_index - 5)
-        end_index = min(len(all_logs), error_index + 6)  # +6 to include the error itself
+    for index, cluster in enumerate(clusters):
+        seen = (f"at {cluster['first_seen']}" if cluster["count"] == 1
+                else f"{cluster['count']}× from {cluster['first_seen']} to {cluster['last_seen']}")
+        logs_with_context.append(f"\n🛑 **Context around Failure {index + 1} ({seen})**:")
+        logs_with_context.append(f"🧩 Template: {cluster['template']}")
+        logs_with_context.extend(cluster["logs"])
+    return logs_with_context
 
-        context_logs = all_logs[start_index:end_index]
-        formatted_logs = [f"{log['timestamp']} - {log['log']}" for log in context_logs]
 
-        logs_with_context.append(f"\n🛑 **Context around Error Occurrence {index + 1}**:")
-        logs_with_context.extend(formatted_logs)
+async def get_logs_with_context_async(log_group, start_time, end_time, error_message, log_stream, limit=5,
+                                      max_clusters=MAX_CLUSTERS, logs_client=None, cache=None, use_cache=True):
+    """Fetch logs from AWS CloudWatch, including 5 logs before & after one occurrence of each distinct failure.
 
-    return logs_with_context
+    `get_error_clusters_async`, flattened by `format_clusters`.
+    """
+    return format_clusters(await get_error_clusters_async(log_group, start_time, end_time, error_message, log_stream,
+                                                          limit, max_clusters, logs_client, cache, use_cache))
 
 
+def get_logs_with_context(log_group, start_time, end_time, error_message, log_stream, limit=5,
+                          max_clusters=MAX_CLUSTERS, logs_client=None, cache=None, use_cache=True):
+    """Blocking wrapper of `get_logs_with_context_async`, using boto3's client by default."""
+    return asyncio.run(get_logs_with_context_async(log_group, start_time, end_time, error_message, log_stream, limit,
+                                                   max_clusters, logs_client or get_client(), cache, use_cache))
 
 
 # If running as a standalone script
@@ -102,7 +475,7 @@ if __name__ == "__main__":
     end = datetime(2025, 2, 10, 16, 55, tzinfo=timezone.utc)
 
     # ✅ Convert to Unix timestamps
-    start_time = int(start.timestamp())  
+    start_time = int(start.timestamp())
     end_time = int(end.timestamp())
 
     log_stream = "qa_aro-service"
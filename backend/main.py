@@ -1,14 +1,42 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from log_retrieval import get_logs_with_context
-from code_retrieval import search_code
-from llm_debugging import ask_gpt
+from log_retrieval import get_error_clusters_async, format_clusters, close_async_client
+from log_files import get_local_source, close_local_source
+from log_cache import get_log_cache
+from code_retrieval import search_code_async, load_symbols
+from index_registry import get_index_registry
+from java_chunker import parse_provenance
+from query_cache import get_query_cache
+from llm_debugging import ask_gpt_async, stream_gpt_async
+from answer_cache import get_answer_cache
+from embedder import close_async_openai
+from metrics import TraceMiddleware, render
+import indexing_jobs
 from pydantic import BaseModel
 from datetime import datetime, timezone
-from typing import List
+from typing import List, Optional
 
+# Per-request time budgets, in seconds
+LOGS_TIMEOUT = 120
+CODE_TIMEOUT = 30
+DEBUG_TIMEOUT = 180
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Pooled AWS / OpenAI connections are opened on first use and closed here
+    await close_async_client()
+    await close_async_openai()
+    close_local_source()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,30 +44,216 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  
     allow_headers=["*"],  
+    expose_headers=["Server-Timing"],
 )
+# Per-request stage spans, returned as a Server-Timing header; request latency for /metrics
+app.add_middleware(TraceMiddleware)
 
 class DebugRequest(BaseModel):
     logs: list
     code: list
+    error_message: str = ""  # Lets prompt compaction keep the lines around this error
+    use_cache: bool = True  # False skips the answer cache lookup; the fresh analysis replaces the cached one
+
+class IndexRequest(BaseModel):
+    # Under the server's SOURCE_ROOT (relative paths start there); anything outside is rejected
+    source_dir: str
+    # Index to build or update; GET /repositories lists them, None is the default one
+    repository: Optional[str] = None
+    # flat | hnsw | ivf_flat | ivf_pq and l2 | cosine; default to those of the current index
+    index_type: Optional[str] = None
+    metric: Optional[str] = None
 
 
 @app.get("/logs")
-def fetch_logs(log_group: str, log_stream: str, start_time: str, end_time: str, error_message: str = ""):
+async def fetch_logs(log_group: str, log_stream: str, start_time: str, end_time: str, error_message: str = "",
+                     use_cache: bool = True, source: str = "cloudwatch"):
+    # source=local reads container log files under LOCAL_LOG_DIR instead of CloudWatch
+    if source not in ("cloudwatch", "local"):
+        return {"error": f"❌ Unknown log source `{source}` (expected cloudwatch or local).", "logs": [], "clusters": []}
     start_timestamp = int(datetime.strptime(start_time, "%Y-%m-%dT%H:%M").replace(tzinfo=timezone.utc).timestamp())
     end_timestamp = int(datetime.strptime(end_time, "%Y-%m-%dT%H:%M").replace(tzinfo=timezone.utc).timestamp())
 
-    logs = get_logs_with_context(log_group, start_timestamp, end_timestamp, error_message, log_stream)
-    return {"logs": logs}
+    try:
+        clusters = await asyncio.wait_for(
+            get_error_clusters_async(log_group, start_timestamp, end_timestamp, error_message, log_stream,
+                                     logs_client=get_local_source() if source == "local" else None,
+                                     use_cache=use_cache),
+            LOGS_TIMEOUT,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        # A log group / stream that does not exist or is rejected (e.g. a path outside LOCAL_LOG_DIR)
+        return JSONResponse({"error": str(e), "logs": [], "clusters": []},
+                            status_code=404 if isinstance(e, FileNotFoundError) else 400)
+    except asyncio.TimeoutError:
+        return {"error": f"⏱️ Log retrieval timed out after {LOGS_TIMEOUT}s.", "logs": [], "clusters": []}
+    # One context window per distinct failure; `clusters` lets the UI search code once per failure
+    return {"logs": format_clusters(clusters), "clusters": clusters}
+
+@app.get("/logs/cache")
+def logs_cache_stats():
+    return get_log_cache().stats()
 
 @app.post("/code")
-def fetch_code(logs: list[str]):
+async def fetch_code(logs: list[str], nprobe: Optional[int] = Query(None, ge=1),
+                     ef_search: Optional[int] = Query(None, ge=1), repository: Optional[str] = None):
     # Possibly convert the list of log lines into one big string 
     combined_text = "\n".join(logs)
-    code = search_code(combined_text)
-    return {"code": code}
+    try:
+        code = await asyncio.wait_for(
+            search_code_async(combined_text, nprobe=nprobe, ef_search=ef_search, repository=repository), CODE_TIMEOUT
+        )
+    except (FileNotFoundError, ValueError) as e:
+        return {"error": str(e), "code": []}
+    except asyncio.TimeoutError:
+        return {"error": f"⏱️ Code search timed out after {CODE_TIMEOUT}s.", "code": []}
+    # File, line range and class/method of each snippet (None for snippets indexed before chunking)
+    return {"code": code, "sources": [parse_provenance(snippet) for snippet in code]}
+
+@app.get("/code/cache")
+def code_cache_stats(repository: Optional[str] = None):
+    # `symbols.confident`: searches answered from class / method / stack-frame hits, with no embedding call
+    try:
+        symbols = load_symbols(repository)
+    except (FileNotFoundError, ValueError):
+        symbols = None
+    return {**get_query_cache().stats(), "symbols": symbols.stats() if symbols else None}
+
+@app.get("/repositories")
+def list_repositories():
+    # Indexes on disk, which are loaded, and the memory budget they are evicted under
+    registry = get_index_registry()
+    return {"repositories": registry.repositories(), **registry.stats()}
+
+
+async def cached_answer(request):
+    """(probe, hit) for a debug request: hit is the cached analysis with its provenance, or None.
+
+    The cache only ever saves work: if fingerprinting fails, the probe is None and GPT is asked as usual.
+    SQLite reads and writes run in worker threads, off the event loop.
+    """
+    cache = await asyncio.to_thread(get_answer_cache)
+    try:
+        probe = await cache.probe_async(request.logs, request.code)
+    except Exception as e:
+        print(f"⚠️ Answer cache unavailable: {e}")
+        return None, None
+    if not request.use_cache:
+        cache.bypass()
+        return probe, None
+    return probe, await asyncio.to_thread(cache.lookup, probe)
+
+def store_answer(probe, request, answer, seconds):
+    if probe is None or not answer:
+        return
+    try:
+        get_answer_cache().store(probe, answer, request.error_message, seconds)
+    except Exception as e:
+        print(f"⚠️ Could not cache the analysis: {e}")
 
 
 @app.post("/debug")
-def fetch_debug_info(request: DebugRequest):
-    debug_info = ask_gpt(request.logs, request.code)
-    return {"debug_info": debug_info}
+async def fetch_debug_info(request: DebugRequest):
+    probe, hit = await cached_answer(request)
+    if hit:
+        # `cache`: how the analysis matched (exact / similar), when it was written and for which error
+        return {"debug_info": hit.pop("answer"), "cache": hit}
+    started = time.perf_counter()
+    try:
+        debug_info = await asyncio.wait_for(
+            ask_gpt_async(request.logs, request.code, error_message=request.error_message), DEBUG_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        return {"error": f"⏱️ Debugging analysis timed out after {DEBUG_TIMEOUT}s.", "debug_info": ""}
+    await asyncio.to_thread(store_answer, probe, request, debug_info, time.perf_counter() - started)
+    return {"debug_info": debug_info, "cache": None}
+
+@app.get("/debug/cache")
+def debug_cache_stats():
+    return get_answer_cache().stats()
+
+
+def sse(event, data):
+    """Formats one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/debug/stream")
+async def stream_debug_info(request: DebugRequest):
+    """Streams the analysis as server-sent events while GPT writes it.
+
+    Emits `token` events ({"text"}) as pieces arrive, then `done` with time to first token
+    and total time, or `error`. POST /debug stays as the non-streaming fallback. A cached
+    analysis comes back as a single `token` event, and `done` carries its provenance in `cache`.
+    """
+    async def events():
+        started = time.perf_counter()
+        probe, hit = await cached_answer(request)
+        if hit:
+            yield sse("token", {"text": hit.pop("answer")})
+            total_ms = round((time.perf_counter() - started) * 1000)
+            yield sse("done", {"time_to_first_token_ms": total_ms, "total_ms": total_ms, "chunks": 1, "cache": hit})
+            return
+
+        started = time.perf_counter()
+        first_token, chunks, answer = None, 0, []
+        pieces = stream_gpt_async(request.logs, request.code, error_message=request.error_message)
+        try:
+            while True:
+                remaining = DEBUG_TIMEOUT - (time.perf_counter() - started)
+                try:
+                    text = await asyncio.wait_for(pieces.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                chunks += 1
+                answer.append(text)
+                yield sse("token", {"text": text})
+        except asyncio.TimeoutError:
+            yield sse("error", {"error": f"⏱️ Debugging analysis timed out after {DEBUG_TIMEOUT}s."})
+            return
+        except Exception as e:
+            print(f"❌ Streaming analysis failed: {e}")
+            yield sse("error", {"error": f"❌ Streaming analysis failed: {e}"})
+            return
+        finally:
+            await pieces.aclose()
+
+        total = time.perf_counter() - started
+        first_token = total if first_token is None else first_token
+        print(f"⏱️ /debug/stream: first token after {first_token:.2f}s, done after {total:.2f}s ({chunks} chunks)")
+        # Only complete analyses are cached (a client that disconnects never gets here)
+        await asyncio.to_thread(store_answer, probe, request, "".join(answer), total)
+        yield sse("done", {"time_to_first_token_ms": round(first_token * 1000),
+                           "total_ms": round(total * 1000), "chunks": chunks, "cache": None})
+
+    # No proxy buffering, so each event reaches the browser as soon as it is written
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/index")
+def start_indexing(request: IndexRequest):
+    # Builds in the background; /code keeps serving the current index until the swap
+    try:
+        job = indexing_jobs.start_job(request.source_dir, index_type=request.index_type, metric=request.metric,
+                                      repository=request.repository)
+    except (ValueError, RuntimeError) as e:
+        return {"error": str(e)}
+    return {"job": job.to_dict()}
+
+@app.get("/index")
+def list_indexing_jobs():
+    return {"jobs": [job.to_dict() for job in indexing_jobs.list_jobs()]}
+
+@app.get("/index/{job_id}")
+def get_indexing_job(job_id: str):
+    job = indexing_jobs.get_job(job_id)
+    if job is None:
+        return {"error": f"❌ Unknown indexing job `{job_id}`."}
+    return {"job": job.to_dict()}
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text format: request latency by route, per-stage latency histograms, CloudWatch / token counters
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
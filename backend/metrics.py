@@ -0,0 +1,212 @@
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets, in seconds: sub-millisecond FAISS searches up to multi-minute analyses
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+                   120.0, 300.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+# Requests slower than this print their trace
+SLOW_REQUEST_SECONDS = float(os.getenv("TRACE_PRINT_SECONDS", "1.0"))
+
+REGISTRY = []
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Counter:
+    """A Prometheus counter, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels[name] for name in self.labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_label_text(self.labels, key)} {value}" for key, value in values]
+
+
+class Histogram:
+    """A Prometheus histogram: cumulative bucket counts, sum and count, optionally split by labels.
+
+    An observation is a bisect and three increments under a lock, cheap enough for every request.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][position] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels):
+        entry = self._values.get(tuple(labels[name] for name in self.labels))
+        return entry[2] if entry else 0
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        lines = []
+        names = (*self.labels, "le")
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_label_text(names, (*key, bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+
+def render():
+    """Every metric in the Prometheus text exposition format, for GET /metrics."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time to serve a request, by route and status.",
+                                 ("method", "route", "status"))
+STAGE_SECONDS = Histogram("pipeline_stage_duration_seconds",
+                          "Time spent in each pipeline stage: cloudwatch_query, log_parse, embedding_request, "
+                          "symbol_search, faiss_search, prompt_build, llm_first_token, llm_total, ...", ("stage",))
+CLOUDWATCH_QUERIES = Counter("cloudwatch_queries_total", "Logs Insights queries, by final status.", ("status",))
+CLOUDWATCH_ROWS = Counter("cloudwatch_rows_returned_total", "Rows returned by Logs Insights queries.")
+CLOUDWATCH_RECORDS_SCANNED = Counter("cloudwatch_records_scanned_total",
+                                     "Log records Logs Insights scanned to answer the queries.")
+CLOUDWATCH_BYTES_SCANNED = Counter("cloudwatch_bytes_scanned_total", "Bytes Logs Insights scanned.")
+LOG_LINES_PARSED = Counter("log_lines_parsed_total", "Log rows parsed from JSON container logs.")
+EMBEDDING_TOKENS = Counter("embedding_tokens_total", "Tokens sent to the embedding API.")
+EMBEDDING_INPUTS = Counter("embedding_inputs_total", "Texts sent to the embedding API.")
+PROMPT_TOKENS = Histogram("debug_prompt_tokens", "Log and code tokens in a debugging prompt, after compaction.",
+                          buckets=TOKEN_BUCKETS)
+PROMPT_TOKENS_SAVED = Counter("debug_prompt_tokens_saved_total", "Tokens removed from debugging prompts by compaction.")
+
+
+class Trace:
+    """The spans of one request, in the order they ended."""
+
+    __slots__ = ("started", "spans")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def server_timing(self):
+        """A `Server-Timing` header value: total time per stage, with the span count when above one."""
+        totals = {}
+        for stage, _, seconds, _ in self.spans:
+            total = totals.setdefault(stage, [0.0, 0])
+            total[0] += seconds
+            total[1] += 1
+        entries = [f'{stage};dur={seconds * 1000:.1f}' + (f';desc="{count}x"' if count > 1 else "")
+                   for stage, (seconds, count) in totals.items()]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(entries)
+
+    def summary(self):
+        return " · ".join(f"{stage} +{offset * 1000:.0f}ms {seconds * 1000:.1f}ms"
+                          + "".join(f" {key}={value}" for key, value in attributes.items())
+                          for stage, offset, seconds, attributes in self.spans)
+
+
+_trace = contextvars.ContextVar("trace", default=None)
+
+
+def record_span(stage, seconds, **attributes):
+    """Records a timing measured by the caller: into STAGE_SECONDS, and into the request's trace if there is one.
+
+    Tasks and `asyncio.to_thread` calls inherit the context, so their spans land in the trace of the request that
+    started them.
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace = _trace.get()
+    if trace is not None:
+        trace.spans.append((stage, time.perf_counter() - seconds - trace.started, seconds, attributes))
+
+
+@contextmanager
+def span(stage, **attributes):
+    """Times the block as `stage`; the yielded dict takes attributes learned inside it (rows, tokens, ...)."""
+    started = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        record_span(stage, time.perf_counter() - started, **attributes)
+
+
+class TraceMiddleware:
+    """ASGI middleware: one trace per request, returned as `Server-Timing`, and request latency by route.
+
+    Requests slower than SLOW_REQUEST_SECONDS print their spans. Spans that end after the
+    response headers (while a streaming body is sent) reach the metrics and that print, not the header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace = Trace()
+        token = _trace.set(trace)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []),
+                                                  (b"server-timing", trace.server_timing().encode("latin-1"))]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _trace.reset(token)
+            seconds = time.perf_counter() - trace.started
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(seconds, method=scope["method"], route=route, status=str(status))
+            if seconds >= SLOW_REQUEST_SECONDS:
+                print(f"🧭 {scope['method']} {route} {status} in {seconds * 1000:.0f}ms: {trace.summary()}")
@@ -0,0 +1,322 @@
+import math
+import os
+import re
+import sys
+from functools import lru_cache
+
+from embedder import get_encoding
+from java_chunker import find_block_end
+from query_cache import normalize_log_text
+
+PROMPT_MODEL = "gpt-4-turbo"
+# Tokens of logs + code sent to the model; the fixed instructions come on top
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "12000"))
+# Share of the budget logs may use; code gets the rest plus whatever logs leave unused
+LOG_TOKEN_SHARE = 0.4
+# SQL blocks longer than this keep their first two and last line
+SQL_KEEP_LINES = 4
+
+_TIMESTAMP_PREFIX = re.compile(r"^\s*\d{4}-\d{2}-\d{2}T[\d:.]+Z?\s+-\s?")
+_LOG_RECORD = re.compile(r"^\s*(?:\d{4}-\d{2}-\d{2}[T ])?\d{2}:\d{2}:\d{2}|\b(?:TRACE|DEBUG|INFO|WARN|ERROR|FATAL)\b")
+_SQL_START = re.compile(r"^\s*(?:SELECT|WITH|INSERT|UPDATE|DELETE|FROM|WHERE|AND|OR|JOIN|ORDER BY|GROUP BY)\b",
+                        re.IGNORECASE)
+_ERROR_LINE = re.compile(r"\b(?:ERROR|FATAL|SEVERE|Caused by)\b|\w+(?:Exception|Error)\b")
+_SECTION_HEADER = "🛑"
+
+_METHOD_START = re.compile(
+    r"(?:(?:public|protected|private|static|final|abstract|synchronized|native|default)\s+)*"
+    r"(?:<[^>{};]*>\s*)?[\w.$<>\[\]?,\s]+?\s+(\w+)\s*\([^(){};]*\)\s*(?:throws\s+[\w.$,\s]+)?\{"
+)
+_NOT_METHODS = {"if", "for", "while", "switch", "catch", "synchronized", "return", "new", "else", "try"}
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_CAMEL = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_STOP_TERMS = {
+    "the", "and", "for", "with", "from", "this", "that", "new", "null", "true", "false", "return", "public",
+    "private", "protected", "static", "final", "void", "class", "import", "package", "int", "long", "string",
+    "debug", "info", "main", "select", "where", "order",
+}
+
+
+@lru_cache(maxsize=65536)
+def count_tokens(text, model=PROMPT_MODEL):
+    """Token count of a text under the chat model's tokenizer; repeated lines are counted once."""
+    return len(get_encoding(model).encode(text))
+
+
+def truncate_tokens(text, max_tokens, model=PROMPT_MODEL):
+    """Cuts a text down to its first `max_tokens` tokens."""
+    encoding = get_encoding(model)
+    tokens = encoding.encode(text)
+    return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens]) + " …"
+
+
+def log_lines(logs):
+    """Flattens the /logs output (or a raw string) into lines."""
+    if isinstance(logs, str):
+        return logs.splitlines()
+    return [line for entry in logs for line in str(entry).strip("\n").splitlines() or [""]]
+
+
+def message(line):
+    """The log text of a "<timestamp> - <log>" line."""
+    return _TIMESTAMP_PREFIX.sub("", line, count=1)
+
+
+def collapse_sql(lines):
+    """Shortens multi-line SQL statements to their first two and last line.
+
+    A block starts at a line opening with a SQL keyword and runs until the next line
+    that looks like a new log record. Returns the lines and how many were collapsed.
+    """
+    result, collapsed, i = [], 0, 0
+    while i < len(lines):
+        if not _SQL_START.match(message(lines[i])):
+            result.append(lines[i])
+            i += 1
+            continue
+        end = i + 1
+        while end < len(lines) and not _LOG_RECORD.search(message(lines[end])) and _SECTION_HEADER not in lines[end]:
+            end += 1
+        block = lines[i:end]
+        # Blank continuation lines at the end of a statement carry nothing
+        while len(block) > 1 and not message(block[-1]).strip():
+            block.pop()
+            collapsed += 1
+        if len(block) > SQL_KEEP_LINES:
+            result.extend(block[:2])
+            result.append(f"… {len(block) - 3} SQL lines collapsed …")
+            result.append(block[-1])
+            collapsed += len(block) - 3
+        else:
+            result.extend(block)
+        i = end
+    return result, collapsed
+
+
+def dedupe_lines(lines):
+    """Keeps the first of each set of lines that only differ in timestamps, ids or numbers.
+
+    Section headers are never merged. Returns the lines and how many were dropped.
+    """
+    seen, result, counts = {}, [], []
+    for line in lines:
+        key = None if _SECTION_HEADER in line else normalize_log_text(message(line))
+        if key is not None and key in seen:
+            counts[seen[key]] += 1
+            continue
+        if key is not None:
+            seen[key] = len(result)
+        result.append(line)
+        counts.append(1)
+    deduped = [line if count == 1 else f"{line} (repeated ×{count})" for line, count in zip(result, counts)]
+    return deduped, len(lines) - len(result)
+
+
+def error_positions(lines, error_message=""):
+    """Positions of the lines the analysis is about.
+
+    Lines containing `error_message` if given and present, else lines that look like
+    errors, else the middle line of each context section.
+    """
+    if error_message:
+        hits = [i for i, line in enumerate(lines) if error_message.lower() in line.lower()]
+        if hits:
+            return hits
+    hits = [i for i, line in enumerate(lines) if _SECTION_HEADER not in line and _ERROR_LINE.search(message(line))]
+    if hits:
+        return hits
+    headers = [i for i, line in enumerate(lines) if _SECTION_HEADER in line] + [len(lines)]
+    if headers[0] != 0:
+        headers.insert(0, -1)
+    return [(start + end + 1) // 2 for start, end in zip(headers, headers[1:]) if end - start > 1]
+
+
+def fit_logs(lines, budget, anchors):
+    """Keeps the lines nearest the anchors that fit in `budget` tokens, in their original order.
+
+    Section headers are always kept; runs of dropped lines become a single marker.
+    """
+    total = sum(count_tokens(line) for line in lines)
+    if total <= budget:
+        return lines, 0
+
+    # Every kept line may follow a gap, and one more may close the section: reserve room for their markers
+    marker = count_tokens(f"… {len(lines)} lines omitted …")
+    keep = {i for i, line in enumerate(lines) if _SECTION_HEADER in line}
+    used = marker + sum(count_tokens(lines[i]) + marker for i in keep)
+    distance = [min((abs(i - a) for a in anchors), default=0) for i in range(len(lines))]
+    for i in sorted(range(len(lines)), key=lambda i: (distance[i], i)):
+        if i in keep:
+            continue
+        cost = count_tokens(lines[i]) + marker
+        if used + cost > budget:
+            continue
+        keep.add(i)
+        used += cost
+
+    result, dropped = [], 0
+    for i, line in enumerate(lines):
+        if i in keep:
+            if dropped:
+                result.append(f"… {dropped} lines omitted …")
+            result.append(line)
+            dropped = 0
+        else:
+            dropped += 1
+    if dropped:
+        result.append(f"… {dropped} lines omitted …")
+    return result, len(lines) - len(keep)
+
+
+def terms(text):
+    """Lower-cased identifier parts (camelCase and snake_case split) used to score code."""
+    found = set()
+    for identifier in _IDENTIFIER.findall(text):
+        found.add(identifier.lower())
+        found.update(part.lower() for part in _CAMEL.findall(identifier))
+    return {term for term in found if len(term) > 2 and term not in _STOP_TERMS}
+
+
+def split_methods(source):
+    """Splits a Java snippet into its header and top-level method bodies.
+
+    Returns (header, methods, footer) where methods are (name, text) pairs. Works on
+    partial chunks too: a method cut off by the chunk boundary runs to the end of text.
+    """
+    methods, cursor, header_end = [], 0, None
+    while True:
+        match = _METHOD_START.search(source, cursor)
+        while match and match.group(1) in _NOT_METHODS:
+            match = _METHOD_START.search(source, match.end())
+        if not match:
+            break
+        start = match.start()
+        while start < match.end() and source[start].isspace():
+            start += 1
+        end = find_block_end(source, match.end() - 1)
+        if header_end is None:
+            header_end = start
+        methods.append((match.group(1), source[start:end]))
+        cursor = end
+    if header_end is None:
+        return source, [], ""
+    return source[:header_end], methods, source[cursor:]
+
+
+def compact_header(header):
+    """Drops import statements from a snippet's header, leaving a count in their place."""
+    imports = re.findall(r"import\s+(?:static\s+)?[\w.*]+\s*;", header)
+    if len(imports) <= 3:
+        return header.strip()
+    stripped = re.sub(r"\s*import\s+(?:static\s+)?[\w.*]+\s*;", "", header).strip()
+    return f"// {len(imports)} imports omitted\n{stripped}"
+
+
+def fit_code(snippets, budget, query_terms):
+    """Keeps the methods most similar to the logs that fit in `budget` tokens.
+
+    Methods are ranked by the identifier parts they share with the log text, scaled by
+    their length so large methods need proportionally more overlap; a method named in
+    the logs (e.g. in a stack trace) ranks first. Returns the trimmed snippets and the
+    number of methods dropped.
+    """
+    parts = []
+    for snippet in snippets:
+        header, methods, footer = split_methods(snippet)
+        parts.append((compact_header(header), methods, footer.strip()))
+
+    # As in fit_logs, each kept method and each snippet's end may carry an omission marker (and a newline)
+    marker = count_tokens(f"// … {max((len(methods) for _, methods, _ in parts), default=0)} methods omitted …") + 1
+    used = sum(count_tokens(header) + count_tokens(footer) + marker + 2 for header, _, footer in parts)
+    candidates = []
+    for s, (_, methods, _) in enumerate(parts):
+        for m, (name, text) in enumerate(methods):
+            method_terms = terms(text)
+            overlap = len(method_terms & query_terms)
+            score = overlap / math.sqrt(len(method_terms) or 1) + (10 if name.lower() in query_terms else 0)
+            candidates.append((score, s, m))
+
+    chosen = set()
+    for score, s, m in sorted(candidates, reverse=True):
+        cost = count_tokens(parts[s][1][m][1]) + marker
+        if used + cost <= budget:
+            chosen.add((s, m))
+            used += cost
+
+    trimmed, dropped = [], 0
+    for s, (header, methods, footer) in enumerate(parts):
+        pieces = [header] if header else []
+        skipped = 0
+        for m, (_, text) in enumerate(methods):
+            if (s, m) in chosen:
+                if skipped:
+                    pieces.append(f"// … {skipped} methods omitted …")
+                pieces.append(text)
+                skipped = 0
+            else:
+                skipped += 1
+        if skipped:
+            pieces.append(f"// … {skipped} methods omitted …")
+        if footer:
+            pieces.append(footer)
+        dropped += sum(1 for m in range(len(methods)) if (s, m) not in chosen)
+        trimmed.append("\n".join(pieces))
+
+    # Headers alone can exceed a tight budget; cut what is left evenly
+    total = sum(count_tokens(text) for text in trimmed)
+    if total > budget and trimmed:
+        share = max(1, budget // len(trimmed))
+        trimmed = [truncate_tokens(text, share) for text in trimmed]
+    return trimmed, dropped
+
+
+def compact(logs, snippets, error_message="", budget=PROMPT_TOKEN_BUDGET, log_share=LOG_TOKEN_SHARE):
+    """Fits logs and code into `budget` tokens for the debugging prompt.
+
+    Logs: SQL blocks are collapsed, repeated lines deduplicated, and if still too long
+    the lines nearest the error are kept. Code: imports are dropped and only the methods
+    most similar to the logs are kept. Returns (log lines, snippets, report), where the
+    report counts tokens before and after each step.
+    """
+    snippets = [snippets] if isinstance(snippets, str) else list(snippets)
+    lines = log_lines(logs)
+    report = {
+        "budget": budget,
+        "log_tokens_before": sum(count_tokens(line) for line in lines),
+        "code_tokens_before": sum(count_tokens(snippet) for snippet in snippets),
+    }
+
+    lines, report["sql_lines_collapsed"] = collapse_sql(lines)
+    lines, report["duplicate_lines_removed"] = dedupe_lines(lines)
+    anchors = error_positions(lines, error_message)
+    lines, report["log_lines_omitted"] = fit_logs(lines, int(budget * log_share), anchors)
+    log_tokens = sum(count_tokens(line) for line in lines)
+
+    snippets, report["methods_omitted"] = fit_code(snippets, budget - min(log_tokens, budget), terms(" ".join(lines)))
+
+    report["log_tokens_after"] = log_tokens
+    report["code_tokens_after"] = sum(count_tokens(snippet) for snippet in snippets)
+    before = report["log_tokens_before"] + report["code_tokens_before"]
+    after = report["log_tokens_after"] + report["code_tokens_after"]
+    report["tokens_before"], report["tokens_after"] = before, after
+    report["reduction"] = round(1 - after / before, 3) if before else 0.0
+    return lines, snippets, report
+
+
+def format_report(report):
+    return (f"✂️ Prompt compacted: {report['tokens_before']} → {report['tokens_after']} tokens "
+            f"(logs {report['log_tokens_before']} → {report['log_tokens_after']}, "
+            f"code {report['code_tokens_before']} → {report['code_tokens_after']}; "
+            f"{report['sql_lines_collapsed']} SQL lines collapsed, {report['duplicate_lines_removed']} duplicates, "
+            f"{report['log_lines_omitted']} lines and {report['methods_omitted']} methods omitted)")
+
+
+# Report for saved logs / code: python prompt_builder.py logs.txt Foo.java Bar.java
+if __name__ == "__main__":
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        saved_logs = f.read()
+    saved_code = []
+    for path in sys.argv[2:]:
+        with open(path, "r", encoding="utf-8") as f:
+            saved_code.append(f.read())
+    print(format_report(compact(saved_logs, saved_code)[2]))
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from embedder import EMBEDDING_MODEL, AsyncOpenAIEmbedder, OpenAIEmbedder
+
+CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "query_embeddings.sqlite")
+MAX_MEMORY_ENTRIES = 1024
+MAX_DISK_ENTRIES = 100000
+
+# Volatile tokens that make the same failure look different on every occurrence.
+# Order matters: full timestamps go before bare times, UUIDs before hex and numbers.
+_VOLATILE_PATTERNS = [
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), "<TS>"),
+    (re.compile(r"\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<TIME>"),
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{12,}\b"), "<HEX>"),
+    (re.compile(r"(?<![\w.])[-+]?\d+(?:\.\d+)?(?![\w.])"), "<NUM>"),
+]
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_log_text(text):
+    """Strips timestamps, UUIDs, IPs, hex and numeric ids so repeats of a failure share one key."""
+    for pattern, placeholder in _VOLATILE_PATTERNS:
+        text = pattern.sub(placeholder, text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class QueryEmbeddingCache:
+    """Two-level cache of query embeddings: an in-memory LRU in front of SQLite on disk.
+
+    Keys are hashes of the normalized query text, so the network call is skipped for any
+    query that normalizes to text embedded before, in this process or an earlier one.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_memory_entries=MAX_MEMORY_ENTRIES, max_disk_entries=MAX_DISK_ENTRIES,
+                 model=EMBEDDING_MODEL):
+        self.path = path
+        self.model = model
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings "
+            "(key TEXT PRIMARY KEY, dim INTEGER, vector BLOB, last_used REAL)"
+        )
+        self._db.commit()
+
+    def key(self, normalized):
+        return hashlib.sha256(f"{self.model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector
+            row = self._db.execute("SELECT dim, vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE query_embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.disk_hits += 1
+            vector = np.frombuffer(row[1], dtype=np.float32).reshape(row[0])
+            self._remember(key, vector)
+            return vector
+
+    def put(self, key, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+            self._db.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)",
+                (key, vector.shape[0], vector.tobytes(), time.time()),
+            )
+            count = self._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            if count > self.max_disk_entries:
+                self._db.execute(
+                    "DELETE FROM query_embeddings WHERE key IN "
+                    "(SELECT key FROM query_embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_disk_entries,),
+                )
+            self._db.commit()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, text):
+        """(normalized text, key, cached vector or None) of a query."""
+        normalized = normalize_log_text(text)
+        key = self.key(normalized)
+        return normalized, key, self.get(key)
+
+    def embed(self, text, embedder=None):
+        """Returns the embedding of the normalized `text`, calling `embedder` only on a miss."""
+        normalized, key, vector = self._lookup(text)
+        if vector is None:
+            vector = np.asarray((embedder or OpenAIEmbedder(self.model))([normalized])[0], dtype=np.float32)
+            self.put(key, vector)
+        return vector
+
+    async def embed_async(self, text, embedder=None):
+        """`embed` for the async request path; `embedder` is awaited on a miss.
+
+        Normalization and the SQLite reads and writes run in a worker thread, off the event loop.
+        """
+        normalized, key, vector = await asyncio.to_thread(self._lookup, text)
+        if vector is None:
+            vector = (await (embedder or AsyncOpenAIEmbedder(self.model))([normalized]))[0]
+            vector = np.asarray(vector, dtype=np.float32)
+            await asyncio.to_thread(self.put, key, vector)
+        return vector
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = self._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_query_cache():
+    """The process-wide cache used by `search_code`, opened on first use."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = QueryEmbeddingCache()
+    return _default_cache
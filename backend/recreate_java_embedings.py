@@ -1,25 +1,35 @@
+import argparse
 import json
 import os
 
+from index_registry import DEFAULT_REPOSITORY, repository_paths
+from source_ingest import walk_sources
+
+parser = argparse.ArgumentParser(description="Rebuilds a repository's legacy `java_embeddings.json` from its sources.")
+parser.add_argument("source_dir", nargs="?", default=os.getenv("JAVA_SOURCE_DIR"),
+                    help="Java source tree (default: $JAVA_SOURCE_DIR)")
+parser.add_argument("--repository", default=DEFAULT_REPOSITORY)
+args = parser.parse_args()
+if not args.source_dir:
+    parser.error("give the source directory, or set JAVA_SOURCE_DIR")
+paths = repository_paths(args.repository)
+
 # Check if FAISS index exists
-if not os.path.exists("java_embeddings.index"):
-    raise FileNotFoundError("❌ `java_embeddings.index` not found! Run the embedding script again.")
+if not os.path.exists(paths["index_path"]):
+    raise FileNotFoundError(f"❌ `{paths['index_path']}` not found! Run the embedding script again.")
 
 # If Java source code directory is available, rebuild JSON
-java_source_dir = "C:/Users/ben.yemini/OneDrive - Altman Solon/Documents/GitHub/aro-service"  # Update with correct path
+java_source_dir = args.source_dir
 
 def read_java_files(directory):
-    """Recursively reads all Java files in a directory."""
+    """Reads every Java file `source_ingest` would index (honoring .gitignore, skipping generated files)."""
     code_snippets = []
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".java"):
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        code_snippets.append(f.read())
-                except Exception as e:
-                    print(f"⚠️ Error reading {file_path}: {e}")
+    for path, _ in walk_sources(directory, [".java"]):
+        try:
+            with open(os.path.join(directory, path), "r", encoding="utf-8") as f:
+                code_snippets.append(f.read())
+        except Exception as e:
+            print(f"⚠️ Error reading {path}: {e}")
     return code_snippets
 
 # Read Java files
@@ -31,7 +41,7 @@ if len(java_code) == 0:
 
 # Save reconstructed JSON
 json_data = [{"code": snippet} for snippet in java_code]
-with open("java_embeddings.json", "w", encoding="utf-8") as f:
+with open(paths["json_path"], "w", encoding="utf-8") as f:
     json.dump(json_data, f, indent=4)
 
-print("✅ `java_embeddings.json` successfully reconstructed!")
+print(f"✅ `{paths['json_path']}` successfully reconstructed!")
@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import itertools
+import multiprocessing
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from code_chunkers import CHUNKERS, chunker_for
+
+# Source trees are read by a pool of this many processes (decoding, tokenizing, chunking)...
+MAX_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+# ...once more than this many bytes of source turn up; smaller trees are read in-process
+PARALLEL_MIN_BYTES = 16 * 2 ** 20
+# Files per pool task, and tasks queued per worker: bounds what is held in memory at once
+FILES_PER_TASK = 32
+TASKS_PER_WORKER = 4
+# Directories listed at once by the walk
+WALK_THREADS = 8
+# Larger files are generated or data, not code worth retrieving
+MAX_FILE_BYTES = int(os.getenv("INGEST_MAX_FILE_BYTES", str(2 ** 20)))
+
+# Version control, dependencies and tool state, skipped at any depth whatever .gitignore says
+SKIP_DIRS = {".git", ".hg", ".svn", ".idea", ".vscode", ".gradle", ".mvn", "node_modules", "bower_components",
+             ".next", "__pycache__", ".venv", ".tox", ".mypy_cache", ".pytest_cache", "generated-sources",
+             "generated-test-sources"}
+# Build output and vendored code, skipped only at the repository root: deeper down, `build`,
+# `out` or `vendor` are as likely to be source packages (com/acme/build), left to .gitignore
+ROOT_SKIP_DIRS = {"build", "target", "dist", "out", "vendor", "third_party", "venv"}
+_GENERATED_NAME = re.compile(r"(\.min\.\w+|\.d\.ts|_pb2\.py|_pb2_grpc\.py|\.generated\.\w+)$")
+# Markers code generators leave in a file's first lines
+_GENERATED_MARKER = re.compile(rb"@generated|DO NOT EDIT|[Aa]uto-?generated (?:file|code|class)|"
+                               rb"[Tt]his (?:file|class|code) (?:is|was) (?:auto(?:matically|-)?)?generated")
+
+
+def content_hash(text):
+    """Returns a stable SHA-256 hex digest of a text string."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _translate(pattern):
+    """A .gitignore glob as a regex over `/`-separated paths."""
+    regex, i = "", 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex, i = regex + "(?:.*/)?", i + 3
+        elif pattern.startswith("**", i):
+            regex, i = regex + ".*", i + 2
+        elif pattern[i] == "*":
+            regex, i = regex + "[^/]*", i + 1
+        elif pattern[i] == "?":
+            regex, i = regex + "[^/]", i + 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            close = pattern.index("]", i + 2)
+            body = pattern[i + 1:close]
+            regex += "[" + ("^" + body[1:] if body.startswith("!") else body).replace("\\", "\\\\") + "]"
+            i = close + 1
+        else:
+            if pattern[i] == "\\" and i + 1 < len(pattern):
+                i += 1
+            regex, i = regex + re.escape(pattern[i]), i + 1
+    return regex
+
+
+class IgnoreRules:
+    """The rules of one .gitignore file, matched against paths relative to its directory."""
+
+    def __init__(self, lines):
+        self.rules = []  # (regex, negated, directories only), in file order: the last match wins
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            line = line[1:] if negated else line
+            directories_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+            anchored = "/" in line
+            regex = ("^" if anchored else "^(?:.*/)?") + _translate(line.lstrip("/")) + "$"
+            self.rules.append((re.compile(regex), negated, directories_only))
+
+    @classmethod
+    def read(cls, path):
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return cls(f)
+        except OSError:
+            return None
+
+    def match(self, path, is_dir):
+        """True if ignored, False if re-included by a `!` rule, None if no rule matches."""
+        result = None
+        for regex, negated, directories_only in self.rules:
+            if (is_dir or not directories_only) and regex.match(path):
+                result = not negated
+        return result
+
+
+def ignored(rules, path, is_dir):
+    """Whether the .gitignore files from the root down to `path`'s directory ignore it; deeper files decide."""
+    result = False
+    for base, file_rules in rules:
+        relative = path[len(base) + 1:] if base else path
+        matched = file_rules.match(relative, is_dir)
+        if matched is not None:
+            result = matched
+    return result
+
+
+def _list_directory(root, directory, rules, extensions):
+    """One step of the walk: (source files as (path, size), subdirectories as (path, rules)) of a directory."""
+    full = os.path.join(root, directory) if directory else root
+    own = IgnoreRules.read(os.path.join(full, ".gitignore"))
+    if own is not None and own.rules:
+        rules = [*rules, (directory, own)]
+    files, directories = [], []
+    try:
+        entries = sorted(os.scandir(full), key=lambda entry: entry.name)
+    except OSError as e:
+        print(f"⚠️ Cannot list {full}: {e}")
+        return files, directories
+    for entry in entries:
+        path = f"{directory}/{entry.name}" if directory else entry.name
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                if (entry.name not in SKIP_DIRS and (directory or entry.name not in ROOT_SKIP_DIRS)
+                        and not ignored(rules, path, True)):
+                    directories.append((path, rules))
+            elif (entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions
+                  and not _GENERATED_NAME.search(entry.name) and not ignored(rules, path, False)):
+                files.append((path, entry.stat().st_size))
+        except OSError as e:
+            print(f"⚠️ Cannot read {path}: {e}")
+    return files, directories
+
+
+def walk_sources(root, extensions=None):
+    """Yields (relative path, size) of every source file under `root`, `/`-separated, in a stable order.
+
+    Directories are listed by WALK_THREADS threads at once. Files and directories that a
+    .gitignore (at any level) ignores, SKIP_DIRS, ROOT_SKIP_DIRS at the top level and generated
+    file names are skipped; only extensions with a registered chunker (or `extensions`) are kept.
+    """
+    extensions = {extension.lower() for extension in (extensions or CHUNKERS)}
+    with ThreadPoolExecutor(WALK_THREADS) as pool:
+        pending = deque([pool.submit(_list_directory, root, "", [], extensions)])
+        while pending:
+            files, directories = pending.popleft().result()
+            yield from files
+            pending.extend(pool.submit(_list_directory, root, path, rules, extensions) for path, rules in directories)
+
+
+def read_source(root, path, known_hash=None):
+    """Reads and chunks one source file; top-level, so worker processes can run it.
+
+    Returns {"path", "sha256", "language", "package", "chunks"}, with `chunks` None when the
+    file's hash is `known_hash` (unchanged since the last build), or {"path", "skipped": reason}
+    for binary, generated, oversized or undecodable files. Chunks carry their `hash`.
+    """
+    try:
+        with open(os.path.join(root, path), "rb") as f:
+            data = f.read(MAX_FILE_BYTES + 1)
+    except OSError as e:
+        return {"path": path, "skipped": f"unreadable: {e}"}
+    if len(data) > MAX_FILE_BYTES:
+        return {"path": path, "skipped": "too large"}
+    if b"\0" in data[:8192]:
+        return {"path": path, "skipped": "binary"}
+    if _GENERATED_MARKER.search(data[:2048]):
+        return {"path": path, "skipped": "generated"}
+    try:
+        # Newlines normalized like text-mode reads, so hashes match builds that read files as text
+        text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    except UnicodeDecodeError:
+        return {"path": path, "skipped": "not UTF-8"}
+    if chunker_for(path) is None:
+        return {"path": path, "skipped": "no chunker"}
+    language, chunker, package = chunker_for(path)
+    source = {"path": path, "sha256": content_hash(text), "language": language, "package": package(text, path),
+              "chunks": None}
+    if source["sha256"] != known_hash:
+        source["chunks"] = chunker(text, path)
+        for chunk in source["chunks"]:
+            # Hashed without line numbers, so code that only moved keeps its vector
+            chunk["hash"] = content_hash(chunk["text"])
+    return source
+
+
+def read_sources(root, batch):
+    """`read_source` over a batch of (path, known hash) pairs: one pool task."""
+    return [read_source(root, path, known_hash) for path, known_hash in batch]
+
+
+def _counted(files, found):
+    for count, item in enumerate(files, 1):
+        found(count)
+        yield item
+
+
+def ingest_sources(root, known_hashes=None, extensions=None, workers=MAX_WORKERS,
+                   parallel_min_bytes=PARALLEL_MIN_BYTES, found=None):
+    """Yields a `read_source` result for every source file under `root`, in walk order, as a stream.
+
+    `known_hashes` ({path: sha256} of the last build) lets unchanged files skip chunking.
+    Files are read in-process until more than `parallel_min_bytes` have been found; past
+    that, batches of FILES_PER_TASK go to `workers` spawned processes, with at most
+    TASKS_PER_WORKER batches per worker in flight, so neither file contents nor chunks
+    pile up ahead of the consumer.
+
+    `found`, if given, is called with the number of files the walk has found so far, which
+    runs ahead of the results yielded.
+    """
+    known_hashes = known_hashes or {}
+    files = walk_sources(root, extensions)
+    if found is not None:
+        files = _counted(files, found)
+    head, size = [], 0
+    for path, file_size in files:
+        head.append(path)
+        size += file_size
+        if workers > 1 and size > parallel_min_bytes:
+            break
+    else:
+        for path in head:
+            yield read_source(root, path, known_hashes.get(path))
+        return
+
+    paths = itertools.chain(head, (path for path, _ in files))
+    batches = iter(lambda: [(path, known_hashes.get(path)) for path in itertools.islice(paths, FILES_PER_TASK)], [])
+    pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        window = deque(pool.submit(read_sources, root, batch)
+                       for batch in itertools.islice(batches, workers * TASKS_PER_WORKER))
+        while window:
+            results = window.popleft().result()
+            batch = next(batches, None)
+            if batch is not None:
+                window.append(pool.submit(read_sources, root, batch))
+            yield from results
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lists what indexing would read from a source tree.")
+    parser.add_argument("source_dir")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    counts, skipped, chunks = {}, {}, 0
+    for source in ingest_sources(args.source_dir, workers=args.workers):
+        if "skipped" in source:
+            skipped[source["skipped"]] = skipped.get(source["skipped"], 0) + 1
+            continue
+        counts[source["language"]] = counts.get(source["language"], 0) + 1
+        chunks += len(source["chunks"])
+    print(f"✅ {sum(counts.values())} files ({counts}), {chunks} chunks in {time.perf_counter() - started:.1f}s; "
+          f"skipped {skipped}")
@@ -0,0 +1,215 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+SYMBOLS_PATH = "java_embeddings.symbols.json"
+
+# BM25 parameters (the usual Lucene defaults) and reciprocal rank fusion constant
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+# Terms found in more than this share of chunks are skipped (their IDF is close to zero)
+MAX_TERM_SHARE = 0.5
+
+# Symbol hit strengths: a stack frame's file:line inside the chunk, a named method, a bare class
+FRAME_LINE, METHOD, CLASS = 3, 2, 1
+
+_IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+_CAMEL_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+# `at com.acme.Foo$Inner.bar(Foo.java:123)`: class, method, file and line of a stack frame
+_FRAME = re.compile(r"((?:[a-z_$][\w$]*\.)+[A-Z][\w$]*)\.([\w$<>]+)\((?:([\w$]+\.java)(?::(\d+))?|[^)]*)\)")
+# Logger names, abbreviated or not (`c.a.aro.vt.gao.QueryComposerFactory`)
+_QUALIFIED = re.compile(r"(?<![\w$.])((?:[a-z_$][\w$]*\.)+)([A-Z][\w$]*)")
+# `QueryComposerFactory.compose` in a message
+_CLASS_METHOD = re.compile(r"(?<![\w$.])([A-Z][\w$]*)\.([a-z_$][\w$]*)\b")
+_JAVA_KEYWORDS = frozenset("""
+    abstract assert boolean break byte case catch char class const continue default do double else enum extends
+    final finally float for goto if implements import instanceof int interface long native new null package private
+    protected public return short static super switch synchronized this throw throws transient try void volatile
+    while true false var record
+""".split())
+
+
+def identifier_terms(text):
+    """Lexical terms of a text: each identifier lowercased, plus its camelCase parts."""
+    terms = []
+    for identifier in _IDENTIFIER.findall(text):
+        lowered = identifier.lower()
+        if len(identifier) < 3 or lowered in _JAVA_KEYWORDS:
+            continue
+        terms.append(lowered)
+        parts = _CAMEL_PART.findall(identifier)
+        if len(parts) > 1:
+            terms.extend(part.lower() for part in parts if len(part) > 2)
+    return terms
+
+
+def method_names(label):
+    """Method names of a chunk's `method` label (`run, compute` / `run (part 1/2)`)."""
+    return [name.split(" (part ")[0] for name in (label or "").split(", ") if name and not name.startswith("body")]
+
+
+def build_symbol_index(chunks):
+    """Builds the symbol & term index from chunk dicts (id, file, package, class, method, lines, code)."""
+    classes = defaultdict(lambda: {"ids": [], "methods": defaultdict(list)})
+    locations, postings, lengths = {}, defaultdict(dict), {}
+    for chunk in chunks:
+        chunk_id = chunk["id"]
+        locations[chunk_id] = [chunk["file"], *chunk["lines"]] if chunk.get("lines") else [chunk["file"], 0, 0]
+        if chunk.get("class"):
+            fqn = f"{chunk['package']}.{chunk['class']}" if chunk.get("package") else chunk["class"]
+            entry = classes[fqn]
+            entry["ids"].append(chunk_id)
+            for name in method_names(chunk.get("method")):
+                entry["methods"][name].append(chunk_id)
+        terms = Counter(identifier_terms(chunk["code"]))
+        lengths[chunk_id] = sum(terms.values())
+        for term, count in terms.items():
+            postings[term][chunk_id] = count
+    return {"classes": classes, "locations": locations, "postings": postings, "lengths": lengths}
+
+
+def save_symbol_index(path, symbols):
+    """Writes the index as JSON next to the FAISS index (temp file + rename, like the manifest)."""
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(symbols, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def fuse(rankings, k):
+    """Reciprocal rank fusion of ranked id lists; ids missing from a list just score nothing there."""
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking):
+            if chunk_id >= 0:
+                scores[chunk_id] += 1 / (RRF_K + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+class SymbolIndex:
+    """Inverted index over the Java classes, methods and identifiers of the indexed chunks.
+
+    Resolves stack frames, logger names and `Class.method` mentions in log text to the
+    chunks that define them, and ranks chunks by BM25 over identifier terms, all without
+    an embedding call.
+    """
+
+    def __init__(self, symbols):
+        self.classes = {}
+        self.by_name = defaultdict(list)  # Simple (last dotted) class name -> fully qualified names
+        for fqn, entry in symbols["classes"].items():
+            self.classes[fqn] = entry
+            self.by_name[fqn.rsplit(".", 1)[-1]].append(fqn)
+        self.locations = {int(i): location for i, location in symbols["locations"].items()}
+        self.postings = {term: {int(i): tf for i, tf in ids.items()} for term, ids in symbols["postings"].items()}
+        self.lengths = {int(i): length for i, length in symbols["lengths"].items()}
+        self.average_length = sum(self.lengths.values()) / max(1, len(self.lengths))
+        self.searches = 0
+        self.confident = 0
+
+    def __len__(self):
+        return len(self.locations)
+
+    def frames(self, text):
+        """(class, method, file, line) of each stack frame, nested / anonymous classes folded into their outer one."""
+        for class_name, method, file_name, line in _FRAME.findall(text):
+            parts = [part for part in class_name.replace("$", ".").split(".") if part and not part.isdigit()]
+            if method.startswith("lambda$"):
+                method = method.split("$")[1]
+            yield ".".join(parts), method, file_name, int(line) if line else None
+
+    def resolve(self, text):
+        """Chunk ids named by the text -> (hit strength, whether the naming was unambiguous, class)."""
+        hits = {}
+
+        def hit(ids, strength, unique, fqn):
+            for chunk_id in ids:
+                if chunk_id not in hits or hits[chunk_id][0] < strength:
+                    hits[chunk_id] = (strength, unique, fqn)
+
+        for fqn, method, file_name, line in self.frames(text):
+            # Strip nested class names until an indexed class matches (lambdas, local classes)
+            while fqn not in self.classes and "." in fqn:
+                fqn = fqn.rsplit(".", 1)[0]
+            entry = self.classes.get(fqn)
+            if entry is None:
+                continue
+            if method == "<init>":
+                method = fqn.rsplit(".", 1)[-1]
+            at_line = [i for i in entry["ids"] if line is not None and os.path.basename(self.locations[i][0]) == file_name
+                       and self.locations[i][1] <= line <= self.locations[i][2]]
+            hit(at_line, FRAME_LINE, True, fqn)
+            hit(entry["methods"].get(method, []), METHOD, True, fqn)
+
+        for prefix, name in _QUALIFIED.findall(text):
+            abbreviated = prefix.rstrip(".").split(".")
+            # Logback shortens each package segment to a prefix of itself
+            matches = [fqn for fqn in self.by_name.get(name, [])
+                       if len(fqn.split(".")) - 1 == len(abbreviated)
+                       and all(full.startswith(short) for short, full in zip(abbreviated, fqn.split(".")))]
+            for fqn in matches:
+                hit(self.classes[fqn]["ids"], CLASS, len(matches) == 1, fqn)
+
+        for name, method in _CLASS_METHOD.findall(text):
+            matches = [fqn for fqn in self.by_name.get(name, []) if method in self.classes[fqn]["methods"]]
+            for fqn in matches:
+                hit(self.classes[fqn]["methods"][method], METHOD, len(matches) == 1, fqn)
+        return hits
+
+    def bm25(self, text, k=None, candidates=None):
+        """BM25 scores of chunks over the text's identifier terms -> (k best ids, scores).
+
+        With `candidates`, only those chunks are scored (a lookup per term each). Terms in
+        more than MAX_TERM_SHARE of the chunks add next to nothing and are skipped.
+        """
+        scores = defaultdict(float)
+        n = len(self.lengths)
+        for term in set(identifier_terms(text)):
+            postings = self.postings.get(term)
+            if not postings or len(postings) > MAX_TERM_SHARE * n:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            pairs = postings.items() if candidates is None else ((i, postings[i]) for i in candidates if i in postings)
+            for chunk_id, tf in pairs:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_id] / self.average_length)
+                scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return sorted(scores, key=scores.get, reverse=True)[:k], scores
+
+    def search(self, text, k):
+        """Returns (symbol-ranked ids, BM25-ranked ids, confident).
+
+        Symbol hits are ordered by strength, then BM25. `confident` means an unambiguous
+        frame or method hit, or unambiguous logger names of at most `k` classes (a window
+        of context lines from many loggers does not single out any of them): the caller
+        can then answer from the symbol ranking alone.
+        """
+        self.searches += 1
+        hits = self.resolve(text)
+        named = {fqn for _, unique, fqn in hits.values() if unique}
+        confident = any(unique and strength >= METHOD for strength, unique, _ in hits.values()) or 0 < len(named) <= k
+        # Confident answers only need the hits ranked, unless too few to fill k
+        candidates = hits if confident and len(hits) >= k else None
+        lexical, scores = self.bm25(text, k, candidates)
+        symbol_ids = sorted(hits, key=lambda i: (hits[i][0], scores.get(i, 0.0)), reverse=True)
+        if confident:
+            self.confident += 1
+        return symbol_ids, lexical, confident
+
+    def stats(self):
+        return {
+            "chunks": len(self),
+            "classes": len(self.classes),
+            "terms": len(self.postings),
+            "searches": self.searches,
+            "confident": self.confident,
+        }
+
+
+def load_symbol_index(path=SYMBOLS_PATH):
+    """Loads the symbol index written by `build_index`; None for indexes built before it existed."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return SymbolIndex(json.load(f))
@@ -0,0 +1,25 @@
+"""Tests run offline against the stand-ins in `fakes`: python -m pytest tests (from backend/)."""
+import os
+import sys
+
+import pytest
+
+# Backend modules import each other as top-level modules, as when the server runs from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import embedder  # noqa: E402
+import java_chunker  # noqa: E402
+import prompt_builder  # noqa: E402
+from fakes import FakeEncoding  # noqa: E402
+
+_ENCODING = FakeEncoding()
+
+
+@pytest.fixture(autouse=True)
+def offline_encoding(monkeypatch):
+    """tiktoken downloads its encodings on first use; every module that tokenizes gets the fake."""
+    for module in (embedder, java_chunker, prompt_builder):
+        monkeypatch.setattr(module, "get_encoding", lambda model=None: _ENCODING)
+    prompt_builder.count_tokens.cache_clear()
+    yield
+    prompt_builder.count_tokens.cache_clear()
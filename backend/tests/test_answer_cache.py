@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import answer_cache
+from answer_cache import AnswerCache, Probe
+
+CHUNKS = ["src/Orders.java|OrderService#placeOrder"]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = AnswerCache(str(tmp_path / "answers.sqlite"), ttl_seconds=3600)
+    yield cache
+    cache._db.close()
+
+
+def probe(key, *vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return Probe(key, key, CHUNKS, vector / np.linalg.norm(vector))
+
+
+def test_a_stale_nearest_entry_does_not_hide_a_fresh_similar_one(cache, clock):
+    cache.store(probe("stale", 1.0, 0.0, 0.0), "stale analysis")
+    clock[0] += 3000
+    cache.store(probe("fresh", 1.0, 0.1, 0.0), "fresh analysis")
+    clock[0] += 1000
+    # The stale entry is the closest match, but it expired after an hour
+    hit = cache.lookup(probe("new", 1.0, 0.01, 0.0))
+    assert hit["answer"] == "fresh analysis" and hit["match"] == "similar"
+    assert hit["age_seconds"] == 1000
+
+
+def test_an_expired_exact_entry_falls_back_to_a_fresh_similar_one(cache, clock):
+    cache.store(probe("same", 1.0, 0.0, 0.0), "old analysis")
+    clock[0] += 3000
+    cache.store(probe("fresh", 1.0, 0.1, 0.0), "fresh analysis")
+    clock[0] += 1000
+    hit = cache.lookup(probe("same", 1.0, 0.0, 0.0))
+    assert hit["answer"] == "fresh analysis" and hit["match"] == "similar"
+    assert cache.stats()["entries"] == 1 and cache.stats()["evicted"] == 1
+
+
+def test_expired_entries_alone_are_a_miss(cache, clock):
+    cache.store(probe("stale", 1.0, 0.0, 0.0), "stale analysis")
+    assert cache.lookup(probe("stale", 1.0, 0.0, 0.0))["match"] == "exact"
+    clock[0] += 3601
+    assert cache.lookup(probe("new", 1.0, 0.0, 0.0)) is None
+    assert cache.lookup(probe("stale", 1.0, 0.0, 0.0)) is None
+    assert cache.stats()["misses"] == 2
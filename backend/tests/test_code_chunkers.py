@@ -0,0 +1,86 @@
+from code_chunkers import chunk_kotlin, chunk_python, chunk_typescript, chunker_for, python_package
+from test_java_chunker import assert_provenance, members
+
+
+PYTHON = """import os
+
+
+class Jobs:
+    \"\"\"Queued jobs.\"\"\"
+
+    def run(self):
+        return os.getcwd()
+
+    @staticmethod
+    async def stop():
+        pass
+
+
+def main():
+    Jobs().run()
+"""
+
+KOTLIN = """package com.acme.jobs
+
+class JobRunner(private val queue: List<String>) {
+    fun run() {
+        queue.forEach { println(it) }
+    }
+
+    companion object {
+        fun create(): JobRunner = JobRunner(listOf())
+    }
+}
+
+fun main() {
+    JobRunner.create().run()
+}
+"""
+
+TYPESCRIPT = """import { api } from "./api";
+
+export class JobList {
+  render(): string {
+    if (this.empty) {
+      return "";
+    }
+    return api.list();
+  }
+}
+
+export const load = async (id: number) => api.get(id);
+
+export function main() {
+  new JobList().render();
+}
+"""
+
+
+def test_python_declarations():
+    chunks = chunk_python(PYTHON, "app/jobs.py", min_tokens=0)
+    assert members(chunks) == [("Jobs", ""), ("Jobs", "run"), ("Jobs", "stop"), (None, "main")]
+    stop = next(chunk for chunk in chunks if chunk["method"] == "stop")
+    assert "@staticmethod" in stop["code"]
+    assert_provenance(PYTHON, "app/jobs.py", chunks)
+    assert python_package(PYTHON, "app/jobs/__init__.py") == "app.jobs"
+
+
+def test_kotlin_declarations():
+    chunks = chunk_kotlin(KOTLIN, "JobRunner.kt", min_tokens=0)
+    assert members(chunks) == [("JobRunner", ""), ("JobRunner", "run"), ("JobRunner.Companion", ""),
+                               ("JobRunner.Companion", "create"), (None, "main")]
+    assert_provenance(KOTLIN, "JobRunner.kt", chunks)
+
+
+def test_typescript_declarations_skip_control_flow():
+    chunks = chunk_typescript(TYPESCRIPT, "ui/jobs.ts", min_tokens=0)
+    # The import-only preamble is no chunk of its own
+    assert members(chunks) == [("JobList", ""), ("JobList", "render"), (None, "load"), (None, "main")]
+    assert_provenance(TYPESCRIPT, "ui/jobs.ts", chunks)
+
+
+def test_chunkers_are_chosen_by_extension():
+    assert chunker_for("A.java")[0] == "java"
+    assert chunker_for("a/b.KT")[0] == "kotlin"
+    assert chunker_for("x.tsx")[0] == "typescript"
+    assert chunker_for("README.md") is None
@@ -0,0 +1,100 @@
+import functools
+
+import numpy as np
+import pytest
+
+import embedder
+from embedder import embed_stream, pack_batches
+from fakes import FakeEmbedder, FakeRateLimitError
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(embedder, "SharedBackoff", functools.partial(embedder.SharedBackoff, base=0.001))
+
+
+def items(count, tokens=10):
+    return [(f"key-{i}", f"text number {i}", tokens) for i in range(count)]
+
+
+class FailingEmbedder(FakeEmbedder):
+    """Fails every request that holds one of `poison`, retryably or not."""
+
+    def __init__(self, poison, error=ValueError, **kwargs):
+        super().__init__(dim=8, **kwargs)
+        self.poison = set(poison)
+        self.error = error
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        if self.poison & set(texts):
+            raise self.error("poisoned batch")
+        return super().__call__(texts)
+
+
+def test_pack_batches_respects_token_and_input_limits():
+    assert pack_batches([5, 5, 5, 5], max_request_tokens=10) == [[0, 1], [2, 3]]
+    assert pack_batches([1] * 5, max_request_inputs=2) == [[0, 1], [2, 3], [4]]
+    # An input over the budget still goes out, alone
+    assert pack_batches([3, 20, 3], max_request_tokens=10) == [[0], [1], [2]]
+    assert pack_batches([]) == []
+
+
+def test_embed_stream_yields_every_key_once_with_its_vector():
+    fake = FakeEmbedder(dim=8)
+    results = list(embed_stream(items(50), embedder=fake, max_request_tokens=40, max_workers=3))
+    assert sorted(key for key, _ in results) == sorted(key for key, _, _ in items(50))
+    for key, vector in results:
+        number = int(key.split("-")[1])
+        assert np.allclose(vector, fake.embed_one(f"text number {number}"))
+    assert fake.requests == 13
+
+
+def test_embed_stream_packs_like_pack_batches():
+    fake = FailingEmbedder(poison=())
+    tokens = [7, 3, 9, 1, 1, 12, 4]
+    list(embed_stream([(i, f"t{i}", count) for i, count in enumerate(tokens)], embedder=fake,
+                      max_request_tokens=12, max_workers=1))
+    assert sorted(fake.calls) == sorted([[f"t{i}" for i in batch] for batch in pack_batches(tokens, 12)])
+
+
+def test_embed_stream_consumes_items_lazily():
+    consumed = []
+
+    def produce():
+        for item in items(100):
+            consumed.append(item[0])
+            yield item
+
+    stream = embed_stream(produce(), embedder=FakeEmbedder(dim=8), max_request_inputs=1, max_workers=1)
+    next(stream)
+    # At most 2 x max_workers requests are pending before the first result comes back
+    assert len(consumed) <= 4
+    assert len(list(stream)) == 99
+
+
+def test_failed_requests_yield_none_for_their_items_only():
+    fake = FailingEmbedder(poison={"text number 4"})
+    results = dict(embed_stream(items(10), embedder=fake, max_request_inputs=3, max_workers=2))
+    assert len(results) == 10
+    assert [key for key, vector in results.items() if vector is None] == ["key-3", "key-4", "key-5"]
+
+
+def test_retryable_errors_are_retried_then_given_up():
+    flaky = FakeEmbedder(dim=8, rate_limit_every=2)
+    results = dict(embed_stream(items(6), embedder=flaky, max_request_inputs=1, max_workers=1))
+    assert all(vector is not None for vector in results.values())
+
+    failing = FailingEmbedder(poison={"text number 0"}, error=FakeRateLimitError)
+    failing.retryable_errors = (FakeRateLimitError,)
+    results = dict(embed_stream(items(2), embedder=failing, max_request_inputs=1, max_workers=1, max_retries=2))
+    assert results["key-0"] is None and results["key-1"] is not None
+    assert sum(call == ["text number 0"] for call in failing.calls) == 3
+
+
+def test_progress_counts_embedded_items():
+    done = []
+    fake = FailingEmbedder(poison={"text number 0"})
+    list(embed_stream(items(7), embedder=fake, max_request_inputs=2, progress=done.append))
+    assert sum(done) == 5
@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import index_registry
+from index_registry import IndexRegistry
+
+MB = 2 ** 20
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Stands in for RepositoryIndex: `sizes` gives each repository's footprint, `delay` slows loads down."""
+    calls = []
+    sizes = {}
+    fail = set()
+
+    def load(name):
+        calls.append(name)
+        time.sleep(loads.delay)
+        if name in fail:
+            raise FileNotFoundError(f"no index for {name}")
+        return SimpleNamespace(name=name, bytes=sizes.get(name, MB), index=SimpleNamespace(ntotal=1),
+                               used_at=time.time())
+
+    monkeypatch.setattr(index_registry, "RepositoryIndex", load)
+    loads = SimpleNamespace(calls=calls, sizes=sizes, fail=fail, delay=0.0)
+    return loads
+
+
+def test_least_recently_used_indexes_are_evicted_over_budget(loads):
+    registry = IndexRegistry(memory_budget=3 * MB)
+    for name in ("a", "b", "c"):
+        registry.get(name)
+    # Using `a` makes `b` the least recently used
+    registry.get("a")
+    registry.get("d")
+    assert registry.stats()["loaded"] == ["c", "a", "d"]
+    assert registry.evictions == 1 and registry.resident_bytes() == 3 * MB
+    # An evicted index is loaded again on its next use, evicting the next least recently used
+    registry.get("b")
+    assert registry.stats()["loaded"] == ["a", "d", "b"]
+    assert loads.calls == ["a", "b", "c", "d", "b"]
+
+
+def test_an_index_over_budget_on_its_own_stays_loaded(loads):
+    loads.sizes["big"] = 10 * MB
+    registry = IndexRegistry(memory_budget=3 * MB)
+    registry.get("a")
+    registry.get("big")
+    assert registry.stats()["loaded"] == ["big"]
+
+
+def test_concurrent_gets_share_one_load(loads):
+    loads.delay = 0.2
+    registry = IndexRegistry(memory_budget=10 * MB)
+    start = threading.Barrier(8)
+
+    def get():
+        start.wait()
+        return registry.get("shop")
+
+    with ThreadPoolExecutor(8) as pool:
+        entries = list(pool.map(lambda _: get(), range(8)))
+    assert loads.calls == ["shop"] and registry.loads == 1
+    assert all(entry is entries[0] for entry in entries)
+
+
+def test_a_failed_load_reaches_every_waiter_and_is_retried(loads):
+    loads.delay = 0.2
+    loads.fail.add("shop")
+    registry = IndexRegistry(memory_budget=10 * MB)
+    start = threading.Barrier(4)
+
+    def get():
+        start.wait()
+        with pytest.raises(FileNotFoundError):
+            registry.get("shop")
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda _: get(), range(4)))
+    assert loads.calls == ["shop"]
+    loads.fail.clear()
+    assert registry.get("shop").name == "shop" and loads.calls == ["shop", "shop"]
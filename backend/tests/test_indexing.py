@@ -0,0 +1,125 @@
+import json
+import os
+
+import faiss
+import numpy as np
+import pytest
+
+from embed_java_v2 import build_index
+from fakes import FakeEmbedder
+from index_registry import RepositoryIndex, repository_paths
+from vector_store import current_generation
+
+
+def java_class(name, body):
+    methods = "\n\n".join(f"    public int {method}(int value) {{\n        return value * {i + 2} + {len(name)};\n    }}"
+                          for i, method in enumerate(body))
+    return f"package com.acme;\n\npublic class {name} {{\n{methods}\n}}\n"
+
+
+def write(root, path, text):
+    full = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    """A source tree and the index paths of a repository under tmp_path."""
+    monkeypatch.setattr("index_registry.INDEX_ROOT", str(tmp_path / "indexes"))
+    source = tmp_path / "src"
+    write(source, "com/acme/Alpha.java", java_class("Alpha", ["first", "second"]))
+    write(source, "com/acme/Beta.java", java_class("Beta", ["third"]))
+    write(source, "com/acme/Gamma.java", java_class("Gamma", ["fourth", "fifth"]))
+    return str(source), repository_paths("test")
+
+
+def build(source, paths, embedder=None):
+    embedder = embedder or FakeEmbedder(dim=16)
+    return build_index(source, embedder=embedder, **paths), embedder
+
+
+def manifest_ids(paths):
+    with open(paths["manifest_path"], encoding="utf-8") as f:
+        files = json.load(f)["files"]
+    return {path: [chunk["id"] for chunk in entry["chunks"]] for path, entry in files.items()}
+
+
+def assert_index_matches_store(paths):
+    entry = RepositoryIndex("test")
+    ids = np.sort(faiss.vector_to_array(entry.index.id_map))
+    assert np.array_equal(ids, np.asarray(entry.store.ids))
+    assert entry.store.index_path.startswith(f"{paths['store_prefix']}.{current_generation(paths['store_prefix'])}")
+    return entry
+
+
+def test_unchanged_tree_reuses_every_chunk(tree):
+    source, paths = tree
+    first, _ = build(source, paths)
+    assert first["reused"] == 0 and first["embedded"] > 0
+    ids = manifest_ids(paths)
+
+    second, embedder = build(source, paths)
+    assert (second["embedded"], second["removed"]) == (0, 0)
+    assert second["reused"] == first["embedded"]
+    assert embedder.requests == 0
+    assert manifest_ids(paths) == ids
+    assert_index_matches_store(paths)
+
+
+def test_changed_and_deleted_files_rewrite_and_remove_ids(tree):
+    source, paths = tree
+    build(source, paths)
+    before = manifest_ids(paths)
+
+    write(source, "com/acme/Beta.java", java_class("Beta", ["third", "sixth"]))
+    os.remove(os.path.join(source, "com/acme/Gamma.java"))
+    stats, embedder = build(source, paths)
+    after = manifest_ids(paths)
+
+    assert set(after) == {"com/acme/Alpha.java", "com/acme/Beta.java"}
+    assert after["com/acme/Alpha.java"] == before["com/acme/Alpha.java"]
+    # Rewritten chunks get fresh ids: an id never points at other code
+    new_ids = set(after["com/acme/Beta.java"]) - set(before["com/acme/Beta.java"])
+    assert new_ids and min(new_ids) > max(id for ids in before.values() for id in ids)
+    removed = {id for ids in before.values() for id in ids} - {id for ids in after.values() for id in ids}
+    assert stats["removed"] == len(removed) and set(before["com/acme/Gamma.java"]) <= removed
+    assert stats["embedded"] == embedder.inputs == len(new_ids)
+
+    entry = assert_index_matches_store(paths)
+    assert sorted(entry.store.ids) == sorted(id for ids in after.values() for id in ids)
+    assert all("sixth" not in snippet for snippet in entry.store.get_snippets(after["com/acme/Alpha.java"]))
+
+
+def test_moved_code_keeps_its_vectors_and_ids(tree):
+    source, paths = tree
+    build(source, paths)
+    ids = manifest_ids(paths)
+    with open(os.path.join(source, "com/acme/Alpha.java"), encoding="utf-8") as f:
+        text = f.read()
+    write(source, "com/acme/Alpha.java", text.replace("package com.acme;\n", "package com.acme;\n\n\n\n"))
+
+    stats, embedder = build(source, paths)
+    # The embedded text has no line numbers: nothing is embedded, only the snippets' line ranges move
+    assert (stats["embedded"], stats["removed"], embedder.inputs) == (0, 0, 0)
+    assert manifest_ids(paths) == ids
+    entry = assert_index_matches_store(paths)
+    snippet = entry.store.get_snippets(ids["com/acme/Alpha.java"][:1])[0]
+    assert snippet.startswith("// com/acme/Alpha.java:6-")
+
+
+def test_failed_embeddings_leave_no_chunks_behind(tree):
+    source, paths = tree
+    build(source, paths)
+    write(source, "com/acme/Beta.java", java_class("Beta", ["seventh"]))
+
+    class Failing(FakeEmbedder):
+        def __call__(self, texts):
+            raise ValueError("embedding failed")
+
+    stats, _ = build(source, paths, Failing(dim=16))
+    assert stats["failed"] > 0 and stats["embedded"] == 0
+    assert manifest_ids(paths)["com/acme/Beta.java"] == []
+    entry = assert_index_matches_store(paths)
+    assert not any("seventh" in snippet for snippet in entry.store.get_snippets(entry.store.ids))
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+import indexing_jobs
+from indexing_jobs import resolve_source_dir
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    for path in ("sources/shop/src", "secret"):
+        os.makedirs(tmp_path / path)
+    os.symlink(tmp_path / "secret", tmp_path / "sources" / "escape")
+    monkeypatch.setattr(indexing_jobs, "SOURCE_ROOT", str(tmp_path / "sources"))
+    return os.path.realpath(tmp_path / "sources")
+
+
+def test_source_dirs_resolve_under_the_source_root(root):
+    assert resolve_source_dir("shop") == os.path.join(root, "shop")
+    assert resolve_source_dir(os.path.join(root, "shop", "src")) == os.path.join(root, "shop", "src")
+    assert resolve_source_dir("shop/../shop/src") == os.path.join(root, "shop", "src")
+
+
+@pytest.mark.parametrize("source_dir", ["/etc", "..", "../secret", "shop/../../secret", "escape"])
+def test_source_dirs_outside_the_source_root_are_rejected(root, source_dir):
+    with pytest.raises(ValueError, match="outside"):
+        indexing_jobs.start_job(source_dir)
+    assert not indexing_jobs.list_jobs()
+
+
+def test_missing_source_dirs_are_rejected(root):
+    with pytest.raises(ValueError, match="does not exist"):
+        resolve_source_dir("shop/missing")
@@ -0,0 +1,89 @@
+from embedder import count_tokens
+from java_chunker import chunk_java, parse_provenance
+
+JAVA = """package com.acme.jobs;
+
+import java.util.List;
+
+/** Runs queued jobs. */
+public class JobRunner {
+    private final List<String> queue;
+
+    public JobRunner(List<String> queue) {
+        this.queue = queue;
+    }
+
+    @Override
+    public void run() {
+        for (String job : queue) {
+            if (job.isEmpty()) {
+                continue;
+            }
+            System.out.println("running " + job + " {not a brace}");
+        }
+    }
+
+    static class Retry {
+        int attempts() {
+            return 3;
+        }
+    }
+}
+"""
+
+
+def members(chunks):
+    """(class, method) of each chunk, split into one pair per merged method."""
+    return [(chunk["class"], method) for chunk in chunks for method in (chunk["method"] or "").split(", ")]
+
+
+def assert_provenance(source, path, chunks):
+    lines = source.split("\n")
+    for chunk in chunks:
+        _, _, body = chunk["code"].partition("\n")
+        provenance = parse_provenance(chunk["code"])
+        method = provenance.pop("method")
+        assert provenance == {key: chunk[key] for key in ("file", "start_line", "end_line", "class")}
+        # Pieces of a split member are labelled `method (part i/n)`
+        assert method == chunk["method"] or method.startswith(f"{chunk['method']} (part ")
+        assert chunk["file"] == path
+        # The line range is exactly the lines of the snippet
+        assert body == "\n".join(lines[chunk["start_line"] - 1:chunk["end_line"]])
+        # The embedded text carries the symbol but no line numbers, so moved code keeps its vector
+        assert chunk["text"].split("\n", 1)[1] == body
+        assert ":" not in chunk["text"].split("\n", 1)[0].replace(path, "")
+
+
+def test_java_members_become_chunks_with_their_class_and_method():
+    chunks = chunk_java(JAVA, "src/JobRunner.java", min_tokens=0)
+    assert members(chunks) == [("JobRunner", ""), ("JobRunner", ""), ("JobRunner", "JobRunner"),
+                               ("JobRunner", "run"), ("JobRunner.Retry", ""), ("JobRunner.Retry", "attempts")]
+    run = next(chunk for chunk in chunks if chunk["method"] == "run")
+    assert run["code"].split("\n")[1].strip() == "@Override"
+    assert "{not a brace}" in run["code"]
+    assert_provenance(JAVA, "src/JobRunner.java", chunks)
+
+
+def test_java_small_members_merge_under_the_enclosing_class():
+    chunks = chunk_java(JAVA, "src/JobRunner.java", min_tokens=10 ** 6, max_tokens=10 ** 6)
+    assert len(chunks) == 1
+    assert chunks[0]["class"] == "JobRunner"
+    assert chunks[0]["method"] == "JobRunner, run, attempts"
+    assert (chunks[0]["start_line"], chunks[0]["end_line"]) == (5, 26)
+    assert_provenance(JAVA, "src/JobRunner.java", chunks)
+
+
+def test_java_oversized_members_are_split_by_lines():
+    body = "\n".join(f"        int value{i} = compute({i}, \"padding text\");" for i in range(200))
+    source = f"class Big {{\n    void huge() {{\n{body}\n    }}\n}}\n"
+    chunks = chunk_java(source, "Big.java", max_tokens=300)
+    parts = [chunk for chunk in chunks if "huge (part " in chunk["code"].split("\n", 1)[0]]
+    assert len(parts) > 1
+    assert all(chunk["method"] == "huge" and chunk["class"] == "Big" for chunk in parts)
+    assert all(count_tokens(chunk["code"].split("\n", 1)[1]) <= 300 for chunk in parts)
+    assert [chunk["start_line"] for chunk in parts] == sorted(chunk["start_line"] for chunk in parts)
+    assert_provenance(source, "Big.java", chunks)
+
+
+def test_provenance_of_snippets_without_a_header_is_none():
+    assert parse_provenance("class A {}") is None
@@ -0,0 +1,26 @@
+import asyncio
+import threading
+
+import llm_debugging
+from fakes import FakeOpenAIClient
+
+
+def test_prompts_are_built_off_the_event_loop(monkeypatch):
+    threads = []
+    build_prompt = llm_debugging.build_prompt
+
+    def recording_build_prompt(*args):
+        threads.append(threading.get_ident())
+        return build_prompt(*args)
+
+    monkeypatch.setattr(llm_debugging, "build_prompt", recording_build_prompt)
+    client = FakeOpenAIClient(asynchronous=True, answer="Root cause: the pool is exhausted.")
+    logs = ["2025-02-10T10:00:00Z - ERROR Pool exhausted"]
+    assert asyncio.run(llm_debugging.ask_gpt_async(logs, ["class Pool {}"], client=client)) == \
+        "Root cause: the pool is exhausted."
+
+    async def stream():
+        return "".join([piece async for piece in llm_debugging.stream_gpt_async(logs, ["class Pool {}"], client=client)])
+
+    assert asyncio.run(stream()) == "Root cause: the pool is exhausted."
+    assert len(threads) == 2 and threading.get_ident() not in threads
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+import pytest
+
+import log_retrieval
+from fakes import AsyncFakeLogsClient, synthetic_log_events
+from log_cache import LogCache
+from log_retrieval import get_error_clusters_async
+
+START_MS = 1_739_200_000_000  # 2025-02-10, far behind the cache's freshness horizon
+ERROR = "QueryComposerFactory"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LogCache(str(tmp_path / "log_cache.sqlite"))
+    yield cache
+    cache._db.close()
+
+
+def rows(lo, hi):
+    return [{"ms": ms, "timestamp": str(ms), "log": f"line {ms}"} for ms in range(lo, hi + 1, 10)]
+
+
+def test_missing_returns_the_gaps_between_stored_segments(cache):
+    cache.store("g", "s", 100, 199, rows(100, 199))
+    cache.store("g", "s", 300, 399, rows(300, 399))
+    assert cache.missing("g", "s", 0, 500) == [(0, 99), (200, 299), (400, 500)]
+    assert cache.missing("g", "s", 120, 180) == []
+    # Kinds and streams are cached separately
+    assert cache.missing("g", "s", 100, 199, kind="lines:x") == [(100, 199)]
+    assert cache.missing("g", "other", 100, 199) == [(100, 199)]
+
+
+def test_adjacent_and_overlapping_segments_merge(cache):
+    cache.store("g", "s", 100, 199, rows(100, 199))
+    cache.store("g", "s", 200, 299, rows(200, 299))
+    cache.store("g", "s", 250, 349, rows(250, 349))
+    assert cache.stats()["segments"] == 1
+    assert cache.missing("g", "s", 100, 349) == []
+    assert cache.read("g", "s", 100, 349) == rows(100, 349)
+
+
+def test_partial_hits_fetch_only_the_gaps(cache):
+    calls = []
+
+    def fetcher(lo, hi):
+        calls.append((lo, hi))
+        return rows(lo, hi)
+
+    assert cache.fetch("g", "s", 1000, 1999, fetcher) == rows(1000, 1999)
+    assert cache.fetch("g", "s", 1500, 2999, fetcher) == rows(1500, 2999)
+    assert cache.fetch("g", "s", 500, 3499, fetcher) == rows(500, 3499)
+    assert calls == [(1000, 1999), (2000, 2999), (500, 999), (3000, 3499)]
+    assert cache.fetch("g", "s", 700, 3200, fetcher) == rows(700, 3200)
+    assert len(calls) == 4
+    stats = cache.stats()
+    assert (stats["misses"], stats["partial_hits"], stats["hits"]) == (1, 2, 1)
+
+
+def test_async_fetch_matches_sync_fetch(cache, tmp_path):
+    async def fetcher(lo, hi):
+        return rows(lo, hi)
+
+    asyncio.run(cache.fetch_async("g", "s", 1000, 1999, fetcher))
+    assert asyncio.run(cache.fetch_async("g", "s", 0, 2999, fetcher)) == rows(0, 2999)
+
+
+def fake_logs(count, **kwargs):
+    return AsyncFakeLogsClient(list(synthetic_log_events(count, START_MS, error_every=97, **kwargs)))
+
+
+def clusters(client, start, end, cache):
+    return asyncio.run(get_error_clusters_async("g", start, end, ERROR, "qa_aro-service", logs_client=client,
+                                                cache=cache, use_cache=cache is not None))
+
+
+def test_cached_and_uncached_runs_return_identical_clusters(cache, monkeypatch):
+    monkeypatch.setattr(log_retrieval, "MAX_QUERY_RESULTS", 200)
+    client = fake_logs(20000, interval_ms=50)
+    start, end = START_MS // 1000, (START_MS + 20000 * 50) // 1000
+    middle = (start + end) // 2
+
+    uncached = clusters(client, start, end, None)
+    full_queries = client.queries
+    assert uncached and sum(cluster["count"] for cluster in uncached) == 20000 // 97
+    # Cold, partially covered and fully covered runs all match the uncached one
+    assert clusters(client, start, middle, cache) == clusters(client, start, middle, None)
+    queries = client.queries
+    assert clusters(client, start, end, cache) == uncached
+    assert client.queries - queries < full_queries
+    queries = client.queries
+    assert clusters(client, start, end, cache) == uncached
+    assert client.queries == queries
+
+
+def test_async_fetch_keeps_sqlite_off_the_event_loop(cache, monkeypatch):
+    threads = []
+    for name in ("missing", "store", "read"):
+        method = getattr(cache, name)
+        monkeypatch.setattr(cache, name, lambda *args, method=method, **kwargs: (
+            threads.append(threading.get_ident()), method(*args, **kwargs))[1])
+
+    async def fetcher(lo, hi):
+        return rows(lo, hi)
+
+    assert asyncio.run(cache.fetch_async("g", "s", 1000, 1999, fetcher)) == rows(1000, 1999)
+    assert len(threads) == 3 and threading.get_ident() not in threads
@@ -0,0 +1,74 @@
+import asyncio
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from fakes import synthetic_log_events
+from log_files import LocalLogSource
+from log_retrieval import get_error_clusters_async
+
+START_MS = 1_739_200_000_000
+
+
+@pytest.fixture
+def source(tmp_path):
+    for path in ("logs/qa_aro-service.log", "logs/nonprod/qa_aro-service.log.1", "secret/qa_aro-service.log"):
+        os.makedirs(tmp_path / os.path.dirname(path), exist_ok=True)
+        (tmp_path / path).write_text("{}\n")
+    os.symlink(tmp_path / "secret", tmp_path / "logs" / "nonprod" / "escape")
+    return LocalLogSource(str(tmp_path / "logs"))
+
+
+def test_files_of_a_group_stay_inside_it(source, tmp_path):
+    assert [os.path.relpath(path, tmp_path) for path in source.files("/nonprod", "qa_aro")] == \
+        ["logs/nonprod/qa_aro-service.log.1"]
+    assert len(source.files("", "qa_aro")) == 2
+
+
+@pytest.mark.parametrize("group, stream", [("../secret", "qa"), ("nonprod/../..", "qa"), ("", ""),
+                                           ("", "../secret/qa"), ("nonprod", "escape/qa")])
+def test_paths_outside_the_log_directory_are_rejected(source, group, stream):
+    with pytest.raises(ValueError):
+        source.files(group, stream)
+
+
+def test_missing_groups_do_not_fall_back_to_the_root(source):
+    with pytest.raises(FileNotFoundError):
+        source.files("/aws/containerinsights/prod/application", "qa_aro")
+
+
+def test_rejected_paths_reach_the_caller(source):
+    with pytest.raises(ValueError):
+        asyncio.run(get_error_clusters_async("../secret", 0, 60, "Error", "qa_aro", logs_client=source))
+
+
+@pytest.mark.parametrize("group, stream, status", [("../secret", "qa_aro", 400), ("nonprod", "../qa", 400),
+                                                   ("prod", "qa_aro", 404)])
+def test_logs_answers_rejected_and_missing_paths_with_4xx(source, monkeypatch, group, stream, status):
+    monkeypatch.setattr(main, "get_local_source", lambda: source)
+    response = TestClient(main.app).get("/logs", params={
+        "log_group": group, "log_stream": stream, "start_time": "2025-02-10T00:00",
+        "end_time": "2025-02-10T01:00", "error_message": "Error", "source": "local"})
+    assert response.status_code == status
+    assert response.json()["error"] and response.json()["logs"] == []
+
+
+def test_error_row_batches_hold_the_same_rows_as_error_rows(tmp_path):
+    os.makedirs(tmp_path / "logs")
+    with open(tmp_path / "logs" / "qa_aro-service.log", "w", encoding="utf-8") as f:
+        f.writelines(f"{event}\n" for _, _, event in synthetic_log_events(5000, START_MS, error_every=7))
+    source = LocalLogSource(str(tmp_path / "logs"), workers=2, parallel_min_bytes=0)
+    try:
+        expected = source.error_rows("", "qa_aro", "QueryComposerFactory", START_MS, START_MS + 50000)
+
+        async def batches():
+            return [rows async for rows in source.error_row_batches_async("", "qa_aro", "QueryComposerFactory",
+                                                                          START_MS, START_MS + 50000)]
+
+        found = asyncio.run(batches())
+        assert len(found) > 1 and len(expected) == 5000 // 7
+        assert sorted((row for rows in found for row in rows), key=lambda row: row["ms"]) == expected
+    finally:
+        source.close()
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+import log_cache
+import log_retrieval
+from fakes import AsyncFakeLogsClient, synthetic_log_events
+from log_cache import LogCache
+from log_retrieval import get_error_clusters_async, run_sharded_query_async
+
+START_MS = 1_739_200_000_000  # 2025-02-10, far behind the cache's freshness horizon
+
+
+def fake_logs(count, **kwargs):
+    return AsyncFakeLogsClient(list(synthetic_log_events(count, START_MS, error_every=97, **kwargs)))
+
+
+def test_sharded_queries_merge_into_one_ordered_result(monkeypatch):
+    monkeypatch.setattr(log_retrieval, "MAX_QUERY_RESULTS", 50)
+    client = fake_logs(3000, interval_ms=700)
+    query = "fields @timestamp, @message | sort @timestamp asc | limit 50"
+    start, end = START_MS // 1000, (START_MS + 3000 * 700) // 1000
+    sharded = asyncio.run(run_sharded_query_async(client, "g", start, end, query, max_concurrency=4,
+                                                  min_shard_seconds=60))
+    assert client.queries > 3000 // 50
+    expected = [json.loads(message)["log"] for _, _, message in client.fake.events]
+    assert [json.loads(row["@message"])["log"] for row in sharded] == expected
+
+
+def test_occurrences_reach_the_miner_in_bounded_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_retrieval, "MAX_QUERY_RESULTS", 200)
+    monkeypatch.setattr(log_cache, "READ_BATCH_ROWS", 500)
+    batches = []
+    cluster_occurrences = log_retrieval.cluster_occurrences
+    monkeypatch.setattr(log_retrieval, "cluster_occurrences",
+                        lambda rows, miner: (batches.append(len(rows)), cluster_occurrences(rows, miner))[1])
+    client = AsyncFakeLogsClient(list(synthetic_log_events(20000, START_MS, error_every=2, interval_ms=50)))
+    start, end = START_MS // 1000, (START_MS + 20000 * 50) // 1000
+    cache = LogCache(str(tmp_path / "log_cache.sqlite"))
+
+    runs = []
+    for use_cache in (False, True, True):
+        batches.clear()
+        runs.append(asyncio.run(get_error_clusters_async("g", start, end, "QueryComposerFactory", "qa_aro-service",
+                                                         logs_client=client, cache=cache if use_cache else None,
+                                                         use_cache=use_cache)))
+        # Every occurrence is counted, but never more than a shard or a cache page of them at once
+        assert sum(batches) == 10000
+        assert max(batches) <= (500 if len(runs) == 3 else 200)
+    assert sum(cluster["count"] for cluster in runs[0]) == 10000
+    assert runs[0] == runs[1] == runs[2]
+    cache._db.close()
@@ -0,0 +1,97 @@
+import pytest
+
+from prompt_builder import collapse_sql, count_tokens, dedupe_lines, error_positions, fit_code, fit_logs, terms
+
+SNIPPET = """package com.acme.orders;
+
+import java.util.List;
+
+public class OrderService {
+    public void loadCatalog() {
+        catalog.refresh(List.of());
+    }
+
+    public Order placeOrder(Cart cart) {
+        inventoryClient.reserve(cart.items());
+        return repository.save(new Order(cart));
+    }
+
+    public void sendNewsletter() {
+        mailer.sendAll(subscribers.active());
+    }
+}"""
+
+
+def section(number, size):
+    return [f"\n🛑 **Context around Failure {number}**:"] + [
+        f"2025-02-10T10:{number:02d}:{i:02d}Z - INFO worker {number} processed batch {i} of queue orders-{number}"
+        for i in range(size)
+    ]
+
+
+@pytest.mark.parametrize("budget", [150, 400, 1000])
+def test_fit_logs_keeps_section_headers_within_budget(budget):
+    lines = section(1, 30) + section(2, 30) + section(3, 30)
+    anchors = error_positions(lines)
+    result, omitted = fit_logs(lines, budget, anchors)
+    assert [line for line in result if "🛑" in line] == [line for line in lines if "🛑" in line]
+    assert sum(count_tokens(line) for line in result) <= budget
+    assert omitted == len(lines) - len([line for line in result if line in lines])
+    # Kept lines stay in their original order, around the middle of each section
+    kept = [lines.index(line) for line in result if line in lines]
+    assert kept == sorted(kept) and anchors[0] in kept
+
+
+def test_fit_logs_keeps_everything_that_fits():
+    lines = section(1, 5)
+    assert fit_logs(lines, 10 ** 6, [3]) == (lines, 0)
+
+
+def test_fit_logs_keeps_headers_even_over_budget():
+    lines = section(1, 10) + section(2, 10)
+    result, omitted = fit_logs(lines, 1, [5, 16])
+    assert result == [lines[0], "… 10 lines omitted …", lines[11], "… 10 lines omitted …"]
+    assert omitted == 20
+
+
+def test_long_sql_blocks_collapse_to_their_first_two_and_last_line():
+    lines = ["2025-02-10T10:00:00Z - ERROR Query failed:", "2025-02-10T10:00:00Z - SELECT o.id, o.total,",
+             "    c.name, c.email", "  FROM orders o", "  JOIN customers c ON c.id = o.customer_id",
+             "  WHERE o.status = 'OPEN'", "  ORDER BY o.created_at DESC", "",
+             "2025-02-10T10:00:01Z - INFO retrying", "2025-02-10T10:00:02Z - SELECT 1", "  FROM dual"]
+    result, collapsed = collapse_sql(lines)
+    assert result == [lines[0], lines[1], lines[2], "… 3 SQL lines collapsed …", lines[6],
+                      lines[8], lines[9], lines[10]]
+    # The 3 middle lines and the trailing blank one; the short statement stays whole
+    assert collapsed == 4
+
+
+def test_dedupe_merges_lines_differing_only_in_ids_and_timestamps():
+    lines = ["2025-02-10T10:00:00Z - Order 1001 failed for user 3f2b8c1e-9d4a-4b7e-8f0a-1c2d3e4f5a6b",
+             "2025-02-10T10:00:05Z - Order 1002 failed for user 9a8b7c6d-5e4f-4a3b-8c2d-1e0f9a8b7c6d",
+             "2025-02-10T10:00:06Z - Payment gateway timeout",
+             "2025-02-10T10:00:09Z - Order 1003 failed for user 0b1c2d3e-4f5a-4b6c-8d7e-9f0a1b2c3d4e",
+             "🛑 **Context around Failure 2**:", "🛑 **Context around Failure 2**:"]
+    result, removed = dedupe_lines(lines)
+    assert result == [f"{lines[0]} (repeated ×3)", lines[2], lines[4], lines[5]]
+    assert removed == 2
+
+
+def test_fit_code_keeps_the_header_and_the_best_scoring_methods():
+    query = terms("ERROR OrderService.placeOrder failed: inventoryClient reserve timed out")
+    header = "package com.acme.orders;\n\nimport java.util.List;\n\npublic class OrderService {"
+    place_order = SNIPPET[SNIPPET.index("public Order"):SNIPPET.index("    public void sendNewsletter")].rstrip()
+    # Room for the header, the footer, placeOrder and the omission markers, not for a second method
+    budget = count_tokens(header) + count_tokens("}") + count_tokens(place_order) + 3 * (
+        count_tokens("// … 3 methods omitted …") + 1)
+    (trimmed,), omitted = fit_code([SNIPPET], budget, query)
+    assert count_tokens(trimmed) <= budget
+    assert omitted == 2
+    assert trimmed.startswith(header)
+    assert place_order in trimmed
+    assert "loadCatalog" not in trimmed and "sendNewsletter" not in trimmed
+    assert trimmed.count("methods omitted") == 2
+    # With room for everything nothing is dropped
+    (trimmed,), omitted = fit_code([SNIPPET], 10 ** 6, query)
+    assert omitted == 0 and all(name in trimmed for name in ("loadCatalog", "placeOrder", "sendNewsletter"))
+
@@ -0,0 +1,103 @@
+import os
+
+from source_ingest import IgnoreRules, ignored, read_source, walk_sources
+
+
+def write(root, path, text="class A {}\n"):
+    full = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_unanchored_patterns_match_at_any_depth():
+    rules = IgnoreRules(["*.log", "tmp"])
+    assert rules.match("app.log", False)
+    assert rules.match("a/b/app.log", False)
+    assert rules.match("a/tmp", True)
+    assert rules.match("a/tmp", False)
+    assert rules.match("a/template", True) is None
+
+
+def test_a_slash_anchors_the_pattern_to_the_gitignore_directory():
+    rules = IgnoreRules(["/build", "docs/*.md"])
+    assert rules.match("build", True)
+    assert rules.match("src/build", True) is None
+    assert rules.match("docs/readme.md", False)
+    assert rules.match("docs/api/readme.md", False) is None
+
+
+def test_directory_only_patterns_skip_files():
+    rules = IgnoreRules(["out/"])
+    assert rules.match("out", True)
+    assert rules.match("out", False) is None
+
+
+def test_double_star_and_character_classes():
+    rules = IgnoreRules(["src/**/gen", "**/cache/**", "file[0-9].py", "x[!a].py"])
+    assert rules.match("src/gen", True)
+    assert rules.match("src/a/b/gen", True)
+    assert rules.match("a/cache/b/c.py", False)
+    assert rules.match("file7.py", False)
+    assert rules.match("filex.py", False) is None
+    assert rules.match("xb.py", False)
+    assert rules.match("xa.py", False) is None
+
+
+def test_comments_blank_lines_and_escapes():
+    rules = IgnoreRules(["# comment", "", r"\#notes.txt", "  "])
+    assert rules.match("#notes.txt", False)
+    assert rules.match("comment", False) is None
+
+
+def test_the_last_matching_rule_wins_and_negation_reincludes():
+    rules = IgnoreRules(["*.py", "!keep.py"])
+    assert rules.match("drop.py", False) is True
+    assert rules.match("keep.py", False) is False
+    assert IgnoreRules(["!keep.py", "*.py"]).match("keep.py", False) is True
+
+
+def test_deeper_gitignore_files_decide():
+    rules = [("", IgnoreRules(["*.py"])), ("pkg", IgnoreRules(["!main.py"]))]
+    assert ignored(rules, "pkg/other.py", False)
+    assert not ignored(rules, "pkg/main.py", False)
+    assert ignored(rules, "main.py", False)
+
+
+def test_walk_honors_nested_gitignores_and_skip_dirs(tmp_path):
+    root = str(tmp_path)
+    write(root, ".gitignore", "ignored/\n*.tmp.py\n")
+    write(root, "src/com/acme/App.java")
+    write(root, "src/com/acme/build/Builder.java")
+    write(root, "src/com/acme/out/Out.java")
+    write(root, "src/vendor/Lib.java")
+    write(root, "src/.gitignore", "secret/\n!keep.tmp.py\n")
+    write(root, "src/secret/S.java")
+    write(root, "src/keep.tmp.py", "x = 1\n")
+    write(root, "src/drop.tmp.py", "x = 1\n")
+    write(root, "ignored/I.java")
+    write(root, "build/Generated.java")
+    write(root, "node_modules/pkg/index.ts", "export const a = 1;\n")
+    write(root, "src/web/node_modules/pkg/index.ts", "export const a = 1;\n")
+    write(root, "src/app.min.ts", "export const a = 1;\n")
+    write(root, "README.md", "# readme\n")
+
+    paths = [path for path, _ in walk_sources(root)]
+    assert sorted(paths) == ["src/com/acme/App.java", "src/com/acme/build/Builder.java",
+                             "src/com/acme/out/Out.java", "src/keep.tmp.py", "src/vendor/Lib.java"]
+    assert paths == [path for path, _ in walk_sources(root)]
+
+
+def test_read_source_skips_binary_generated_and_unchanged_files(tmp_path):
+    root = str(tmp_path)
+    write(root, "Gen.java", "// @generated by protoc\nclass Gen {}\n")
+    with open(os.path.join(root, "blob.py"), "wb") as f:
+        f.write(b"x = 1\0\1\2")
+    write(root, "App.java", "package com.acme;\n\nclass App {\n    void run() {}\n}\n")
+
+    assert read_source(root, "Gen.java")["skipped"] == "generated"
+    assert read_source(root, "blob.py")["skipped"] == "binary"
+    source = read_source(root, "App.java")
+    assert (source["language"], source["package"]) == ("java", "com.acme")
+    assert source["chunks"] and all(chunk["hash"] for chunk in source["chunks"])
+    assert read_source(root, "App.java", known_hash=source["sha256"])["chunks"] is None
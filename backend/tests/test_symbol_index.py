@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from symbol_index import CLASS, FRAME_LINE, METHOD, SymbolIndex, build_symbol_index, fuse
+
+ORDERS = "src/main/java/com/acme/orders/OrderService.java"
+CHUNKS = [
+    {"id": 0, "file": ORDERS, "package": "com.acme.orders", "class": "OrderService", "method": "", "lines": [1, 10],
+     "code": "public class OrderService {\n    private final InventoryClient inventoryClient;"},
+    {"id": 1, "file": ORDERS, "package": "com.acme.orders", "class": "OrderService", "method": "placeOrder",
+     "lines": [11, 30], "code": "public Order placeOrder(Cart cart) {\n    inventoryClient.reserve(cart.items());"},
+    {"id": 2, "file": ORDERS, "package": "com.acme.orders", "class": "OrderService", "method": "cancelOrder",
+     "lines": [31, 45], "code": "public void cancelOrder(long orderId) {\n    repository.delete(orderId);"},
+    {"id": 3, "file": "src/main/java/com/acme/inventory/InventoryClient.java", "package": "com.acme.inventory",
+     "class": "InventoryClient", "method": "reserve", "lines": [5, 25],
+     "code": "public void reserve(List<Item> items) {\n    warehouse.lock(items);"},
+    {"id": 4, "file": "src/main/java/com/acme/billing/PaymentGateway.java", "package": "com.acme.billing",
+     "class": "PaymentGateway", "method": "charge", "lines": [8, 40],
+     "code": "public Receipt charge(Card card) {\n    if (card.declined()) throw new PaymentDeclinedException(card);"},
+    {"id": 5, "file": "src/main/java/com/acme/billing/Refunds.java", "package": "com.acme.billing",
+     "class": "Refunds", "method": "refund", "lines": [3, 12],
+     "code": "public void refund(Receipt receipt) {\n    ledger.credit(receipt.total());"},
+    {"id": 6, "file": "src/main/java/com/acme/orders/Refunds.java", "package": "com.acme.orders",
+     "class": "Refunds", "method": "refund", "lines": [3, 9],
+     "code": "public void refund(Order order) {\n    payments.reverse(order);"},
+]
+
+
+@pytest.fixture
+def symbols():
+    # Through JSON, as load_symbol_index reads it
+    return SymbolIndex(json.loads(json.dumps(build_symbol_index(CHUNKS))))
+
+
+def test_stack_frames_resolve_to_their_method_chunk(symbols):
+    trace = "java.lang.IllegalStateException: out of stock\n" \
+            "\tat com.acme.orders.OrderService.placeOrder(OrderService.java:17)\n" \
+            "\tat com.acme.orders.OrderService$1.run(OrderService.java:999)"
+    hits = symbols.resolve(trace)
+    # The frame's file:line lands inside the placeOrder chunk; the anonymous class folds into OrderService
+    assert hits[1] == (FRAME_LINE, True, "com.acme.orders.OrderService")
+    symbol_ids, _, confident = symbols.search(trace, 3)
+    assert confident and symbol_ids[0] == 1
+
+
+def test_logger_names_and_class_method_mentions(symbols):
+    hits = symbols.resolve("10:00:00.123 [main] ERROR c.a.inventory.InventoryClient - InventoryClient.reserve failed")
+    assert hits[3] == (METHOD, True, "com.acme.inventory.InventoryClient")
+    assert symbols.resolve("WARN c.a.orders.OrderService - slow")[2] == (CLASS, True, "com.acme.orders.OrderService")
+
+
+def test_unknown_symbols_fall_back_to_bm25(symbols):
+    text = "at com.acme.billing.CardVault.lookup(CardVault.java:5): PaymentDeclinedException for card"
+    assert symbols.resolve(text) == {}
+    symbol_ids, lexical, confident = symbols.search(text, 2)
+    assert symbol_ids == [] and not confident
+    assert lexical[0] == 4
+
+
+def test_rank_fusion_orders_ids_by_their_ranks_across_lists():
+    # 1 ranks second and first (1/62 + 1/61); 2, first once (1/61), beats 3, second once (1/62)
+    assert fuse([[2, 1], [1, 3, 4]], 3) == [1, 2, 3]
+    # FAISS pads missing neighbours with -1
+    assert fuse([[5], [-1, 5, -1]], 3) == [5]
+
+
+def test_symbol_and_vector_rankings_fuse_for_ambiguous_logs(symbols):
+    # Two classes named Refunds define refund: the mention is ambiguous, so nothing is answered from symbols alone
+    text = "Refunds.refund failed: ledger credit rejected for receipt"
+    symbol_ids, lexical, confident = symbols.search(text, 3)
+    assert not confident
+    # Both hits rank by BM25: the billing one shares ledger / credit / receipt with the text
+    assert symbol_ids == [5, 6] and lexical[0] == 5
+    # The vector search prefers the orders one; symbol + lexical agreement still puts billing first
+    assert fuse([symbol_ids, lexical, [6, 2, 5]], 3) == [5, 6, 2]
@@ -0,0 +1,222 @@
+import glob
+import json
+import mmap
+import os
+import re
+import shutil
+import sys
+import time
+
+import numpy as np
+
+STORE_PREFIX = "java_embeddings"
+
+# Files that make up a store, next to the FAISS index:
+#   <prefix>.vectors.npy   float32 (n, dim), memory-mapped on open
+#   <prefix>.ids.npy       int64 (n,) FAISS ids, sorted ascending
+#   <prefix>.offsets.npy   int64 (n + 1,) byte offsets into the snippet blob
+#   <prefix>.snippets.bin  UTF-8 snippet text, concatenated in id order
+SUFFIXES = (".vectors.npy", ".ids.npy", ".offsets.npy", ".snippets.bin")
+# Each write is a generation: its files are named <prefix>.<generation>.vectors.npy, ..., plus
+# the FAISS index built with it as <prefix>.<generation>.index, and <prefix>.generation names
+# the current one. Swapping that one file publishes a build, so a reader never pairs the
+# index of one build with the vectors or snippets of another. Stores written before
+# generations existed keep the plain <prefix>.vectors.npy names.
+GENERATION_SUFFIX = ".generation"
+INDEX_SUFFIX = ".index"
+_GENERATION = re.compile(r"^[0-9a-f]{16}$")
+
+
+def current_generation(prefix=STORE_PREFIX):
+    """The generation <prefix>.generation points at, or None for a store without generations."""
+    try:
+        with open(prefix + GENERATION_SUFFIX, "r", encoding="utf-8") as f:
+            generation = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return generation if _GENERATION.match(generation) else None
+
+
+def generation_base(prefix, generation):
+    return f"{prefix}.{generation}" if generation else prefix
+
+
+def store_exists(prefix=STORE_PREFIX):
+    """Returns True when every file of the store is present."""
+    base = generation_base(prefix, current_generation(prefix))
+    return all(os.path.exists(base + suffix) for suffix in SUFFIXES)
+
+
+class VectorStore:
+    """Read-only view over a binary vector + snippet store.
+
+    Vectors and snippet text stay on disk and are paged in on demand, so fetching
+    the k snippets of a search result never deserializes the whole store.
+    """
+
+    def __init__(self, prefix=STORE_PREFIX):
+        self.prefix = prefix
+        for attempt in range(3):
+            self.generation = current_generation(prefix)
+            try:
+                self._open(generation_base(prefix, self.generation))
+                break
+            except FileNotFoundError:
+                # A build replaced the generation just read (and removed its files): read the new one
+                if attempt == 2 or current_generation(prefix) == self.generation:
+                    raise
+        base = generation_base(prefix, self.generation)
+        self.files = [base + suffix for suffix in SUFFIXES]
+        # The FAISS index written with these vectors; None for stores written without one
+        self.index_path = base + INDEX_SUFFIX if self.generation and os.path.exists(base + INDEX_SUFFIX) else None
+
+    def _open(self, base):
+        self.vectors = np.load(base + ".vectors.npy", mmap_mode="r")
+        self.ids = np.load(base + ".ids.npy", mmap_mode="r")
+        self.offsets = np.load(base + ".offsets.npy", mmap_mode="r")
+        with open(base + ".snippets.bin", "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def rows(self, ids):
+        """Maps FAISS ids to row positions; unknown ids map to -1."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        rows = np.searchsorted(self.ids, ids)
+        rows[rows >= len(self.ids)] = 0
+        rows[self.ids[rows] != ids] = -1
+        return rows
+
+    def get_vectors(self, ids):
+        """Returns the stored vectors for `ids` as a float32 array (ids must exist)."""
+        rows = self.rows(ids)
+        if (rows < 0).any():
+            raise KeyError(f"Unknown ids: {np.asarray(ids)[rows < 0].tolist()}")
+        return np.asarray(self.vectors[rows])
+
+    def get_snippet(self, row):
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return self._blob[start:end].decode("utf-8")
+
+    def get_snippets(self, ids):
+        """Returns the snippet text for each known id, skipping ids not in the store."""
+        return [self.get_snippet(row) for row in self.rows(ids) if row >= 0]
+
+    def close(self):
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        # Drop the memmaps too, so the files can be replaced (required on Windows)
+        self.vectors = self.ids = self.offsets = None
+
+
+def write_store(prefix, ids, vectors, snippets, index=None):
+    """Writes a store as a new generation, with the FAISS `index` if given, and makes it current.
+
+    Every file is written under the new generation's names first; replacing
+    <prefix>.generation then switches readers over in one atomic rename. Files of
+    generations before the previous one are removed (the previous one stays, so a reader
+    that has just read the old pointer can still open it). Returns the generation.
+    """
+    previous = current_generation(prefix)
+    generation = f"{time.time_ns():016x}"
+    base = generation_base(prefix, generation)
+    order = np.argsort(np.asarray(ids, dtype=np.int64), kind="stable")
+    ids = np.asarray(ids, dtype=np.int64)[order]
+    vectors = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32)[order])
+
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+    with open(base + ".snippets.bin", "wb") as f:
+        for i, position in enumerate(order):
+            data = snippets[position].encode("utf-8")
+            f.write(data)
+            offsets[i + 1] = offsets[i] + len(data)
+
+    for suffix, array in ((".vectors.npy", vectors), (".ids.npy", ids), (".offsets.npy", offsets)):
+        np.save(base + suffix, array)
+    if index is not None:
+        import faiss
+
+        faiss.write_index(index, base + INDEX_SUFFIX)
+
+    with open(prefix + GENERATION_SUFFIX + ".tmp", "w", encoding="utf-8") as f:
+        f.write(generation)
+    os.replace(prefix + GENERATION_SUFFIX + ".tmp", prefix + GENERATION_SUFFIX)
+    remove_generations(prefix, keep=(generation, previous))
+    return generation
+
+
+def remove_generations(prefix, keep):
+    """Deletes the files of every generation not in `keep` (None in `keep` keeps the plain-named files)."""
+    stem = re.escape(os.path.basename(prefix))
+    data = "|".join(re.escape(suffix[1:]) for suffix in SUFFIXES)
+    names = re.compile(rf"^{stem}\.(?:([0-9a-f]{{16}})\.(?:{data}|index)|(?:{data}))$")
+    for path in glob.glob(glob.escape(prefix) + ".*"):
+        match = names.match(os.path.basename(path))
+        if match is None or match.group(1) in keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError as e:
+            # Still mapped by a reader on Windows: the next build retries
+            print(f"⚠️ Could not remove `{path}`: {e}")
+
+
+def link_file(source, target):
+    """Points `target` at the contents of `source` with one rename: a hard link, or a copy where links fail."""
+    try:
+        os.remove(target + ".tmp")
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(source, target + ".tmp")
+    except OSError:
+        shutil.copyfile(source, target + ".tmp")
+    os.replace(target + ".tmp", target)
+
+
+def convert_json(json_path="java_embeddings.json", prefix=STORE_PREFIX, index_path="java_embeddings.index"):
+    """One-shot converter from the legacy `java_embeddings.json` to the binary store.
+
+    Records without an "id" are positional. Records without an "embedding" (as written
+    by `recreate_java_embedings.py`) get their vectors reconstructed from the FAISS index.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not data:
+        raise ValueError(f"❌ `{json_path}` has no records to convert!")
+
+    ids = [item.get("id", i) for i, item in enumerate(data)]
+    snippets = [item["code"] for item in data]
+
+    if all("embedding" in item for item in data):
+        vectors = np.array([item["embedding"] for item in data], dtype=np.float32)
+    else:
+        import faiss
+
+        print(f"⚠️ `{json_path}` has no embeddings, reconstructing them from `{index_path}`...")
+        index = faiss.read_index(index_path)
+        if isinstance(index, faiss.IndexIDMap):
+            # Positional ids are the only ones an old-style JSON can line up with
+            index = faiss.downcast_index(index.index)
+        vectors = index.reconstruct_n(0, index.ntotal)
+        if len(vectors) != len(snippets):
+            print(f"⚠️ Index has {len(vectors)} vectors for {len(snippets)} snippets, keeping the overlap.")
+        count = min(len(vectors), len(snippets))
+        ids, snippets, vectors = ids[:count], snippets[:count], vectors[:count]
+
+    write_store(prefix, ids, vectors, snippets)
+    print(f"✅ Converted {len(ids)} records from `{json_path}` to `{prefix}.*`.")
+    return len(ids)
+
+
+# If running as a standalone script
+if __name__ == "__main__":
+    convert_json(*sys.argv[1:])
@@ -9,11 +9,31 @@ import { Tabs, TabsList, TabsTrigger, TabsContent } from "@/components/ui/tabs";
 import { Textarea } from "@/components/ui/textarea";
 import { Table } from "@/components/ui/table";
 
+// A distinct failure: every occurrence of one log template, with one context window
+type ErrorCluster = {
+  fingerprint: string;
+  template: string;
+  count: number;
+  first_seen: string;
+  last_seen: string;
+  logs: string[];
+};
+
+// Provenance of an analysis answered from the backend's answer cache
+type CachedAnswer = {
+  match: "exact" | "similar";
+  similarity: number;
+  created_at: string;
+  age_seconds: number;
+  error_message: string;
+};
+
 export default function DebuggingUI() {
   const [startTime, setStartTime] = useState<string>("");
   const [endTime, setEndTime] = useState<string>("");
   const [hydrated, setHydrated] = useState(false);  
   const [logs, setLogs] = useState<string[]>([]); // ✅ Ensure logs is always an array of strings
+  const [clusters, setClusters] = useState<ErrorCluster[]>([]); // One entry per distinct failure
   const [codeSnippets, setCodeSnippets] = useState<[string, string][]>([]);
   const [debugInfo, setDebugInfo] = useState<string>("");
   const [logGroup, setLogGroup] = useState("");
@@ -24,7 +44,10 @@ export default function DebuggingUI() {
   const [errorMessage, setErrorMessage] = useState("");
   const [hasQueried, setHasQueried] = useState(false); // ✅ Track if a log query was made
   const [analysis, setAnalysis] = useState("");
+  const [cachedAnswer, setCachedAnswer] = useState<CachedAnswer | null>(null); // Set when the analysis came from the cache
   const [activeTab, setActiveTab] = useState("logs");
+  const [repositories, setRepositories] = useState<string[]>([]); // Code indexes the backend has
+  const [repository, setRepository] = useState(""); // Empty: the backend's default index
 
  
   // ✅ Set the time after hydration to avoid mismatch
@@ -37,10 +60,20 @@ export default function DebuggingUI() {
     }
   }, []);
 
+  // ✅ Code indexes to search, one per repository
+  useEffect(() => {
+    fetch("http://127.0.0.1:8000/repositories")
+      .then((response) => response.json())
+      .then((data) => setRepositories((data.repositories || []).map((entry: { name: string }) => entry.name)))
+      .catch((error) => console.error("❌ Error fetching repositories:", error));
+  }, []);
+
   
   const logStreamOptions: Record<string, string[]> = {
       "production": ["Windstream", "Consolidated", "JSI","123net" ],
-      "non-production": ["QA", "UAT"]
+      "non-production": ["QA", "UAT"],
+      // Container log files under the backend's LOCAL_LOG_DIR, named after the stream
+      "local": ["QA", "UAT", "Windstream", "Consolidated", "JSI", "123net"]
   };
 
   const resolveLogGroup = (group: string) => {
@@ -95,8 +128,9 @@ const fetchLogs = async () => {
   const encodedStartTime = encodeURIComponent(startTime);
   const encodedEndTime = encodeURIComponent(endTime);
   const encodedErrorMessage = encodeURIComponent(errorMessageInput);
+  const source = logGroup === "local" ? "local" : "cloudwatch";
 
-  const apiUrl = `http://127.0.0.1:8000/logs?log_group=${formattedLogGroup}&log_stream=${formattedLogStream}&start_time=${encodedStartTime}&end_time=${encodedEndTime}&error_message=${encodedErrorMessage}`;
+  const apiUrl = `http://127.0.0.1:8000/logs?log_group=${formattedLogGroup}&log_stream=${formattedLogStream}&start_time=${encodedStartTime}&end_time=${encodedEndTime}&error_message=${encodedErrorMessage}&source=${source}`;
 
   console.log("🚀 Fetching logs from:", apiUrl);
 
@@ -110,6 +144,7 @@ const fetchLogs = async () => {
     if (data.error) {
       setLogErrorMessage(data.error);
       setLogs([]);
+      setClusters([]);
       setCodeSnippets([]); // ✅ Clear previous code snippets
       setAnalysis(""); // ✅ Clear previous AI analysis
       return;
@@ -117,6 +152,7 @@ const fetchLogs = async () => {
 
     // ✅ Store logs (ensure it's an array)
     setLogs(Array.isArray(data.logs) ? data.logs : []);
+    setClusters(Array.isArray(data.clusters) ? data.clusters : []);
     setLogErrorMessage("");
 
     // ✅ Store Relevant Code Snippets
@@ -137,6 +173,7 @@ const fetchLogs = async () => {
   } catch (error) {
     console.error("❌ Error fetching logs:", error);
     setLogs([]);
+    setClusters([]);
     setCodeSnippets([]);
     setAnalysis("");
     setLogErrorMessage("Error fetching logs. Please try again.");
@@ -149,25 +186,28 @@ const fetchCode = async () => {
     return;
   }
 
-  const apiUrl = "http://127.0.0.1:8000/code";  
+  const apiUrl = `http://127.0.0.1:8000/code${repository ? `?repository=${encodeURIComponent(repository)}` : ""}`;
   
   try {
-    const response = await fetch(apiUrl, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ logs }), 
+    // ✅ One search per distinct failure (its context window), all in parallel
+    const windows = clusters.length > 0 ? clusters.map((cluster) => cluster.logs) : [logs];
+    const results = await Promise.all(windows.map(async (windowLogs) => {
+      const response = await fetch(apiUrl, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(windowLogs), 
       });
+      return response.json();
+    }));
 
-    const data = await response.json();
-
-    console.log("🔍 API Response for Code:", data);
+    console.log("🔍 API Response for Code:", results);
 
-    if (data.error) {
+    const found = results.filter((data) => !data.error).flatMap((data) => data.code);
+    if (found.length === 0) {
       setCodeSnippets([]);
     } else {
-      // Suppose your server returns { code: ["snippet1", "snippet2", ...] }
-      // So data.code is an array. Convert it to the shape you want:
-      setCodeSnippets([...data.code]);
+      // Failures in the same code return the same snippets: keep each once
+      setCodeSnippets(Array.from(new Set(found)));
       setActiveTab("code"); // ✅ Auto-switch to Code tab
     }
   } catch (error) {
@@ -176,19 +216,75 @@ const fetchCode = async () => {
   }
 };
 
-const fetchDebugInfo = async () => {
+// ✅ Streams the analysis as it is written; returns false if nothing arrived, so the caller can fall back
+const streamDebugInfo = async (useCache: boolean): Promise<boolean> => {
+  const response = await fetch("http://127.0.0.1:8000/debug/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ logs, code: codeSnippets, error_message: errorMessageInput, use_cache: useCache })
+  });
+  if (!response.ok || !response.body) {
+    return false;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let text = "";
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Server-sent events are separated by a blank line
+    const events = buffer.split("\n\n");
+    buffer = events.pop() ?? "";
+    for (const raw of events) {
+      const event = raw.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] ?? "{}");
+
+      if (event === "token") {
+        text += data.text;
+        setAnalysis(text);
+        setActiveTab("analysis"); // ✅ Auto-switch to Analysis tab on the first token
+      } else if (event === "done") {
+        console.log(`⏱️ First token after ${data.time_to_first_token_ms} ms, done after ${data.total_ms} ms`);
+        setCachedAnswer(data.cache ?? null);
+      } else if (event === "error") {
+        console.error("❌ Streaming analysis failed:", data.error);
+      }
+    }
+  }
+
+  setDebugInfo(text);
+  return text !== "";
+};
+
+// useCache = false asks for a fresh analysis instead of a cached one
+const fetchDebugInfo = async (useCache = true) => {
   if (logs.length === 0 || codeSnippets.length === 0) {
     console.warn("⚠️ Fetch logs and code first.");
     return;
   }
 
+  setCachedAnswer(null);
+  try {
+    if (await streamDebugInfo(useCache)) {
+      return;
+    }
+    console.warn("⚠️ Streaming unavailable, falling back to /debug.");
+  } catch (error) {
+    console.warn("⚠️ Streaming failed, falling back to /debug:", error);
+  }
+
   const apiUrl = `http://127.0.0.1:8000/debug`;
 
   try {
     const response = await fetch(apiUrl, {
       method: "POST",
       headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ logs, code: codeSnippets })
+      body: JSON.stringify({ logs, code: codeSnippets, error_message: errorMessageInput, use_cache: useCache })
     });
 
     const data = await response.json();
@@ -200,6 +296,7 @@ const fetchDebugInfo = async () => {
     } else {
       setDebugInfo(data.debug_info);
       setAnalysis(data.debug_info);
+      setCachedAnswer(data.cache ?? null);
       setActiveTab("analysis"); // ✅ Auto-switch to Analysis tab
     }
   } catch (error) {
@@ -229,6 +326,7 @@ return (
           <option value="">Select Log Group</option>
           <option value="production">Production</option>
           <option value="non-production">Non-Production</option>
+          <option value="local">Local Files</option>
         </select>
 
         {/* Log Stream Dropdown */}
@@ -247,6 +345,19 @@ return (
           }
         </select>
 
+        {/* Repository Dropdown: which code index Get Code searches */}
+        <label>Repository:</label>
+        <select
+          value={repository}
+          onChange={(e) => setRepository(e.target.value)}
+          className="border p-2 rounded-md"
+        >
+          <option value="">Default</option>
+          {repositories.filter((name) => name !== "default").map((name) => (
+            <option key={name} value={name}>{name}</option>
+          ))}
+        </select>
+
         <label>Start Time:</label>
         <Input type="datetime-local" value={startTime} onChange={(e) => setStartTime(e.target.value)} />
 
@@ -258,7 +369,7 @@ return (
         <div className="flex space-x-4">
           <Button onClick={fetchLogs} disabled={!isGetLogsEnabled}>Get Logs</Button>
           <Button onClick={fetchCode} disabled={!isGetCodeEnabled}>Get Code</Button>
-          <Button onClick={fetchDebugInfo} disabled={!isDebugEnabled}>Debug</Button>
+          <Button onClick={() => fetchDebugInfo()} disabled={!isDebugEnabled}>Debug</Button>
         </div>
       </div>
     </Card>
@@ -280,6 +391,16 @@ return (
     </TabsContent>
 
     <TabsContent value="analysis">
+      {cachedAnswer && (
+        <div className="flex items-center space-x-4 text-sm text-gray-500">
+          <span>
+            ♻️ Cached analysis ({cachedAnswer.match === "exact" ? "same incident" : `similar incident, ${Math.round(cachedAnswer.similarity * 100)}% alike`})
+            {" "}from {new Date(cachedAnswer.created_at).toLocaleString()}
+            {cachedAnswer.error_message && ` for "${cachedAnswer.error_message}"`}
+          </span>
+          <Button onClick={() => fetchDebugInfo(false)}>Re-analyze</Button>
+        </div>
+      )}
       <pre>{analysis}</pre>
     </TabsContent>
   </Tabs>